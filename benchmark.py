@@ -0,0 +1,1608 @@
+"""Benchmark jalur kritis aplikasi POS (py1.py).
+
+Semua benchmark berjalan di direktori sementara dengan database sendiri,
+sehingga pos_data.db milik toko tidak pernah disentuh.
+
+Pemakaian:
+    python benchmark.py              # jalankan semua benchmark
+    python benchmark.py scan         # jalankan benchmark tertentu saja
+    python benchmark.py --json hasil.json scan_throughput   # simpan ringkasan latensi ke JSON
+"""
+import argparse
+import json
+import platform
+import os
+import sys
+import sqlite3
+import statistics
+import tempfile
+import time
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BENCHMARKS = {}
+RESULTS = {} # {nama benchmark: {label: ringkasan latensi}}, ditulis ke file oleh --json
+current_benchmark = None
+
+def benchmark(name):
+    """Mendaftarkan fungsi benchmark dengan nama tertentu."""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+def load_app_module():
+    """Mengimpor py1 dari direktori kerja saat ini (database dibuat di sini)."""
+    if HERE not in sys.path:
+        sys.path.insert(0, HERE)
+    import py1
+    return py1
+
+BRANDS = ["Indomie", "Sedaap", "Aqua", "Sosro", "Kapal Api", "Good Day", "Ultra Milk", "Frisian Flag",
+          "Chitato", "Qtela", "Oreo", "Roma", "Khong Guan", "Sari Roti", "Lifebuoy", "Pepsodent", "Rinso",
+          "Sunlight", "Molto", "Baygon", "Bimoli", "Rose Brand", "Gulaku", "ABC", "Bango", "Sasa"]
+VARIANTS = ["Goreng", "Kuah Soto", "Ayam Bawang", "Original", "Coklat", "Vanilla", "Stroberi", "Pedas",
+            "Manis", "Jeruk", "Melon", "Mocca", "Susu", "Kopi", "Teh Melati", "Lemon"]
+SIZES = ["85g", "250ml", "600ml", "1L", "100g", "200g", "1kg", "5kg", "10pcs", "Sachet"]
+
+def product_name(i):
+    """Nama produk sintetis yang realistis dan unik untuk indeks ke-i."""
+    return (f"{BRANDS[i % len(BRANDS)]} {VARIANTS[(i // len(BRANDS)) % len(VARIANTS)]} "
+            f"{SIZES[(i // 7) % len(SIZES)]} {i:06d}")
+
+def seed_products(py1, count):
+    """Mengisi tabel products dengan `count` produk sintetis dan mengembalikan daftar ID-nya."""
+    ids = [f"899{(i * 7919) % 10**10:010d}" for i in range(count)]
+    with py1.db_manager.transaction() as conn:
+        conn.execute("DELETE FROM products")
+        conn.executemany("INSERT INTO products (id, name, price, stock) VALUES (?, ?, ?, ?)",
+                         ((pid, product_name(i), 1000 + (i % 500) * 250, 1000) for i, pid in enumerate(ids)))
+    return ids
+
+def measure(func, repeat):
+    """Menjalankan func sebanyak `repeat` kali dan mengembalikan durasi tiap panggilan (detik)."""
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def report(label, samples):
+    """Mencetak ringkasan latensi dalam mikrodetik."""
+    ordered = sorted(samples)
+    mean = statistics.mean(samples) * 1e6
+    p50 = ordered[len(ordered) // 2] * 1e6
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1e6
+    print(f"  {label:<44} mean {mean:9.1f} us   p50 {p50:9.1f} us   p99 {p99:9.1f} us")
+    RESULTS.setdefault(current_benchmark, {})[label] = {
+        'samples': len(samples), 'mean_us': round(mean, 2), 'p50_us': round(p50, 2), 'p99_us': round(p99, 2)}
+
+@benchmark("scan")
+def bench_scan(py1, repeat=2000):
+    """Latensi database per scan: koneksi baru per panggilan vs koneksi bersama."""
+    ids = seed_products(py1, 5000)
+    db_path = os.path.abspath(py1.db_manager.db_path)
+
+    def legacy_get_product_by_id(product_id):
+        # Salinan perilaku lama: buka koneksi, query, tutup
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, name, price, stock FROM products WHERE id = ?", (product_id.strip(),))
+        product = cursor.fetchone()
+        conn.close()
+        return product
+
+    # Satu scan = process_product_id_input + add_to_cart + refresh label stok
+    def legacy_scan(i):
+        for _ in range(3):
+            legacy_get_product_by_id(ids[i % len(ids)])
+
+    def pooled_scan(i):
+        for _ in range(3):
+            py1.connect_db().execute("SELECT id, name, price, stock FROM products WHERE id = ?", (ids[i % len(ids)],)).fetchone()
+
+    def catalog_scan(i):
+        for _ in range(3):
+            py1.get_product_by_id(ids[i % len(ids)])
+
+    print(f"scan ({len(ids)} produk, {repeat} scan)")
+    report("sebelum: connect_db() per panggilan", measure(legacy_scan, repeat))
+    report("koneksi bersama (db_manager)", measure(pooled_scan, repeat))
+    py1.load_product_catalog()
+    report("cache katalog (tanpa I/O)", measure(catalog_scan, repeat))
+    print(f"  statistik cache katalog: {py1.product_catalog.stats()}")
+
+@benchmark("checkout")
+def bench_checkout(py1, repeat=30):
+    """Latensi checkout terhadap ukuran keranjang: commit per item vs satu transaksi."""
+    ids = seed_products(py1, 500)
+    with py1.db_manager.transaction() as conn:
+        conn.execute("UPDATE products SET stock = 1000000")
+    db_path = os.path.abspath(py1.db_manager.db_path)
+    py1.load_product_catalog()
+
+    def legacy_checkout(cart, timestamp, total):
+        # Salinan perilaku lama: get_product_by_id + update_product_stock per item, lalu insert_sale
+        for prod_id, item_data in cart.items():
+            conn = sqlite3.connect(db_path)
+            stock = conn.execute("SELECT id, name, price, stock FROM products WHERE id = ?", (prod_id,)).fetchone()[3]
+            conn.close()
+            conn = sqlite3.connect(db_path)
+            conn.execute("UPDATE products SET stock = ? WHERE id = ?", (stock - item_data['quantity'], prod_id))
+            conn.commit()
+            conn.close()
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO sales (timestamp, total_amount, payment, change, items) VALUES (?, ?, ?, ?, ?)",
+                     (timestamp, total, total, 0, json.dumps(cart)))
+        conn.commit()
+        conn.close()
+
+    print(f"checkout ({repeat} transaksi per ukuran keranjang)")
+    for basket_size in (1, 10, 40, 100):
+        cart = {pid: {'name': pid, 'price': 1000, 'quantity': 1} for pid in ids[:basket_size]}
+        total = 1000 * basket_size
+        report(f"{basket_size:>3} item - sebelum: commit per item",
+               measure(lambda i: legacy_checkout(cart, "2025-01-01 00:00:00", total), repeat))
+        report(f"{basket_size:>3} item - sesudah: checkout_sale()",
+               measure(lambda i: py1.checkout_sale(cart, "2025-01-01 00:00:00", total, total, 0), repeat))
+
+@benchmark("search")
+def bench_search(py1, repeat=200):
+    """Latensi live search per ketikan pada katalog besar: LIKE '%x%' vs indeks di memori."""
+    ids = seed_products(py1, 50000)
+    conn = py1.connect_db()
+
+    def legacy_search(term):
+        # Salinan query lama: full table scan + sort seluruh hasil
+        return conn.execute("SELECT id, name, price, stock FROM products WHERE id LIKE ? OR name LIKE ? ORDER BY name ASC",
+                            ('%' + term + '%', '%' + term + '%')).fetchall()
+
+    start = time.perf_counter()
+    py1.load_product_catalog()
+    print(f"search ({len(ids)} produk, indeks dibangun dalam {(time.perf_counter() - start) * 1e3:.0f} ms)")
+    terms = ["i", "in", "indo", "indomie goreng", "kopi", "teh melati 1l", "sachet 0123", ids[123], ids[4567][5:11], "xyz"]
+    for term in terms:
+        report(f"{term!r:<18} LIKE '%x%'", measure(lambda i: legacy_search(term), max(5, repeat // 20)))
+        report(f"{term!r:<18} indeks (top {py1.SEARCH_RESULT_LIMIT})",
+               measure(lambda i: py1.get_products_by_search_term(term), repeat))
+
+def write_import_csv(path, existing_ids, row_count):
+    """CSV impor sintetis: separuh baris memperbarui stok produk lama, separuh menambah produk baru."""
+    import csv
+    with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['ID Produk', 'Nama Produk', 'Harga', 'Stok'])
+        for i in range(row_count):
+            if i % 2 == 0:
+                writer.writerow([existing_ids[(i // 2) % len(existing_ids)], '', '', 50 + i % 100])
+            else:
+                writer.writerow([f"777{i:010d}", f"Produk Impor {i:07d}", 1500 + i % 300, 25])
+
+@benchmark("csv_import")
+def bench_csv_import(py1, legacy_rows=3000, rows=30000):
+    """Throughput impor CSV (baris/detik): query + commit per baris vs import_products_csv()."""
+    import csv
+    db_path = os.path.abspath(py1.db_manager.db_path)
+
+    def legacy_import(path):
+        # Salinan perilaku lama: per baris get_product_by_id lalu update/insert dengan commit sendiri
+        with open(path, 'r', newline='', encoding='utf-8') as csvfile:
+            for row in csv.DictReader(csvfile):
+                product_id = row['ID Produk'].strip()
+                conn = sqlite3.connect(db_path)
+                found = conn.execute("SELECT id, name, price, stock FROM products WHERE id = ?", (product_id,)).fetchone()
+                conn.close()
+                conn = sqlite3.connect(db_path)
+                if found:
+                    conn.execute("UPDATE products SET stock = ? WHERE id = ?", (int(row['Stok']), product_id))
+                else:
+                    conn.execute("INSERT INTO products (id, name, price, stock) VALUES (?, ?, ?, ?)",
+                                 (product_id, row['Nama Produk'], float(row['Harga']), int(row['Stok'])))
+                conn.commit()
+                conn.close()
+
+    print(f"csv_import (katalog awal 20000 produk)")
+    for label, row_count, run in (("sebelum: commit per baris", legacy_rows, legacy_import),
+                                  ("sesudah: import_products_csv()", rows, py1.import_products_csv)):
+        ids = seed_products(py1, 20000)
+        py1.load_product_catalog()
+        path = os.path.abspath(f"import_{row_count}.csv")
+        write_import_csv(path, ids, row_count)
+        start = time.perf_counter()
+        run(path)
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<44} {row_count:>6} baris dalam {elapsed:6.2f} s   {row_count / elapsed:9.0f} baris/s")
+
+@benchmark("sales_totals")
+def bench_sales_totals(py1, sales=50000, repeat=5):
+    """Total penjualan per produk: parsing JSON setiap transaksi di Python vs agregasi SQL di sale_items."""
+    import random
+    ids = seed_products(py1, 2000)
+    rng = random.Random(42)
+    with py1.db_manager.transaction() as conn:
+        conn.execute("DELETE FROM sale_items")
+        conn.execute("DELETE FROM sales")
+        for i in range(sales):
+            cart = {pid: {'name': pid, 'price': 1500, 'quantity': rng.randint(1, 5)} for pid in rng.sample(ids, 4)}
+            total = sum(item['price'] * item['quantity'] for item in cart.values())
+            # Simpan juga JSON lama agar pembanding Python punya data yang sama
+            sale_id = py1._insert_sale_rows(conn, f"2025-01-01 {i % 24:02d}:00:00", total, total, 0, cart)
+            conn.execute("UPDATE sales SET items = ? WHERE id = ?", (json.dumps(cart), sale_id))
+    conn = py1.connect_db()
+
+    def legacy_totals(i):
+        totals = {}
+        for (items,) in conn.execute("SELECT items FROM sales"):
+            for prod_id, item in json.loads(items).items():
+                quantity, revenue = totals.get(prod_id, (0, 0))
+                totals[prod_id] = (quantity + item['quantity'], revenue + item['price'] * item['quantity'])
+        return sorted(totals.items(), key=lambda kv: -kv[1][0])
+
+    print(f"sales_totals ({sales} transaksi, 4 item per transaksi)")
+    report("sebelum: json.loads per transaksi", measure(legacy_totals, repeat))
+    report("sesudah: GROUP BY di sale_items", measure(lambda i: py1.get_product_sales_totals(), repeat))
+
+@benchmark("sales_report")
+def bench_sales_report(py1, sales=200000, repeat=5):
+    """Laporan 12 bulan (per hari + produk terlaris): scan sales/sale_items vs tabel rollup."""
+    import random
+    from datetime import datetime, timedelta
+    ids = seed_products(py1, 2000)
+    rng = random.Random(7)
+    start = datetime(2025, 1, 1, 8)
+    with py1.db_manager.transaction() as conn:
+        for table in ("sale_items", "sales", "daily_sales_summary", "daily_product_summary"):
+            conn.execute(f"DELETE FROM {table}")
+        for i in range(sales):
+            timestamp = (start + timedelta(minutes=i * 365 * 24 * 60 // sales)).strftime("%Y-%m-%d %H:%M:%S")
+            cart = {pid: {'name': pid, 'price': 1500, 'quantity': rng.randint(1, 5)} for pid in rng.sample(ids, 3)}
+            total = sum(item['price'] * item['quantity'] for item in cart.values())
+            py1._insert_sale_rows(conn, timestamp, total, total, 0, cart)
+    conn = py1.connect_db()
+
+    def scan_report(i):
+        daily = conn.execute("""SELECT substr(timestamp, 1, 10), COUNT(*), SUM(total_amount) FROM sales
+                                WHERE timestamp >= '2025-01-01' AND timestamp < '2025-12-31 ~' GROUP BY 1""").fetchall()
+        top = conn.execute("""SELECT si.product_id, SUM(si.quantity), SUM(si.subtotal) FROM sale_items si
+                              JOIN sales s ON s.id = si.sale_id
+                              WHERE s.timestamp >= '2025-01-01' AND s.timestamp < '2025-12-31 ~'
+                              GROUP BY si.product_id ORDER BY 2 DESC LIMIT 20""").fetchall()
+        return daily, top
+
+    def rollup_report(i):
+        return py1.get_daily_sales("2025-01-01", "2025-12-31"), py1.get_top_products("2025-01-01", "2025-12-31", limit=20)
+
+    rows = conn.execute("SELECT COUNT(*) FROM daily_sales_summary").fetchone()[0]
+    print(f"sales_report ({sales} transaksi dalam 12 bulan, {rows} baris daily_sales_summary)")
+    report("sebelum: agregasi dari sales + sale_items", measure(scan_report, repeat))
+    report("sesudah: tabel rollup", measure(rollup_report, repeat))
+
+class StandInPrinter:
+    """Printer TCP pengganti (port acak di localhost) yang butuh `delay` detik per struk."""
+    def __init__(self, delay=0.05):
+        import socket
+        import threading
+        self.delay = delay
+        self.received = []
+        self._server = socket.socket()
+        self._server.bind(("127.0.0.1", 0))
+        self._server.listen()
+        self.port = self._server.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            with conn:
+                chunks = []
+                while True:
+                    data = conn.recv(65536)
+                    if not data:
+                        break
+                    chunks.append(data)
+                time.sleep(self.delay) # Waktu mencetak + memotong kertas, lalu koneksi ditutup
+                self.received.append(b"".join(chunks))
+
+    def close(self):
+        self._server.close()
+
+class FlakyBackend:
+    """Membungkus backend: `failures` pengiriman pertama gagal seperti printer offline."""
+    def __init__(self, backend, failures):
+        self.backend = backend
+        self.failures = failures
+        self.description = backend.description
+
+    def send(self, data):
+        if self.failures > 0:
+            self.failures -= 1
+            raise OSError("printer offline")
+        self.backend.send(data)
+
+@benchmark("print")
+def bench_print(py1, receipts=20, print_delay=0.05):
+    """Waktu checkout tertahan oleh pencetakan: kirim sinkron ke printer vs masuk antrean spooler."""
+    printer = StandInPrinter(delay=print_delay)
+    backend = py1.TcpPrinterBackend("127.0.0.1", printer.port)
+    receipt = ("Toko GRAND\n" + "Indomie Goreng 85g\n   2 x Rp3.500 = Rp7.000\n" * 10).encode("utf-8")
+
+    print(f"print ({receipts} struk, printer TCP pengganti {print_delay * 1e3:.0f} ms per struk, 2 kegagalan awal)")
+    report("sebelum: kirim sinkron di thread Tk", measure(lambda i: backend.send(receipt), receipts))
+
+    events = []
+    spooler = py1.PrintSpooler(FlakyBackend(backend, failures=2), spool_dir=os.path.abspath("bench_spool"),
+                               on_event=lambda kind, name, detail: events.append(kind), initial_backoff=0.05)
+    report("sesudah: PrintSpooler.submit()", measure(lambda i: spooler.submit(receipt), receipts))
+    start = time.perf_counter()
+    spooler.wait_idle(timeout=30)
+    print(f"  antrean habis {time.perf_counter() - start:.2f} s setelah submit terakhir; metrik: {spooler.stats()}")
+    spooler.stop()
+    printer.close()
+
+def legacy_receipt_text(py1, cart_items, total, timestamp):
+    """Salinan cara lama print_receipt menyusun struk: += per baris, format_currency_id berulang."""
+    LINE_WIDTH = 32
+    ADDRESS_LINE_1 = "Jl. Moh Saleh Bantilan"
+    ADDRESS_LINE_2 = "(Depan Pasar Sandana)"
+    receipt_content = f"--------------------------------\n"
+    receipt_content += f"{'Toko GRAND':^{LINE_WIDTH}}\n"
+    receipt_content += f"{ADDRESS_LINE_1:^{LINE_WIDTH}}\n"
+    receipt_content += f"{ADDRESS_LINE_2:^{LINE_WIDTH}}\n"
+    receipt_content += f"{timestamp:^{LINE_WIDTH}}\n"
+    receipt_content += "\n\n"
+    receipt_content += f"--------------------------------\n"
+    for prod_id, item_data in cart_items.items():
+        name = item_data['name']
+        price = item_data['price']
+        quantity = item_data['quantity']
+        subtotal = price * quantity
+        receipt_content += f"{name}\n"
+        qty_price_subtotal_line = (
+            f"{quantity} x {py1.format_currency_id(price, include_decimals=False)} = {py1.format_currency_id(subtotal, include_decimals=False)}"
+        )
+        receipt_content += f"{qty_price_subtotal_line:>{LINE_WIDTH}}\n"
+    receipt_content += "\n"
+    receipt_content += f"--------------------------------\n"
+    receipt_content += f"{'TOTAL: ' + py1.format_currency_id(total, include_decimals=False):>{LINE_WIDTH}}\n"
+    receipt_content += f"--------------------------------\n"
+    receipt_content += f"{'Terima Kasih!':^{LINE_WIDTH}}\n"
+    receipt_content += f"--------------------------------\n"
+    receipt_content += "\n\n\n\n\n"
+    return receipt_content
+
+@benchmark("receipt")
+def bench_receipt(py1, lines=100, repeat=2000):
+    """Waktu menyusun struk untuk keranjang 100 baris: += per baris vs ReceiptRenderer."""
+    import receipt
+    cart = {f"899{i:010d}": {'name': product_name(i), 'price': 1000 + i * 250, 'quantity': 1 + i % 4} for i in range(lines)}
+    total = sum(item['price'] * item['quantity'] for item in cart.values())
+    timestamp = "2025-01-01 12:00:00"
+    renderer = receipt.ReceiptRenderer(receipt.receipt_layout('58mm'))
+    assert renderer.render_text(cart, total, timestamp) == legacy_receipt_text(py1, cart, total, timestamp)
+
+    print(f"receipt ({lines} baris item, kertas 58mm)")
+    report("sebelum: += dan format_currency_id", measure(lambda i: legacy_receipt_text(py1, cart, total, timestamp), repeat))
+    report("sesudah: ReceiptRenderer.render_text()", measure(lambda i: renderer.render_text(cart, total, timestamp), repeat))
+    report("sesudah: ReceiptRenderer.render_escpos()", measure(lambda i: renderer.render_escpos(cart, total, timestamp), repeat))
+
+def legacy_format_currency_id(amount, include_decimals=True):
+    """Salinan format_currency_id lama: float, '{:,.0f}'.format dan tiga replace berantai."""
+    if not isinstance(amount, (int, float)):
+        try:
+            amount = float(amount)
+        except (ValueError, TypeError):
+            return "Rp0,00" if include_decimals else "Rp0"
+    integer_part = int(amount)
+    formatted_integer = "{:,.0f}".format(integer_part).replace(",", "#").replace(".", ",").replace("#", ".")
+    if include_decimals:
+        decimal_part = int(round((amount - integer_part) * 100))
+        return f"Rp{formatted_integer},{decimal_part:02d}"
+    else:
+        return f"Rp{formatted_integer}"
+
+@benchmark("currency")
+def bench_currency(py1, calls=200000):
+    """Biaya format harga per baris Treeview/struk: format_currency_id lama vs rupiah bulat + lru_cache."""
+    import random
+    rng = random.Random(3)
+    # Katalog toko punya beberapa ribu harga berbeda yang terus berulang di setiap refresh
+    prices = [rng.randrange(500, 500000, 500) for _ in range(2000)]
+    stream = [prices[rng.randrange(len(prices))] for _ in range(calls)]
+
+    def run(formatter):
+        def format_all(i):
+            for price in stream:
+                formatter(price, include_decimals=False)
+                formatter(price)
+        return format_all
+
+    print(f"currency ({calls} harga dari {len(prices)} nilai berbeda, dengan dan tanpa desimal)")
+    report("sebelum: per 2 x 200k panggilan", measure(run(legacy_format_currency_id), 3))
+    py1.format_currency_id.cache_clear()
+    report("sesudah: per 2 x 200k panggilan", measure(run(py1.format_currency_id), 3))
+    print(f"  cache: {py1.format_currency_id.cache_info()}")
+
+@benchmark("stock_ledger")
+def bench_stock_ledger(py1, movements=500000, repeat=200):
+    """Stok pada tanggal tertentu: menjumlah seluruh riwayat vs satu pencarian indeks pada stock_after."""
+    import random
+    from datetime import datetime, timedelta
+    ids = seed_products(py1, 2000)
+    rng = random.Random(11)
+    start = datetime(2025, 1, 1)
+    stock = dict.fromkeys(ids, 0)
+    rows = []
+    for i in range(movements):
+        pid = ids[rng.randrange(len(ids))]
+        change = rng.randint(1, 50) if stock[pid] < 20 else -rng.randint(1, 5)
+        stock[pid] += change
+        timestamp = (start + timedelta(seconds=i * 60)).strftime("%Y-%m-%d %H:%M:%S")
+        rows.append((pid, timestamp, 'sale' if change < 0 else 'receipt', change, stock[pid], None))
+    with py1.db_manager.transaction() as conn:
+        conn.execute("DELETE FROM stock_movements")
+        conn.executemany("""INSERT INTO stock_movements (product_id, timestamp, reason, quantity_change, stock_after, reference)
+                            VALUES (?, ?, ?, ?, ?, ?)""", rows)
+    conn = py1.connect_db()
+    as_of = rows[len(rows) // 2][1]
+
+    def replay(i):
+        return conn.execute("SELECT SUM(quantity_change) FROM stock_movements WHERE product_id = ? AND timestamp <= ?",
+                            (ids[i % len(ids)], as_of)).fetchone()[0]
+
+    print(f"stock_ledger ({movements} pergerakan, {len(ids)} produk, stok per {as_of})")
+    report("satu produk - menjumlah riwayat", measure(replay, repeat))
+    report("satu produk - get_stock_as_of()", measure(lambda i: py1.get_stock_as_of(ids[i % len(ids)], as_of), repeat))
+    report("semua produk - GROUP BY seluruh riwayat",
+           measure(lambda i: conn.execute("""SELECT product_id, SUM(quantity_change) FROM stock_movements
+                                             WHERE timestamp <= ? GROUP BY product_id""", (as_of,)).fetchall(), 5))
+    report("semua produk - get_all_stock_as_of()", measure(lambda i: py1.get_all_stock_as_of(as_of), 5))
+
+def start_pos_server(db_path, port=0):
+    """Menjalankan pos_server.py (port 0 = port bebas); mengembalikan (proses, port)."""
+    import subprocess
+    process = subprocess.Popen([sys.executable, os.path.join(HERE, "pos_server.py"), "--port", str(port), "--db", db_path],
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    for line in process.stdout:
+        if line.startswith("Server POS berjalan di"):
+            return process, int(line.rsplit(":", 1)[1])
+    raise RuntimeError("pos_server.py berhenti sebelum siap.")
+
+class BenchTill:
+    """Satu kasir: cache katalog sendiri (dict) yang diperbarui push, checkout lewat server."""
+    def __init__(self, port):
+        import threading
+        from pos_client import PosServerClient
+        self.lock = threading.Lock()
+        self.pushes = 0
+        self.client = PosServerClient("127.0.0.1", port, on_push=self.on_push)
+        self.client.subscribe()
+        snapshot = self.client.call('catalog')
+        self.version = snapshot['version']
+        self.catalog = {row[0]: row for row in snapshot['products']}
+
+    def on_push(self, message):
+        with self.lock:
+            if message['version'] <= self.version:
+                return
+            self.version = message['version']
+            self.pushes += 1
+            for row in message['changed']:
+                self.catalog[row[0]] = row
+            for product_id in message['removed']:
+                self.catalog.pop(product_id, None)
+
+@benchmark("multi_till")
+def bench_multi_till(py1, tills=10, baskets=60, hot_products=20, hot_stock=40):
+    """10 kasir men-scan dan checkout bersamaan lewat pos_server: latensi, throughput, dan tidak ada oversell."""
+    import random
+    import threading
+    ids = seed_products(py1, 5000)
+    hot = ids[:hot_products]
+    with py1.db_manager.transaction() as conn:
+        # Produk laris dengan stok terbatas: checkout dari banyak kasir berebut stok yang sama
+        conn.executemany("UPDATE products SET stock = ? WHERE id = ?", [(hot_stock, pid) for pid in hot])
+    initial_stock = dict(py1.connect_db().execute("SELECT id, stock FROM products"))
+    py1.db_manager.close_all()
+
+    process, port = start_pos_server(os.path.abspath(py1.DB_PATH))
+    try:
+        till_list = [BenchTill(port) for _ in range(tills)]
+        scan_samples, checkout_samples = [], []
+        sold, rejected = {}, []
+        results_lock = threading.Lock()
+
+        def run_till(number, till):
+            rng = random.Random(number)
+            local_scans, local_checkouts = [], []
+            for basket in range(baskets):
+                cart = {}
+                for _ in range(rng.randint(3, 8)):
+                    product_id = rng.choice(hot) if rng.random() < 0.3 else rng.choice(ids)
+                    start = time.perf_counter()
+                    with till.lock:
+                        row = till.catalog.get(product_id) # Scan dilayani dari cache lokal
+                    local_scans.append(time.perf_counter() - start)
+                    item = cart.setdefault(product_id, {'name': row[1], 'price': row[2], 'quantity': 0})
+                    item['quantity'] += 1
+                total = sum(item['price'] * item['quantity'] for item in cart.values())
+                start = time.perf_counter()
+                success, message = till.client.call('checkout', cart=cart, timestamp=f"2026-01-01 10:{number:02d}:{basket % 60:02d}",
+                                                    total_amount=total, payment=total, change=0)
+                local_checkouts.append(time.perf_counter() - start)
+                with results_lock:
+                    if success:
+                        for product_id, item in cart.items():
+                            sold[product_id] = sold.get(product_id, 0) + item['quantity']
+                    else:
+                        rejected.append(message)
+            with results_lock:
+                scan_samples.extend(local_scans)
+                checkout_samples.extend(local_checkouts)
+
+        threads = [threading.Thread(target=run_till, args=(number, till)) for number, till in enumerate(till_list)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        # Pipelining: 500 lookup beruntun menunggu jawaban satu per satu vs dikirim sekaligus
+        probe = till_list[0].client
+        sequential = measure(lambda i: probe.call('get_product', product_id=ids[i]), 500)
+        start = time.perf_counter()
+        futures = [probe.submit('get_product', product_id=ids[i]) for i in range(500)]
+        for future in futures:
+            future.result(10)
+        pipelined = (time.perf_counter() - start) / 500
+
+        time.sleep(0.2) # Push terakhir sampai di semua kasir
+        final_stock = {row[0]: row[3] for row in till_list[0].client.call('catalog')['products']}
+        for till in till_list:
+            till.client.close()
+    finally:
+        process.terminate()
+        process.wait()
+
+    checkouts = tills * baskets
+    print(f"multi_till ({tills} kasir x {baskets} keranjang, {len(ids)} produk, {hot_products} produk laris stok {hot_stock})")
+    report("scan dari cache katalog kasir", scan_samples)
+    report("checkout lewat server (serialisasi stok)", checkout_samples)
+    print(f"  throughput: {checkouts / elapsed:.0f} checkout/s, {checkouts - len(rejected)} berhasil, {len(rejected)} ditolak karena stok habis")
+    print(f"  get_product: beruntun {statistics.mean(sequential) * 1e6:.1f} us/permintaan, pipelined {pipelined * 1e6:.1f} us/permintaan")
+    wrong = [pid for pid in initial_stock if final_stock[pid] != initial_stock[pid] - sold.get(pid, 0)]
+    negative = [pid for pid, stock in final_stock.items() if stock < 0]
+    stale = sum(1 for till in till_list for pid, row in till.catalog.items() if row[3] != final_stock[pid])
+    print(f"  stok akhir: {len(wrong)} selisih, {len(negative)} negatif; cache kasir basi: {stale} baris "
+          f"(push diterima per kasir: {min(till.pushes for till in till_list)}-{max(till.pushes for till in till_list)})")
+
+@benchmark("reservations")
+def bench_reservations(py1, tills=10, attempts=200, hot_stock=25):
+    """Reservasi stok: biaya per scan di memori, lalu 10 kasir berebut unit terakhir lewat server (tidak boleh oversell)."""
+    import threading
+    from pos_client import PosServerClient
+    ids = seed_products(py1, 5000)
+    hot = ids[0]
+    with py1.db_manager.transaction() as conn:
+        conn.execute("UPDATE products SET stock = ? WHERE id = ?", (hot_stock, hot))
+    py1.load_product_catalog()
+
+    session = py1.CheckoutSession()
+    for pid in ids[:200]:
+        session.scan(pid) # Keranjang 200 baris
+    local_reserve = measure(lambda i: py1.stock_reservations.reserve(session.owner, ids[i % 200], 1 if i % 2 == 0 else -1), 20000)
+    local_available = measure(lambda i: py1.stock_reservations.available(ids[i % 5000]), 20000)
+    session.clear()
+    py1.db_manager.close_all()
+
+    process, port = start_pos_server(os.path.abspath(py1.DB_PATH))
+    try:
+        clients = [PosServerClient("127.0.0.1", port) for _ in range(tills)]
+        granted, samples = [0] * tills, [[] for _ in range(tills)]
+        barrier = threading.Barrier(tills)
+
+        def run_till(number):
+            barrier.wait()
+            for _ in range(attempts // tills):
+                start = time.perf_counter()
+                success, _ = clients[number].call('reserve', owner=f"kasir-{number}", product_id=hot, quantity=1)
+                samples[number].append(time.perf_counter() - start)
+                granted[number] += success
+
+        threads = [threading.Thread(target=run_till, args=(number,)) for number in range(tills)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        held_after_race = clients[0].call('reserve', owner="probe", product_id=hot, quantity=1)
+        for number in range(tills):
+            clients[number].call('release_reservations', owner=f"kasir-{number}")
+        after_release = clients[0].call('reserve', owner="probe", product_id=hot, quantity=hot_stock)
+        for client in clients:
+            client.close()
+    finally:
+        process.terminate()
+        process.wait()
+
+    print(f"reservations (keranjang 200 baris; {tills} kasir x {attempts // tills} percobaan atas 1 produk stok {hot_stock})")
+    report("reserve/lepas 1 unit di memori", local_reserve)
+    report("stok tersedia (tanpa query database)", local_available)
+    report("reserve lewat server (10 kasir bersamaan)", [sample for till_samples in samples for sample in till_samples])
+    print(f"  unit yang berhasil dipegang: {sum(granted)} dari stok {hot_stock} (per kasir: {granted})")
+    print(f"  setelah semua unit dipegang, reserve tambahan: {held_after_race}; "
+          f"setelah keranjang dilepas, reserve {hot_stock} unit: {after_release}")
+
+def wait_until(condition, timeout=30.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise RuntimeError("Waktu tunggu habis.")
+        time.sleep(0.01)
+
+@benchmark("outbox")
+def bench_outbox(py1, checkouts=200, offline_checkouts=50):
+    """Checkout kasir: menunggu server vs outbox lokal; server mati di tengah jalan, konflik stok, dan kirim ulang idempoten."""
+    import random
+    ids = seed_products(py1, 2000)
+    hot = ids[0]
+    with py1.db_manager.transaction() as conn:
+        conn.execute("UPDATE products SET stock = 5 WHERE id = ?", (hot,))
+        # Database dipakai bersama benchmark lain yang sudah menyimpan penjualan; yang dihitung selisihnya
+        initial_sales = conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+    db_path = os.path.abspath(py1.DB_PATH)
+    py1.db_manager.close_all()
+    rng = random.Random(16)
+
+    def random_cart():
+        cart = {}
+        for product_id in rng.sample(ids[1:], rng.randint(2, 6)):
+            record = py1.product_catalog.peek(product_id)
+            cart[product_id] = {'name': record.name, 'price': record.price, 'quantity': rng.randint(1, 3)}
+        return cart
+
+    def checkout(cart):
+        total = sum(item['price'] * item['quantity'] for item in cart.values())
+        success, message = py1.checkout_sale(cart, py1.current_timestamp(), total, total, 0)
+        assert success, message
+
+    process, port = start_pos_server(db_path)
+    events = []
+    try:
+        py1.connect_to_server(f"127.0.0.1:{port}", on_outbox_event=lambda kind, detail: events.append(kind))
+        online = measure(lambda i: py1._call_server('checkout', cart=random_cart(), timestamp=py1.current_timestamp(),
+                                                    total_amount=0, payment=0, change=0), checkouts)
+        queued = measure(lambda i: checkout(random_cart()), checkouts)
+        wait_until(lambda: py1.sale_outbox.counts()['pending'] == 0)
+
+        # Server mati: checkout tetap jalan, termasuk 4 dari 5 stok produk laris
+        process.terminate()
+        process.wait()
+        hot_record = py1.product_catalog.peek(hot)
+        checkout({hot: {'name': hot_record.name, 'price': hot_record.price, 'quantity': 4}})
+        offline = measure(lambda i: checkout(random_cart()), offline_checkouts)
+        wait_until(lambda: 'offline' in events)
+
+        # Server hidup lagi; kasir lain lebih dulu menjual 3 stok produk laris -> penjualan offline bentrok
+        process, port = start_pos_server(db_path, port)
+        from pos_client import PosServerClient
+        other_till = PosServerClient("127.0.0.1", port)
+        success, _ = other_till.call('checkout', cart={hot: {'name': hot_record.name, 'price': hot_record.price, 'quantity': 3}},
+                                     timestamp=py1.current_timestamp(), total_amount=0, payment=0, change=0)
+        assert success
+        start = time.perf_counter()
+        py1.outbox_syncer._wake.set()
+        wait_until(lambda: py1.sale_outbox.counts()['pending'] == 0)
+        catch_up = time.perf_counter() - start
+
+        # Batch yang sama dikirim ulang (mis. jawaban server hilang): tidak boleh tercatat dua kali
+        sales_before = other_till.call('catalog')['products']
+        resent = py1.sale_outbox.db.connection().execute("SELECT uid, kind, payload FROM outbox ORDER BY seq").fetchall()
+        results = other_till.call('sync_outbox', entries=[{'uid': uid, 'kind': kind, 'payload': json.loads(payload)}
+                                                          for uid, kind, payload in resent])
+        assert other_till.call('catalog')['products'] == sales_before
+        other_till.close()
+        counts = py1.sale_outbox.counts()
+        conflicts = py1.sale_outbox.entries(statuses=('conflict',))
+        py1.disconnect_from_server()
+    finally:
+        process.terminate()
+        process.wait()
+
+    with sqlite3.connect(db_path) as conn:
+        sales = conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0] - initial_sales
+        hot_stock = conn.execute("SELECT stock FROM products WHERE id = ?", (hot,)).fetchone()[0]
+    expected_sales = checkouts * 2 + offline_checkouts + 2
+    assert sales == expected_sales, f"penjualan baru di server {sales}, seharusnya {expected_sales}"
+    print(f"outbox ({checkouts} checkout online, {offline_checkouts + 1} saat server mati)")
+    report("sebelum: checkout menunggu server", online)
+    report("sesudah: outbox lokal (COMMIT + fsync)", queued)
+    report("outbox saat server mati", offline)
+    print(f"  server hidup lagi: {offline_checkouts + 1} entri tersinkron dalam {catch_up * 1e3:.0f} ms; status outbox {counts}")
+    print(f"  konflik: {[detail for *_, detail in conflicts]} (stok produk laris di server: {hot_stock})")
+    print(f"  kirim ulang {len(results)} entri: server mengembalikan hasil tersimpan, "
+          f"penjualan baru di server {sales} (seharusnya {expected_sales})")
+
+def barcode_stream(ids, count, rng, unknown_rate=0.02):
+    """Barcode sintetis: popularitas condong ke sebagian kecil produk, sebagian kecil barcode tidak dikenal."""
+    size = len(ids)
+    for _ in range(count):
+        if rng.random() < unknown_rate:
+            yield f"200{rng.randrange(10**10):010d}" # Barcode toko lain / salah baca
+        else:
+            yield ids[int(size * rng.random() ** 3)]
+
+@benchmark("scan_throughput")
+def bench_scan_throughput(py1, sizes=(1000, 50000, 500000), scans=20000):
+    """Replay aliran barcode lewat CheckoutSession (logika process_product_id_input tanpa Tk) untuk 1k/50k/500k SKU."""
+    import random
+    print(f"scan_throughput ({scans} scan per katalog, keranjang 5-30 item, 2% barcode tidak dikenal)")
+    for size in sizes:
+        ids = seed_products(py1, size)
+        with py1.db_manager.transaction() as conn:
+            conn.execute("UPDATE products SET stock = 1000000")
+        start = time.perf_counter()
+        py1.load_product_catalog()
+        report(f"{size} SKU: muat katalog", [time.perf_counter() - start])
+
+        rng = random.Random(size)
+        session = py1.CheckoutSession()
+        scan_samples, checkout_samples = [], []
+        basket_left = rng.randint(5, 30)
+        started = time.perf_counter()
+        for barcode in barcode_stream(ids, scans, rng):
+            start = time.perf_counter()
+            session.scan(barcode)
+            scan_samples.append(time.perf_counter() - start)
+            basket_left -= 1
+            if basket_left == 0:
+                start = time.perf_counter()
+                success, message = session.checkout()
+                checkout_samples.append(time.perf_counter() - start)
+                assert success, message
+                basket_left = rng.randint(5, 30)
+        elapsed = time.perf_counter() - started
+        report(f"{size} SKU: scan", scan_samples)
+        report(f"{size} SKU: checkout", checkout_samples)
+        print(f"  {size} SKU: {scans / elapsed:,.0f} scan/s termasuk checkout ({len(checkout_samples)} transaksi)")
+    py1.product_catalog.load([])
+
+@benchmark("instrumentation")
+def bench_instrumentation(py1, scans=100000):
+    """Biaya pengukuran @timed per scan: fungsi asli vs pengukuran nonaktif vs aktif."""
+    import random
+    import diagnostics
+    ids = seed_products(py1, 50000)
+    with py1.db_manager.transaction() as conn:
+        conn.execute("UPDATE products SET stock = 1000000")
+    py1.load_product_catalog()
+    barcodes = list(barcode_stream(ids, scans, random.Random(18)))
+
+    def run_scans():
+        session = py1.CheckoutSession()
+        start = time.perf_counter()
+        for i, barcode in enumerate(barcodes):
+            session.scan(barcode)
+            if i % 20 == 19:
+                session.clear() # Tanpa checkout: yang diukur hanya jalur scan
+        return (time.perf_counter() - start) / len(barcodes)
+
+    timed_lookup = py1.get_product_by_id
+    was_enabled = diagnostics.enabled
+    try:
+        py1.get_product_by_id = timed_lookup.__wrapped__
+        baseline = min(run_scans() for _ in range(3))
+        py1.get_product_by_id = timed_lookup
+        diagnostics.set_enabled(False)
+        disabled = min(run_scans() for _ in range(3))
+        diagnostics.set_enabled(True)
+        diagnostics.reset()
+        active = min(run_scans() for _ in range(3))
+        recorded = diagnostics.histogram("db.get_product_by_id").summary()
+    finally:
+        py1.get_product_by_id = timed_lookup
+        diagnostics.set_enabled(was_enabled)
+
+    print(f"instrumentation ({scans} scan, 50000 produk, rata-rata per scan)")
+    for label, value in (("tanpa dekorator", baseline), ("@timed, pengukuran nonaktif", disabled), ("@timed, pengukuran aktif", active)):
+        print(f"  {label:<44} {value * 1e6:7.2f} us  ({(value / baseline - 1) * 100:+5.1f}%)")
+        RESULTS.setdefault(current_benchmark, {})[label] = {'mean_us': round(value * 1e6, 3)}
+    print(f"  histogram db.get_product_by_id: {recorded}")
+
+class StandInTree:
+    """Pengganti Treeview yang menghitung panggilan ke Tk (tiap panggilan = satu round-trip Tcl)."""
+    def __init__(self):
+        self.rows = {} # {item id: {'text', 'values'}}
+        self.order = [] # Item id sesuai urutan tampilan
+        self.selected = ()
+        self.calls = 0
+        self._next_id = 0
+
+    def insert(self, parent, index, text="", values=()):
+        self.calls += 1
+        self._next_id += 1
+        item_id = f"I{self._next_id:05d}"
+        self.rows[item_id] = {'text': text, 'values': values}
+        self.order.insert(len(self.order) if index == "end" else index, item_id)
+        return item_id
+
+    def item(self, item_id, values=None):
+        self.calls += 1
+        if values is None:
+            return dict(self.rows[item_id])
+        self.rows[item_id]['values'] = values
+
+    def delete(self, *item_ids):
+        self.calls += 1
+        for item_id in item_ids:
+            del self.rows[item_id]
+            self.order.remove(item_id)
+
+    def get_children(self):
+        self.calls += 1
+        return tuple(self.order)
+
+    def ordered_values(self):
+        return [self.rows[item_id]['values'] for item_id in self.order]
+
+    def configure(self, **options):
+        self.calls += 1
+
+    def heading(self, column, **options):
+        self.calls += 1
+
+    def after_idle(self, func):
+        func()
+
+    def selection(self):
+        self.calls += 1
+        return self.selected
+
+    def selection_set(self, item_id):
+        self.calls += 1
+        self.selected = (item_id,)
+
+    def focus(self, item_id):
+        self.calls += 1
+
+class StandInLabel:
+    def config(self, **kwargs):
+        pass
+
+def legacy_update_cart_display_and_total(app, format_currency_id):
+    """update_cart_display_and_total sebelum kelas Cart: baca semua baris Treeview lalu tulis ulang semuanya."""
+    selected_prod_id = None
+    if app.cart_tree.selection():
+        selected_prod_id = str(app.cart_tree.item(app.cart_tree.selection()[0])['text']).strip()
+    tree_items_map = {str(app.cart_tree.item(item_id)['text']).strip(): item_id for item_id in app.cart_tree.get_children()}
+    app.total = 0
+    newly_selected_item_id = None
+    for prod_id, item_data in app.cart.items():
+        subtotal = item_data['price'] * item_data['quantity']
+        app.total += subtotal
+        values = (item_data['name'], format_currency_id(item_data['price'], include_decimals=False),
+                  item_data['quantity'], format_currency_id(subtotal, include_decimals=False))
+        if prod_id in tree_items_map:
+            item_id = tree_items_map.pop(prod_id)
+            app.cart_tree.item(item_id, values=values)
+        else:
+            item_id = app.cart_tree.insert("", "end", text=prod_id, values=values)
+        if prod_id == selected_prod_id:
+            newly_selected_item_id = item_id
+    for item_id in tree_items_map.values():
+        app.cart_tree.delete(item_id)
+    app.total_label.config(text=format_currency_id(app.total, include_decimals=False))
+    if newly_selected_item_id:
+        app.cart_tree.selection_set(newly_selected_item_id)
+        app.cart_tree.focus(newly_selected_item_id)
+    elif app.cart_tree.get_children():
+        app.cart_tree.selection_set(app.cart_tree.get_children()[0])
+        app.cart_tree.focus(app.cart_tree.get_children()[0])
+
+@benchmark("cart")
+def bench_cart(py1, sizes=(50, 200, 500), rescans=200):
+    """Biaya render keranjang per scan untuk keranjang 50/200/500 baris: render ulang penuh vs hanya baris yang berubah."""
+    import random
+    from types import SimpleNamespace
+    ids = seed_products(py1, max(sizes))
+    py1.load_product_catalog()
+    records = [py1.product_catalog.peek(pid) for pid in ids]
+    update = getattr(py1.POSApp.update_cart_display_and_total, '__wrapped__', py1.POSApp.update_cart_display_and_total)
+    print(f"cart (render per scan; {rescans} scan ulang produk yang sudah ada di keranjang)")
+    for size in sizes:
+        rng = random.Random(size)
+        rescan_order = [rng.randrange(size) for _ in range(rescans)]
+
+        legacy = SimpleNamespace(cart={}, total=0, cart_tree=StandInTree(), total_label=StandInLabel())
+        def legacy_scan(index):
+            pid, name, price, _ = records[index]
+            line = legacy.cart.setdefault(pid, {'name': name, 'price': price, 'quantity': 0})
+            line['quantity'] += 1
+            legacy_update_cart_display_and_total(legacy, py1.format_currency_id)
+
+        session = py1.CheckoutSession()
+        app = SimpleNamespace(cart=session.cart, total=0, cart_rows={}, cart_tree=StandInTree(), total_label=StandInLabel())
+        def incremental_scan(index):
+            pid, name, price, _ = records[index]
+            session.cart.add(pid, name, price)
+            app.total = session.total
+            update(app)
+
+        for label, scan, target in (("render ulang penuh", legacy_scan, legacy), ("hanya baris berubah (Cart)", incremental_scan, app)):
+            measure(scan, size) # Isi keranjang sampai `size` baris
+            target.cart_tree.calls = 0
+            samples = measure(lambda i: scan(rescan_order[i]), rescans)
+            report(f"{size} baris, {label}", samples)
+            print(f"    {target.cart_tree.calls / rescans:.1f} panggilan Treeview per scan")
+        assert legacy.total == session.total, (legacy.total, session.total)
+        assert legacy.cart_tree.ordered_values() == app.cart_tree.ordered_values()
+    py1.product_catalog.load([])
+
+def legacy_schema_setup(py1):
+    """Urutan inisialisasi skema sebelum ensure_schema(): semua CREATE/ALTER dan cek versi migrasi di setiap startup."""
+    py1.create_tables()
+    conn = py1.connect_db()
+    try:
+        conn.execute("ALTER TABLE products ADD COLUMN stock INTEGER DEFAULT 0")
+    except sqlite3.OperationalError:
+        pass # Kolom sudah ada (dulu dicocokkan dari pesan error)
+    for _ in range(4): # Setiap migrasi lama membaca PRAGMA user_version sendiri
+        conn.execute("PRAGMA user_version").fetchone()
+
+@benchmark("startup")
+def bench_startup(py1, products=50000, runs=5):
+    """Cold start: impor py1 di proses baru, langkah skema, muat katalog, dan pembangunan UI (jika ada display)."""
+    import subprocess
+    seed_products(py1, products)
+    db_path = os.path.abspath(py1.DB_PATH)
+    py1.db_manager.close_all()
+
+    probe = ("import time, json; started = time.perf_counter(); import py1, diagnostics; imported = time.perf_counter() - started; "
+             "started = time.perf_counter(); py1.load_product_catalog(); catalog = time.perf_counter() - started; "
+             "started = time.perf_counter(); py1.load_product_catalog(index_in_background=True); scan_ready = time.perf_counter() - started; "
+             "print(json.dumps({'import': imported, 'schema': diagnostics.histogram('startup.schema').total, "
+             "'catalog': catalog, 'scan_ready': scan_ready}))")
+    samples = {'import': [], 'schema': [], 'catalog': [], 'scan_ready': []}
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", probe], cwd=os.getcwd(), env={**os.environ, 'POS_DB_PATH': db_path, 'PYTHONPATH': HERE},
+                                capture_output=True, text=True, check=True).stdout
+        for key, value in json.loads(output.strip().splitlines()[-1]).items():
+            samples[key].append(value)
+
+    print(f"startup ({products} produk, {runs} proses baru, database sudah di versi skema terbaru)")
+    report("impor py1 (termasuk langkah skema)", samples['import'])
+    report("langkah skema saat impor", samples['schema'])
+    report("sebelum: muat katalog + indeks pencarian", samples['catalog'])
+    report("sesudah: muat katalog, indeks di latar", samples['scan_ready'])
+    report("sebelum: semua CREATE/ALTER/cek migrasi", measure(lambda i: legacy_schema_setup(py1), 20))
+    report("sesudah: ensure_schema() (satu PRAGMA)", measure(lambda i: py1.ensure_schema(), 20))
+
+    import tkinter
+    try:
+        root = tkinter.Tk()
+    except tkinter.TclError as e:
+        print(f"  UI dilewati (tidak ada display: {e})")
+        return
+    root.withdraw()
+    started = time.perf_counter()
+    app = py1.POSApp(root)
+    root.update()
+    report("POSApp: tab transaksi saja (scan siap)", [time.perf_counter() - started])
+    for frame in (app.product_frame, app.low_stock_frame, app.sales_report_frame):
+        started = time.perf_counter()
+        app.build_tab(frame)
+        root.update()
+        report(f"tab {app.notebook.tab(frame, 'text')} saat pertama dibuka", [time.perf_counter() - started])
+    app.on_close()
+
+# Salinan query SELECT dari fungsi py1 (fallback database untuk fungsi yang biasanya dilayani katalog di memori)
+EXISTING_SELECTS = [
+    ("load_product_catalog", "SELECT id, name, price, stock FROM products", ()),
+    ("get_all_products", "SELECT id, name, price, stock FROM products ORDER BY name ASC", ()),
+    ("get_product_by_id", "SELECT id, name, price, stock FROM products WHERE id = ?", ("{pid}",)),
+    ("get_products_by_search_term", """SELECT id, name, price, stock FROM products
+        WHERE id LIKE ? OR name LIKE ?
+        ORDER BY CASE WHEN id = ? THEN 0 WHEN name LIKE ? THEN 1 ELSE 2 END, name ASC LIMIT ?""",
+     ("%kopi%", "%kopi%", "kopi", "kopi%", 50)),
+    ("get_low_stock_products", "SELECT id, name, stock FROM products WHERE stock <= ? ORDER BY stock ASC, name ASC", (10,)),
+    ("get_sales_in_range", """SELECT id, timestamp, total_amount, payment, change FROM sales
+        WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp DESC""", ("2025-03-01", "2025-03-07 ~")),
+    ("get_product_sales_totals (rentang)", """SELECT si.product_id, MAX(si.name), SUM(si.quantity), SUM(si.subtotal)
+        FROM sale_items si JOIN sales s ON s.id = si.sale_id WHERE s.timestamp >= ? AND s.timestamp < ?
+        GROUP BY si.product_id ORDER BY SUM(si.quantity) DESC, SUM(si.subtotal) DESC LIMIT ?""",
+     ("2025-03-01", "2025-03-08", 20)),
+    ("get_product_sales_history", """SELECT s.timestamp, si.quantity, si.subtotal
+        FROM sale_items si JOIN sales s ON s.id = si.sale_id
+        WHERE si.product_id = ? ORDER BY s.timestamp DESC""", ("{pid}",)),
+    ("get_sale_items", """SELECT product_id, name, unit_price, quantity, subtotal FROM sale_items
+        WHERE sale_id = ? ORDER BY id""", (1234,)),
+    ("get_stock_movements", """SELECT timestamp, reason, quantity_change, stock_after, reference FROM stock_movements
+        WHERE product_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?""", ("{pid}", 100)),
+    ("get_stock_as_of", """SELECT stock_after FROM stock_movements WHERE product_id = ? AND timestamp <= ?
+        ORDER BY timestamp DESC, id DESC LIMIT 1""", ("{pid}", "2025-06-30 23:59:59")),
+    ("get_daily_sales", """SELECT day, SUM(sale_count), SUM(items_sold), SUM(total_amount)
+        FROM daily_sales_summary WHERE day BETWEEN ? AND ? GROUP BY day ORDER BY day""", ("2025-01-01", "2025-12-31")),
+    ("get_hourly_sales", """SELECT hour, SUM(sale_count), SUM(items_sold), SUM(total_amount)
+        FROM daily_sales_summary WHERE day BETWEEN ? AND ? GROUP BY hour ORDER BY hour""", ("2025-03-01", "2025-03-31")),
+    ("get_top_products (sebagian bulan)", """SELECT product_id, name, quantity, revenue FROM (
+        SELECT product_id, name, MAX(period), SUM(quantity) AS quantity, SUM(revenue) AS revenue
+        FROM (SELECT day AS period, product_id, name, quantity, revenue FROM daily_product_summary
+              WHERE day BETWEEN ? AND ?) GROUP BY product_id)
+        ORDER BY quantity DESC, revenue DESC LIMIT ?""", ("2025-03-05", "2025-03-20", 20)),
+]
+
+def query_plan(conn, sql, params):
+    """Rencana query SQLite (EXPLAIN QUERY PLAN) dalam satu baris."""
+    return " | ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+@benchmark("query_plans")
+def bench_query_plans(py1, products=50000, sales=50000, movements=200000, repeat=20):
+    """Rencana query dan latensi setiap SELECT yang ada: skema versi 5 (tanpa indeks stok dan statistik) vs ensure_schema()."""
+    import random
+    from datetime import datetime, timedelta
+    ids = seed_products(py1, products)
+    rng = random.Random(22)
+    start = datetime(2025, 1, 1, 8)
+    with py1.db_manager.transaction() as conn:
+        conn.executemany("UPDATE products SET stock = ? WHERE id = ?", ((rng.randrange(300), pid) for pid in ids))
+        for table in ("sale_items", "sales", "daily_sales_summary", "daily_product_summary", "monthly_product_summary", "stock_movements"):
+            conn.execute(f"DELETE FROM {table}")
+        for i in range(sales):
+            timestamp = (start + timedelta(minutes=i * 365 * 24 * 60 // sales)).strftime("%Y-%m-%d %H:%M:%S")
+            cart = {pid: {'name': pid, 'price': 1500, 'quantity': rng.randint(1, 5)} for pid in rng.sample(ids, 3)}
+            total = sum(item['price'] * item['quantity'] for item in cart.values())
+            py1._insert_sale_rows(conn, timestamp, total, total, 0, cart)
+        conn.executemany("""INSERT INTO stock_movements (product_id, timestamp, reason, quantity_change, stock_after, reference)
+                            VALUES (?, ?, 'adjustment', 1, 1, NULL)""",
+                         ((ids[rng.randrange(len(ids))], (start + timedelta(seconds=i * 150)).strftime("%Y-%m-%d %H:%M:%S"))
+                          for i in range(movements)))
+    db_path = os.path.abspath(py1.DB_PATH)
+    py1.db_manager.close_all()
+
+    # Kembalikan database ke skema versi 5: tanpa indeks produk dari migrasi berikutnya dan tanpa statistik ANALYZE
+    conn = sqlite3.connect(db_path)
+    for index in ("idx_products_stock", "idx_products_reorder"):
+        conn.execute(f"DROP INDEX IF EXISTS {index}")
+    conn.execute("DROP TABLE IF EXISTS sqlite_stat1")
+    conn.execute("DELETE FROM schema_version WHERE version > 5")
+    conn.execute("PRAGMA user_version = 5")
+    conn.commit()
+    conn.close()
+
+    hot_id = ids[len(ids) // 3]
+    queries = [(name, sql, tuple(hot_id if param == "{pid}" else param for param in params))
+               for name, sql, params in EXISTING_SELECTS]
+
+    def run_all():
+        conn = sqlite3.connect(db_path)
+        results = {}
+        for name, sql, params in queries:
+            samples = measure(lambda i: conn.execute(sql, params).fetchall(), repeat)
+            results[name] = (query_plan(conn, sql, params), samples)
+        conn.close()
+        return results
+
+    before = run_all()
+    started = time.perf_counter()
+    applied = py1.ensure_schema()
+    migrate_elapsed = time.perf_counter() - started
+    py1.db_manager.close_all()
+    after = run_all()
+
+    print(f"query_plans ({products} produk, {sales} transaksi, {movements} pergerakan stok)")
+    print(f"  ensure_schema(): versi {applied} diterapkan + ANALYZE dalam {migrate_elapsed * 1e3:.0f} ms")
+    for name, _, _ in queries:
+        plan_before, samples_before = before[name]
+        plan_after, samples_after = after[name]
+        print(f"  {name}")
+        print(f"    sebelum: {plan_before}")
+        print(f"    sesudah: {plan_after if plan_after != plan_before else '(rencana sama)'}")
+        report(f"{name} - sebelum", samples_before)
+        report(f"{name} - sesudah", samples_after)
+
+def legacy_update_low_stock_rows(app, py1, product_ids):
+    """_update_low_stock_rows sebelum titik pesan ulang: ambang global, urutan dibaca ulang dari semua baris Treeview."""
+    import bisect
+    for product_id in product_ids:
+        item_id = app.low_stock_items.pop(product_id, None)
+        if item_id is not None:
+            app.low_stock_tree.delete(item_id)
+        record = py1.product_catalog.peek(product_id)
+        if record is not None and record.stock <= py1.LOW_STOCK_THRESHOLD:
+            order = sorted((int(values[2]), str(values[1])) for values in
+                           (app.low_stock_tree.item(child)['values'] for child in app.low_stock_items.values()))
+            index = bisect.bisect_left(order, (record.stock, record.name))
+            app.low_stock_items[product_id] = app.low_stock_tree.insert("", index, values=(record.id, record.name, record.stock))
+
+@benchmark("low_stock")
+def bench_low_stock(py1, products=100000, custom_points=2000, sales=300):
+    """Laporan stok rendah: query (scan tabel vs indeks parsial) dan pembaruan laporan setelah penjualan."""
+    import random
+    from types import SimpleNamespace
+    ids = seed_products(py1, products)
+    rng = random.Random(23)
+    with py1.db_manager.transaction() as conn:
+        conn.executemany("UPDATE products SET stock = ? WHERE id = ?", ((rng.randrange(500), pid) for pid in ids))
+        conn.executemany("UPDATE products SET min_stock = ?, reorder_qty = ? WHERE id = ?",
+                         ((rng.randrange(20, 100), rng.choice((0, 12, 24, 48)), pid) for pid in rng.sample(ids, custom_points)))
+    py1.load_product_catalog()
+    conn = py1.connect_db()
+    scan_sql = """SELECT id, name, stock, min_stock, reorder_qty FROM products NOT INDEXED
+                  WHERE stock <= min_stock ORDER BY stock ASC, name ASC"""
+    low_count = len(py1.get_low_stock_products())
+    print(f"low_stock ({products} produk, {custom_points} dengan titik pesan ulang sendiri, {low_count} di laporan)")
+    print(f"  rencana sebelum: {query_plan(conn, scan_sql, ())}")
+    print(f"  rencana sesudah: {query_plan(conn, scan_sql.replace(' NOT INDEXED', ''), ())}")
+    report("query: scan seluruh tabel", measure(lambda i: conn.execute(scan_sql).fetchall(), 10))
+    report("query: indeks parsial idx_products_reorder", measure(lambda i: py1.get_low_stock_products(), 50))
+
+    # Penjualan yang membuat produk melewati stok minimumnya (masuk laporan), lalu restock (keluar laporan)
+    unwrap = lambda func: getattr(func, '__wrapped__', func)
+    load_report, update_rows = unwrap(py1.POSApp.load_low_stock_to_tree), unwrap(py1.POSApp._update_low_stock_rows)
+    new_app = SimpleNamespace(low_stock_tree=StandInTree(), _format_low_stock_row=py1.POSApp._format_low_stock_row)
+    new_app._update_low_stock_placeholder = lambda: py1.POSApp._update_low_stock_placeholder(new_app)
+    full_app = SimpleNamespace(low_stock_tree=StandInTree(), _format_low_stock_row=py1.POSApp._format_low_stock_row)
+    full_app._update_low_stock_placeholder = lambda: py1.POSApp._update_low_stock_placeholder(full_app)
+    load_report(new_app)
+    new_app.low_stock_tree.calls = 0
+    candidates = [pid for pid in ids if py1.product_catalog.peek(pid).stock > py1.reorder_points.get(pid).min_stock]
+    changes = []
+    for pid in rng.sample(candidates, sales // 2):
+        changes.append((pid, py1.reorder_points.get(pid).min_stock - rng.randrange(3)))
+        changes.append((pid, py1.product_catalog.peek(pid).stock))
+
+    def apply_change(i):
+        pid, stock = changes[i]
+        py1.update_product_stock(pid, stock)
+        return [pid]
+
+    samples = {'full': [], 'incremental': []}
+    for i in range(len(changes)):
+        changed = apply_change(i)
+        started = time.perf_counter()
+        update_rows(new_app, changed)
+        samples['incremental'].append(time.perf_counter() - started)
+        if i % 10 == 0:
+            started = time.perf_counter()
+            load_report(full_app)
+            samples['full'].append(time.perf_counter() - started)
+    load_report(full_app)
+    assert full_app.low_stock_tree.ordered_values() == new_app.low_stock_tree.ordered_values()
+    report("laporan: muat ulang penuh per perubahan", samples['full'])
+    report("laporan: per produk (_update_low_stock_rows)", samples['incremental'])
+    print(f"    {new_app.low_stock_tree.calls / len(changes):.1f} panggilan Treeview per perubahan")
+
+    legacy = SimpleNamespace(low_stock_tree=StandInTree(), low_stock_items={})
+    with py1.db_manager.transaction() as conn:
+        conn.execute("UPDATE products SET min_stock = ?, reorder_qty = 0", (py1.LOW_STOCK_THRESHOLD,))
+    py1.load_product_catalog()
+    for prod_id, name, stock, _, _ in py1.get_low_stock_products():
+        legacy.low_stock_items[prod_id] = legacy.low_stock_tree.insert("", "end", values=(prod_id, name, stock))
+    new_app.low_stock_tree = StandInTree()
+    load_report(new_app)
+    targets = [(pid, rng.randrange(py1.LOW_STOCK_THRESHOLD + 1)) for pid in rng.sample(ids, 50)]
+    for label, app, update in (("sebelum: baca Treeview", legacy, lambda app, changed: legacy_update_low_stock_rows(app, py1, changed)),
+                               ("sesudah: bisect", new_app, update_rows)):
+        app.low_stock_tree.calls = 0
+        run = []
+        for pid, stock in targets:
+            py1.product_catalog.update_stock(pid, stock)
+            started = time.perf_counter()
+            update(app, [pid])
+            run.append(time.perf_counter() - started)
+        report(f"ambang global, {label}", run)
+        print(f"    {app.low_stock_tree.calls / len(targets):.1f} panggilan Treeview per perubahan")
+    py1.product_catalog.load([])
+
+def run_with_peak_memory(func):
+    """(durasi detik, puncak memori Python dalam MB) satu panggilan func; waktu diukur tanpa tracemalloc."""
+    import tracemalloc
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+@benchmark("export")
+def bench_export(py1, products=50000, sales=300000, items_per_sale=3):
+    """Ekspor produk dan penjualan: memuat semua baris ke list lalu menulis vs export_table() (fetchmany)."""
+    import csv
+    import random
+    from datetime import datetime, timedelta
+    ids = seed_products(py1, products)
+    rng = random.Random(24)
+    start = datetime(2025, 1, 1, 8)
+    with py1.db_manager.transaction() as conn:
+        conn.execute("DELETE FROM sale_items")
+        conn.execute("DELETE FROM sales")
+        conn.executemany("INSERT INTO sales (id, timestamp, total_amount, payment, change, items) VALUES (?, ?, 4500, 5000, 500, '[]')",
+                         ((i + 1, (start + timedelta(seconds=i * 365 * 86400 // sales)).strftime("%Y-%m-%d %H:%M:%S"))
+                          for i in range(sales)))
+        conn.executemany("""INSERT INTO sale_items (sale_id, product_id, name, unit_price, quantity, subtotal)
+                            VALUES (?, ?, ?, 1500, 1, 1500)""",
+                         ((i // items_per_sale + 1, ids[j], product_name(j))
+                          for i, j in enumerate(rng.randrange(products) for _ in range(sales * items_per_sale))))
+    conn.execute("ANALYZE")
+    py1.load_product_catalog()
+    out_dir = os.path.abspath("export")
+    os.makedirs(out_dir, exist_ok=True)
+
+    def legacy_products():
+        # Salinan export_products_to_csv lama: seluruh produk di list, lalu ditulis
+        products = py1.get_all_products()
+        with open(os.path.join(out_dir, "produk_lama.csv"), 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['ID Produk', 'Nama Produk', 'Harga', 'Stok'])
+            for prod_id, name, price, stock in products:
+                writer.writerow([prod_id, name, price, stock])
+
+    def fetchall_sale_items():
+        # Cara langsung tanpa streaming: fetchall() seluruh rincian penjualan lalu ditulis
+        rows = py1.connect_db().execute(py1.EXPORT_SOURCES['sale_items'].query + " ORDER BY s.timestamp, s.id, si.id").fetchall()
+        with open(os.path.join(out_dir, "item_fetchall.csv"), 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(py1.EXPORT_SOURCES['sale_items'].headers)
+            writer.writerows(rows)
+
+    def streamed(kind, name, **options):
+        return lambda: py1.export_table(kind, os.path.join(out_dir, name), **options)
+
+    print(f"export ({products} produk, {sales} transaksi, {sales * items_per_sale} baris rincian item)")
+    cases = [("produk: list lalu tulis (lama)", legacy_products, "produk_lama.csv"),
+             ("produk: export_table CSV", streamed('products', "produk.csv"), "produk.csv"),
+             ("rincian item: fetchall lalu tulis", fetchall_sale_items, "item_fetchall.csv"),
+             ("rincian item: export_table CSV", streamed('sale_items', "item.csv"), "item.csv"),
+             ("rincian item: export_table JSONL", streamed('sale_items', "item.jsonl", fmt='jsonl'), "item.jsonl"),
+             ("rincian item: export_table CSV + gzip", streamed('sale_items', "item.csv.gz", compress=True), "item.csv.gz"),
+             ("transaksi Maret: export_table CSV", streamed('sales', "maret.csv", start_day="2025-03-01", end_day="2025-03-31"), "maret.csv")]
+    for label, func, file_name in cases:
+        elapsed, peak_mb = run_with_peak_memory(func)
+        size_mb = os.path.getsize(os.path.join(out_dir, file_name)) / 1e6
+        print(f"  {label:<44} {elapsed:6.2f} s   puncak memori {peak_mb:7.1f} MB   file {size_mb:6.1f} MB")
+        RESULTS.setdefault(current_benchmark, {})[label] = {'seconds': round(elapsed, 3), 'peak_mb': round(peak_mb, 1), 'file_mb': round(size_mb, 1)}
+    with open(os.path.join(out_dir, "produk_lama.csv"), encoding='utf-8') as old, open(os.path.join(out_dir, "produk.csv"), encoding='utf-8') as new:
+        assert old.read() == new.read()
+    with open(os.path.join(out_dir, "item_fetchall.csv"), encoding='utf-8') as old, open(os.path.join(out_dir, "item.csv"), encoding='utf-8') as new:
+        assert old.read() == new.read()
+    py1.product_catalog.load([])
+
+class StandInScrollbar:
+    def set(self, first, last):
+        pass
+
+def legacy_virtual_remove(view, key):
+    """VirtualTreeview.remove sebelumnya: hapus satu baris lalu reindex seluruh daftar."""
+    position = view._positions.get(key)
+    if position is None:
+        return
+    del view.rows[position]
+    view._reindex()
+    item_id = view._item_ids.pop(key, None)
+    if item_id is not None:
+        view.tree.delete(item_id)
+        view._rendered -= 1
+
+@benchmark("virtual_tree")
+def bench_virtual_tree(py1, products=50000, removed=500, added=500):
+    """Daftar produk virtual terurut nama: hapus banyak baris (reindex per baris vs sekali) dan sisip baris baru di posisi urutnya."""
+    rows = [py1.ProductRecord(f"899{i:010d}", product_name(i), 1000, i % 300) for i in range(products)]
+    removed_ids = [row.id for row in rows[::products // removed]][:removed]
+
+    def make_view():
+        view = py1.VirtualTreeview(StandInTree(), StandInScrollbar(), lambda row: row, py1.PRODUCT_SORT_KEYS)
+        view.set_rows(rows)
+        view.sort_by("Nama Produk")
+        return view
+
+    legacy_view, view = make_view(), make_view()
+    start = time.perf_counter()
+    for product_id in removed_ids:
+        legacy_virtual_remove(legacy_view, product_id)
+    legacy_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    view.remove_many(removed_ids)
+    batch_elapsed = time.perf_counter() - start
+    assert view.rows == legacy_view.rows and view.tree.ordered_values() == legacy_view.tree.ordered_values()
+
+    new_rows = [py1.ProductRecord(f"777{i:010d}", product_name(i * 7919 + 13) + " Baru", 2500, 5) for i in range(added)]
+    insert_samples = measure(lambda i: view.upsert(new_rows[i]), added)
+    names = [row.name for row in view.rows]
+    assert names == sorted(names) and view.tree.ordered_values() == view.rows[:view._rendered]
+
+    print(f"virtual_tree ({products} produk, urut nama)")
+    print(f"  hapus {removed} baris: satu per satu + reindex {legacy_elapsed * 1e3:8.1f} ms, remove_many {batch_elapsed * 1e3:6.1f} ms")
+    report("upsert produk baru (posisi urut)", insert_samples)
+
+class ReplayTkRoot:
+    """Root Tk dengan jam virtual (ms): timer after/after_idle dijalankan sesuai waktu rekaman, tanpa sleep."""
+    def __init__(self):
+        self.now_ms = 0
+        self._timers = {}
+        self._next_id = 0
+
+    def after(self, ms, func):
+        self._next_id += 1
+        self._timers[self._next_id] = (self.now_ms + ms, self._next_id, func)
+        return self._next_id
+
+    def after_idle(self, func):
+        return self.after(0, func)
+
+    def after_cancel(self, timer_id):
+        self._timers.pop(timer_id, None)
+
+    def advance_to(self, time_ms):
+        """Menjalankan semua timer yang jatuh tempo sampai time_ms, berurutan."""
+        while self._timers:
+            due, timer_id, func = min(self._timers.values())
+            if due > time_ms:
+                break
+            del self._timers[timer_id]
+            self.now_ms = max(self.now_ms, due)
+            func()
+        self.now_ms = max(self.now_ms, time_ms)
+
+# Jeda antar tombol (ms) khas scanner USB mode keyboard dan kasir yang mengetik di keypad. Rekaman
+# keystroke di bawah disusun dari pola ini: daftar (waktu ms, karakter), '' = Shift, '\b' = Backspace, '\r' = Enter.
+SCANNER_KEY_GAPS_MS = (8, 9, 8, 12, 8, 8, 15, 9, 8, 8, 10, 8, 9, 8)
+CASHIER_KEY_GAPS_MS = (184, 142, 251, 167, 129, 310, 196, 158, 224, 171, 205, 137)
+
+def scanner_keys(code, start_ms, enter=True):
+    """Keystroke satu scan: huruf besar didahului Shift, Enter (suffix) di akhir jika enter=True."""
+    events, t = [], start_ms
+    for i, char in enumerate(code + ("\r" if enter else "")):
+        if char.isupper():
+            events.append((t, ""))
+            t += 2
+        events.append((t, char))
+        t += SCANNER_KEY_GAPS_MS[i % len(SCANNER_KEY_GAPS_MS)]
+    return events
+
+def typed_keys(text, start_ms):
+    """Keystroke kasir mengetik `text` (termasuk '\b' dan '\r')."""
+    events, t = [], start_ms
+    for i, char in enumerate(text):
+        events.append((t, char))
+        t += CASHIER_KEY_GAPS_MS[i % len(CASHIER_KEY_GAPS_MS)]
+    return events
+
+def scan_recordings(bottle, snack, lettered):
+    """{nama: (keystroke, isi keranjang {product_id: jumlah}, input berurutan [(teks, sumber)], UI sibuk (ms))}.
+    UI sibuk = (mulai, selesai): thread Tk tertahan (mis. menunggu server), timer dan idle tidak berjalan.
+    """
+    six_bottles = [event for i in range(6) for event in scanner_keys(bottle, i * 180)]
+    prefixed = typed_keys("6*", 0) + scanner_keys(bottle, 900)
+    no_suffix = scanner_keys(bottle, 0, enter=False) + scanner_keys(snack, 400, enter=False)
+    stray = typed_keys("12", 0) + scanner_keys(snack, 1500)
+    corrected = typed_keys(snack[:5] + "9\b" + snack[5:] + "\r", 0)
+    rotation = [(bottle, snack, lettered)[i % 3] for i in range(30)]
+    presentation = [event for i, code in enumerate(rotation) for event in scanner_keys(code, i * 150)]
+    return {
+        "enam botol sama, 180 ms per scan": (six_bottles, {bottle: 6}, [(bottle, 'scanner')] * 6, None),
+        "kasir mengetik barcode": (typed_keys(snack + "\r", 0), {snack: 1}, [(snack, 'keyboard')], None),
+        "awalan jumlah 6* lalu scan": (prefixed, {bottle: 6}, [("6*" + bottle, 'scanner')], None),
+        "scanner tanpa suffix Enter": (no_suffix, {bottle: 1, snack: 1}, [(bottle, 'scanner'), (snack, 'scanner')], None),
+        "sisa ketikan sebelum scan": (stray, {snack: 1}, [(snack, 'scanner')], None),
+        "ketik, Backspace, ketik lagi": (corrected, {snack: 1}, [(snack, 'keyboard')], None),
+        "30 scan beruntun (huruf + Shift)": (presentation, {bottle: 10, snack: 10, lettered: 10}, [(code, 'scanner') for code in rotation], None),
+        "30 scan saat UI sibuk 2 detik": (presentation, {bottle: 10, snack: 10, lettered: 10}, [(code, 'scanner') for code in rotation], (1000, 3000)),
+    }
+
+class ReplayEntry:
+    """Pengganti Entry: teks yang sudah diketik."""
+    def __init__(self):
+        self.text = ""
+
+    def get(self):
+        return self.text
+
+    def clear(self):
+        self.text = ""
+
+def replay_keystrokes(py1, events, session, busy=None, checkouts=None):
+    """Memutar ulang keystroke melalui ScannerInput seperti binding Entry transaksi di POSApp.
+    Selama `busy` (mulai, selesai) keystroke tetap masuk dengan waktu aslinya, tetapi timer baru
+    berjalan setelah UI bebas. Karakter None = F12: seperti complete_transaction, antrean di-flush lalu
+    isi keranjang dicatat ke `checkouts` dan keranjang dikosongkan.
+    Mengembalikan (ScanInput yang diproses, batch, durasi key(), durasi per batch).
+    """
+    root, entry = ReplayTkRoot(), ReplayEntry()
+    processed, batches, batch_samples = [], [], []
+
+    def process_batch(scans):
+        # Setara POSApp._process_scans tanpa widget
+        start = time.perf_counter()
+        for scan in scans:
+            product_id, quantity = py1.parse_scan_input(scan.text)
+            session.scan(product_id, quantity)
+        batch_samples.append(time.perf_counter() - start)
+        processed.extend(scans)
+        batches.append(len(scans))
+
+    scanner = py1.ScannerInput(root, entry.get, entry.clear, process_batch)
+    key_samples = []
+    for time_ms, char in events:
+        if busy is None or not busy[0] <= time_ms < busy[1]:
+            root.advance_to(time_ms)
+        event = types.SimpleNamespace(char=char, time=time_ms) # Field yang dibaca dari event KeyPress Tk
+        if char is None:
+            scanner.flush()
+            checkouts.append({line.product_id: line.quantity for line in session.cart})
+            session.clear()
+            continue
+        if char == "\r":
+            scanner.submit(event)
+            continue
+        start = time.perf_counter()
+        scanner.key(event)
+        key_samples.append(time.perf_counter() - start)
+        if char == "\b":
+            entry.text = entry.text[:-1]
+        elif char:
+            entry.text += char
+    root.advance_to(events[-1][0] + 1000)
+    return processed, batches, key_samples, batch_samples
+
+def legacy_debounce_count(events, debounce_ms=200):
+    """Scan yang diterima logika lama: ID yang sama dengan scan sebelumnya dalam 200 ms dibuang (timer di-reset)."""
+    text, last_id, clear_at, accepted = "", None, None, 0
+    for time_ms, char in events:
+        if clear_at is not None and time_ms >= clear_at:
+            last_id, clear_at = None, None
+        if char == "\r":
+            product_id = text.strip()
+            text = ""
+            if product_id and product_id == last_id:
+                clear_at = time_ms + debounce_ms
+                continue
+            last_id, clear_at = product_id, time_ms + debounce_ms
+            accepted += bool(product_id)
+        elif char == "\b":
+            text = text[:-1]
+        else:
+            text += char
+    return accepted
+
+@benchmark("scanner_input")
+def bench_scanner_input(py1):
+    """Replay rekaman keystroke lewat ScannerInput: sumber (scanner/ketikan), urutan, awalan jumlah, dan batch."""
+    ids = seed_products(py1, 1000)
+    bottle, snack, lettered = ids[1], ids[2], "AQUA-600ML"
+    with py1.db_manager.transaction() as conn:
+        conn.execute("INSERT INTO products (id, name, price, stock) VALUES (?, 'Aqua 600ml', 3500, 1000)", (lettered,))
+    py1.load_product_catalog()
+
+    print("scanner_input (rekaman keystroke diputar ulang dengan jam virtual)")
+    key_samples, batch_samples = [], []
+    for name, (events, expected_cart, expected_scans, busy) in scan_recordings(bottle, snack, lettered).items():
+        session = py1.CheckoutSession()
+        processed, batches, keys, batch_times = replay_keystrokes(py1, events, session, busy)
+        key_samples.extend(keys)
+        batch_samples.extend(batch_times)
+        cart = {line.product_id: line.quantity for line in session.cart}
+        assert cart == expected_cart, (name, cart)
+        assert [tuple(scan) for scan in processed] == expected_scans, (name, processed)
+        legacy_accepted = legacy_debounce_count(events)
+        print(f"  {name:<36} {sum(cart.values()):3} unit, {len(processed):2} scan dalam {len(batches):2} batch"
+              f"   (debounce 200 ms lama: {legacy_accepted} scan diterima)")
+        session.clear()
+
+    # F12 saat UI sibuk: scan yang masih antre harus masuk transaksi ini, bukan keranjang pelanggan berikutnya
+    session, checkouts = py1.CheckoutSession(), []
+    events = [event for i in range(8) for event in scanner_keys(bottle, i * 150)]
+    events += [(events[-1][0] + 300, None)] + scanner_keys(snack, events[-1][0] + 600)
+    replay_keystrokes(py1, events, session, busy=(0, 1500), checkouts=checkouts)
+    cart = {line.product_id: line.quantity for line in session.cart}
+    assert checkouts == [{bottle: 8}] and cart == {snack: 1}, (checkouts, cart)
+    print(f"  {'F12 saat UI sibuk (8 scan antre)':<36} transaksi {checkouts[0]}, pelanggan berikutnya {cart}")
+    session.clear()
+    report("ScannerInput.key per tombol", key_samples)
+    report("proses satu batch scan", batch_samples)
+    py1.product_catalog.load([])
+
+class FakeTkRoot:
+    """Pengganti minimal root Tk untuk benchmark tanpa layar: after/after_cancel + loop event."""
+    def __init__(self):
+        self._timers = {}
+        self._next_id = 0
+
+    def after(self, ms, func):
+        self._next_id += 1
+        self._timers[self._next_id] = (time.perf_counter() + ms / 1000, func)
+        return self._next_id
+
+    def after_cancel(self, timer_id):
+        self._timers.pop(timer_id, None)
+
+    def run_for(self, seconds):
+        end = time.perf_counter() + seconds
+        while True:
+            if not self._timers:
+                break
+            timer_id = min(self._timers, key=lambda t: self._timers[t][0])
+            due, func = self._timers[timer_id]
+            if due > end:
+                break
+            time.sleep(max(0.0, due - time.perf_counter()))
+            del self._timers[timer_id]
+            func()
+        time.sleep(max(0.0, end - time.perf_counter()))
+
+@benchmark("live_search")
+def bench_live_search(py1, key_interval_ms=60):
+    """Latensi input-ke-render saat mengetik cepat: query sinkron per ketikan vs DebouncedSearch."""
+    seed_products(py1, 50000)
+    py1.load_product_catalog()
+    text = "indomie goreng"
+
+    def render(products):
+        # Setara biaya memformat baris untuk Treeview
+        return [(str(pid), name, py1.format_currency_id(price, include_decimals=False), stock) for pid, name, price, stock in products]
+
+    blocked = measure(lambda i: render(py1.search_products(text[:i + 1])), len(text))
+
+    root = FakeTkRoot()
+    typed = {'term': ''}
+    renders = []
+    search = py1.DebouncedSearch(root, lambda: typed['term'], py1.search_products, lambda products: renders.append(render(products)))
+
+    def keystroke(i):
+        typed['term'] = text[:i + 1]
+        search.schedule()
+
+    for i in range(len(text)):
+        root.after(i * key_interval_ms, lambda i=i: keystroke(i))
+    root.run_for(len(text) * key_interval_ms / 1000 + 0.5)
+    search.stop()
+
+    print(f"live_search (50000 produk, mengetik {text!r} dengan jeda {key_interval_ms} ms)")
+    report("sinkron: UI terblokir per ketikan", blocked)
+    report("DebouncedSearch: ketikan terakhir -> render", [ms / 1000 for ms in search.latencies_ms])
+    print(f"  {len(text)} ketikan -> {len(renders)} render (hanya hasil terbaru yang ditampilkan)")
+
+def write_results(path, names):
+    """Menyimpan RESULTS beserta info lingkungan ke JSON agar regresi bisa dibandingkan antar-versi."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'created_at': time.strftime("%Y-%m-%d %H:%M:%S"), 'python': platform.python_version(),
+                   'platform': platform.platform(), 'sqlite': sqlite3.sqlite_version,
+                   'benchmarks': names, 'results': RESULTS}, f, indent=2)
+    print(f"Hasil disimpan ke {path}")
+
+def main(argv):
+    global current_benchmark
+    parser = argparse.ArgumentParser(description="Benchmark jalur kritis aplikasi POS.")
+    parser.add_argument('names', nargs='*', help="Nama benchmark (default: semua).")
+    parser.add_argument('--json', dest='json_path', help="Simpan ringkasan p50/p99 ke file JSON ini.")
+    args = parser.parse_args(argv)
+    names = args.names or list(BENCHMARKS)
+    json_path = os.path.abspath(args.json_path) if args.json_path else None
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"Benchmark tidak dikenal: {', '.join(unknown)}. Pilihan: {', '.join(BENCHMARKS)}")
+        return 2
+
+    original_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="pos_bench_") as workdir:
+        os.chdir(workdir)
+        try:
+            py1 = load_app_module()
+            for name in names:
+                current_benchmark = name
+                BENCHMARKS[name](py1)
+        finally:
+            py1.db_manager.close_all()
+            os.chdir(original_cwd)
+    if json_path:
+        write_results(json_path, names)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,151 @@
+"""Pengukuran waktu jalur kritis aplikasi POS (py1.py) dan perekaman profil cProfile.
+
+Fungsi yang diberi @timed("nama") dicatat ke histogram bila pengukuran aktif. Saat nonaktif
+(default), pembungkusnya hanya memeriksa satu variabel global lalu memanggil fungsi aslinya.
+
+    POS_DIAGNOSTICS=1 python py1.py    # aktif sejak aplikasi dibuka
+"""
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from datetime import datetime
+
+enabled = os.environ.get('POS_DIAGNOSTICS', '') not in ('', '0')
+
+_perf_counter = time.perf_counter
+_lock = threading.Lock()
+
+class Histogram:
+    """Histogram durasi dengan bucket kelipatan dua (dalam mikrodetik): murah dicatat, cukup untuk p50/p99."""
+    __slots__ = ('name', 'count', 'total', 'max', 'buckets')
+
+    BUCKETS = 40 # Bucket ke-i berisi durasi < 2**i us (bucket terakhir menampung sisanya)
+
+    def __init__(self, name):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * self.BUCKETS
+
+    def record(self, seconds):
+        micros = seconds * 1e6
+        index = int(micros).bit_length()
+        with _lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+            self.buckets[index if index < self.BUCKETS else self.BUCKETS - 1] += 1
+
+    def percentile(self, fraction):
+        """Batas atas bucket (detik) tempat persentil `fraction` berada."""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                return min((1 << index) / 1e6, self.max)
+        return self.max
+
+    def summary(self):
+        return {'count': self.count, 'total_ms': round(self.total * 1e3, 3),
+                'mean_us': round(self.total / self.count * 1e6, 1) if self.count else 0.0,
+                'p50_us': round(self.percentile(0.5) * 1e6, 1), 'p99_us': round(self.percentile(0.99) * 1e6, 1),
+                'max_us': round(self.max * 1e6, 1)}
+
+histograms = {} # {nama: Histogram}
+counters = {} # {nama: jumlah}
+
+def histogram(name):
+    """Histogram bernama (dibuat saat pertama kali diminta)."""
+    hist = histograms.get(name)
+    if hist is None:
+        with _lock:
+            hist = histograms.setdefault(name, Histogram(name))
+    return hist
+
+def increment(name, amount=1):
+    """Menambah counter bernama (tidak melakukan apa-apa saat pengukuran nonaktif)."""
+    if enabled:
+        with _lock:
+            counters[name] = counters.get(name, 0) + amount
+
+def timed(name):
+    """Dekorator: mencatat durasi setiap panggilan ke histogram `name` selama pengukuran aktif."""
+    def decorate(func):
+        hist = histogram(name)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            start = _perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                hist.record(_perf_counter() - start)
+        return wrapper
+    return decorate
+
+def set_enabled(value):
+    global enabled
+    enabled = bool(value)
+
+def reset():
+    with _lock:
+        counters.clear()
+    for hist in list(histograms.values()):
+        with _lock:
+            hist.reset()
+
+def snapshot():
+    """Ringkasan semua histogram yang pernah terisi dan semua counter."""
+    return {'enabled': enabled,
+            'timings': {name: hist.summary() for name, hist in sorted(histograms.items()) if hist.count},
+            'counters': dict(sorted(counters.items()))}
+
+def export_json(path, extra=None):
+    """Menulis snapshot() (plus data tambahan, mis. statistik cache) ke file JSON."""
+    data = {'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **snapshot()}
+    if extra:
+        data.update(extra)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+class ProfileCapture:
+    """Perekaman cProfile yang bisa dinyalakan/dimatikan (hanya thread pemanggil, yaitu thread Tk)."""
+    def __init__(self, directory="diagnostics"):
+        self.directory = directory
+        self._profile = None
+        self.started_at = None
+
+    @property
+    def running(self):
+        return self._profile is not None
+
+    def start(self):
+        self._profile = cProfile.Profile()
+        self.started_at = datetime.now()
+        self._profile.enable()
+
+    def stop(self, top=30):
+        """Menghentikan perekaman, menyimpan file .prof, dan mengembalikan (path, teks fungsi terlama)."""
+        profile, self._profile = self._profile, None
+        profile.disable()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"profile_{self.started_at.strftime('%Y%m%d_%H%M%S')}.prof")
+        profile.dump_stats(path)
+        report = io.StringIO()
+        pstats.Stats(profile, stream=report).sort_stats('cumulative').print_stats(top)
+        return path, report.getvalue()
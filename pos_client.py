@@ -0,0 +1,163 @@
+"""Klien untuk pos_server.py (server katalog & checkout bersama untuk beberapa kasir).
+
+Protokol: satu objek JSON per baris di atas TCP.
+    permintaan : {"id": 7, "op": "checkout", "args": {...}}
+    jawaban    : {"id": 7, "ok": true, "result": ...}  atau  {"id": 7, "ok": false, "error": "..."}
+    push server: {"push": "products_changed", "version": 12, "changed": [[id, nama, harga, stok], ...], "removed": [id, ...],
+                  "reorder_points": {id: [stok minimum, jumlah pesan ulang], ...}}
+
+PosServerClient menyimpan beberapa koneksi terbuka (pool). Permintaan dikirim tanpa menunggu
+jawaban permintaan sebelumnya (pipelining); jawaban dicocokkan kembali lewat "id".
+"""
+import itertools
+import json
+import socket
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+DEFAULT_PORT = 8765
+
+class ServerError(Exception):
+    """Server menolak permintaan, atau koneksi ke server terputus."""
+
+def parse_server_address(address):
+    """'host:port', 'host' atau ':port' -> (host, port)."""
+    host, separator, port = address.strip().rpartition(":")
+    if not separator:
+        return port or "127.0.0.1", DEFAULT_PORT
+    return host or "127.0.0.1", int(port)
+
+class _Connection:
+    """Satu koneksi TCP dengan thread pembaca yang menyelesaikan Future berdasarkan id permintaan."""
+    def __init__(self, host, port, timeout, on_push):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.settimeout(None)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) # Permintaan kecil, kirim segera
+        self._on_push = on_push
+        self._pending = {} # {id permintaan: Future}
+        self._lock = threading.Lock()
+        self.closed = False
+        threading.Thread(target=self._read_loop, name="pos-client-reader", daemon=True).start()
+
+    def in_flight(self):
+        return len(self._pending)
+
+    def send(self, request_id, payload):
+        future = Future()
+        with self._lock:
+            if self.closed:
+                raise ServerError("Koneksi ke server terputus.")
+            self._pending[request_id] = future
+            try:
+                self._sock.sendall(payload)
+            except OSError as e:
+                del self._pending[request_id]
+                raise ServerError(f"Gagal mengirim ke server: {e}") from e
+        return future
+
+    def _read_loop(self):
+        try:
+            with self._sock.makefile('rb') as reader:
+                for line in reader:
+                    message = json.loads(line)
+                    if 'push' in message:
+                        if self._on_push:
+                            self._on_push(message)
+                        continue
+                    with self._lock:
+                        future = self._pending.pop(message.get('id'), None)
+                    if future is None:
+                        continue
+                    if message.get('ok'):
+                        future.set_result(message.get('result'))
+                    else:
+                        future.set_exception(ServerError(message.get('error', "Permintaan ditolak server.")))
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ServerError("Koneksi ke server terputus."))
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+class PosServerClient:
+    """Pool koneksi ke pos_server dengan pipelining permintaan.
+
+    on_push(message) dipanggil dari thread pembaca untuk setiap push server (hanya koneksi
+    pertama yang berlangganan push). on_reconnect() dipanggil setelah koneksi langganan
+    dibuka ulang, karena push selama koneksi putus tidak diterima.
+    """
+    def __init__(self, host, port=DEFAULT_PORT, pool_size=2, timeout=5.0, on_push=None, on_reconnect=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.on_push = on_push
+        self.on_reconnect = on_reconnect
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._connections = [None] * pool_size
+        self._subscription = None # Future permintaan 'subscribe' terakhir
+
+    def _connection(self, index):
+        connection = self._connections[index]
+        if connection is None or connection.closed:
+            with self._lock:
+                connection = self._connections[index]
+                if connection is None or connection.closed:
+                    reconnect = connection is not None
+                    connection = _Connection(self.host, self.port, self.timeout,
+                                             self.on_push if index == 0 else None)
+                    self._connections[index] = connection
+                    if index == 0:
+                        request_id = next(self._ids)
+                        self._subscription = connection.send(request_id, self._encode(request_id, 'subscribe', {}))
+                        if reconnect and self.on_reconnect:
+                            threading.Thread(target=self.on_reconnect, daemon=True).start()
+        return connection
+
+    @staticmethod
+    def _encode(request_id, op, args):
+        return json.dumps({'id': request_id, 'op': op, 'args': args}, separators=(',', ':')).encode('utf-8') + b"\n"
+
+    def submit(self, op, **args):
+        """Mengirim permintaan tanpa menunggu jawaban; mengembalikan Future berisi hasilnya."""
+        # Pilih koneksi dengan permintaan tertunda paling sedikit
+        index = min(range(len(self._connections)),
+                    key=lambda i: self._connections[i].in_flight() if self._connections[i] and not self._connections[i].closed else 0)
+        request_id = next(self._ids)
+        try:
+            connection = self._connection(index)
+        except OSError as e:
+            raise ServerError(f"Tidak bisa terhubung ke server {self.host}:{self.port}: {e}") from e
+        return connection.send(request_id, self._encode(request_id, op, args))
+
+    def call(self, op, **args):
+        """Mengirim permintaan dan menunggu hasilnya (maksimal `timeout` detik)."""
+        try:
+            return self.submit(op, **args).result(self.timeout)
+        except FutureTimeoutError as e:
+            raise ServerError(f"Server tidak menjawab dalam {self.timeout:.0f} detik.") from e
+
+    def subscribe(self):
+        """Membuka koneksi langganan push (koneksi pertama di pool) dan menunggu server mendaftarkannya."""
+        try:
+            self._connection(0)
+            self._subscription.result(self.timeout)
+        except OSError as e:
+            raise ServerError(f"Tidak bisa terhubung ke server {self.host}:{self.port}: {e}") from e
+        except FutureTimeoutError as e:
+            raise ServerError(f"Server tidak menjawab dalam {self.timeout:.0f} detik.") from e
+
+    def close(self):
+        for connection in self._connections:
+            if connection is not None:
+                connection.close()
@@ -0,0 +1,174 @@
+"""Server katalog & checkout bersama untuk beberapa kasir (multi-till).
+
+Server ini satu-satunya proses yang membuka database; setiap kasir menjalankan py1.py dengan
+POS_SERVER=host:port dan berbicara dengan server lewat pos_client.PosServerClient.
+
+    python pos_server.py --host 0.0.0.0 --port 8765 --db pos_data.db
+
+Semua operasi database dijalankan berurutan oleh satu thread pekerja, sehingga pengurangan stok
+dari checkout yang datang bersamaan tidak pernah saling mendahului (checkout_sale juga memakai
+BEGIN IMMEDIATE). Server juga memegang reservasi stok semua keranjang kasir ('reserve'), sehingga
+unit terakhir hanya bisa masuk ke satu keranjang. Setiap perubahan produk di-push ke semua kasir
+agar cache katalog mereka ikut diperbarui. Format protokol dijelaskan di pos_client.py.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from pos_client import DEFAULT_PORT
+
+MAX_LINE_BYTES = 1 << 20 # Satu permintaan (mis. keranjang besar) maksimal 1 MB
+MAX_SUBSCRIBER_BUFFER = 4 << 20 # Kasir yang tidak membaca push sebanyak ini diputus (akan memuat ulang katalog)
+
+class PosServer:
+    """Melayani permintaan JSON-lines dari kasir; `pos` adalah modul py1 yang sudah diimpor."""
+    def __init__(self, pos):
+        self.pos = pos
+        self.version = 0 # Naik setiap kali katalog berubah; dikirim bersama snapshot dan push
+        self.subscribers = set()
+        self.requests_served = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pos-db")
+        self._loop = None
+        pos.stock_reservations.ttl = pos.RESERVATION_TTL # Keranjang kasir yang mati tidak memegang stok selamanya
+        self._ops = {
+            'ping': lambda: "pong",
+            'catalog': self._catalog_snapshot,
+            'get_product': self._get_product,
+            'search': lambda term, limit=pos.SEARCH_RESULT_LIMIT: [list(record) for record in pos.product_catalog.search(term, limit)],
+            'checkout': pos.checkout_sale,
+            'add_product': pos.insert_product,
+            'delete_product': pos.delete_product_by_id,
+            'update_stock': pos.update_product_stock,
+            'sync_outbox': pos.apply_outbox_entries,
+            'reserve': pos.reserve_stock,
+            'release_reservations': lambda owner: len(pos.release_reservations(owner)),
+            'set_reorder_point': pos.set_reorder_point,
+            'low_stock': lambda threshold=None: [list(row) for row in pos.get_low_stock_products(threshold)],
+        }
+
+    # --- Dijalankan di thread pekerja database ---
+    def _catalog_snapshot(self):
+        return {'version': self.version,
+                'products': [list(record) for record in self.pos.product_catalog.all_products()],
+                'reorder_points': self.pos.reorder_points.snapshot()}
+
+    def _get_product(self, product_id):
+        record = self.pos.product_catalog.peek(product_id.strip())
+        return list(record) if record else None
+
+    def _on_products_changed(self, product_ids):
+        """Listener katalog (dipanggil setelah COMMIT di thread pekerja): susun push lalu kirim dari event loop."""
+        changed, removed, reorder_points = [], [], {}
+        for product_id in product_ids:
+            record = self.pos.product_catalog.peek(product_id)
+            if record is None:
+                removed.append(product_id)
+            else:
+                changed.append(list(record))
+                reorder_points[product_id] = list(self.pos.reorder_points.get(product_id))
+        self.version += 1
+        message = {'push': 'products_changed', 'version': self.version, 'changed': changed, 'removed': removed,
+                   'reorder_points': reorder_points}
+        self._loop.call_soon_threadsafe(self._broadcast, self._encode(message))
+
+    # --- Dijalankan di event loop ---
+    @staticmethod
+    def _encode(message):
+        return json.dumps(message, separators=(',', ':')).encode('utf-8') + b"\n"
+
+    def _broadcast(self, data):
+        for writer in list(self.subscribers):
+            if writer.is_closing():
+                self.subscribers.discard(writer)
+            elif writer.transport.get_write_buffer_size() > MAX_SUBSCRIBER_BUFFER:
+                self.subscribers.discard(writer)
+                writer.close()
+            else:
+                writer.write(data)
+
+    async def _serve_request(self, line, writer):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            op = request.get('op')
+            if op == 'subscribe':
+                self.subscribers.add(writer)
+                result = True
+            elif op in self._ops:
+                args = request.get('args') or {}
+                result = await self._loop.run_in_executor(self._executor, lambda: self._ops[op](**args))
+                if isinstance(result, tuple):
+                    result = list(result) # (berhasil, pesan) dari fungsi database
+            else:
+                raise ValueError(f"Operasi '{op}' tidak dikenal.")
+            response = {'id': request_id, 'ok': True, 'result': result}
+        except Exception as e:
+            response = {'id': request_id, 'ok': False, 'error': str(e) or type(e).__name__}
+        self.requests_served += 1
+        if not writer.is_closing():
+            writer.write(self._encode(response))
+
+    async def _handle_client(self, reader, writer):
+        """Setiap baris permintaan dijalankan sebagai task sendiri, jadi klien boleh mengirim beruntun (pipelining)."""
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._serve_request(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                if writer.transport.get_write_buffer_size() > MAX_SUBSCRIBER_BUFFER:
+                    await writer.drain()
+        except (ConnectionError, ValueError):
+            pass # Klien terputus atau baris terlalu panjang
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            self.subscribers.discard(writer)
+            writer.close()
+
+    async def serve(self, host, port, on_started=None):
+        self._loop = asyncio.get_running_loop()
+        # Katalog dimuat sekali; semua pembacaan produk dari kasir dilayani dari memori
+        await self._loop.run_in_executor(self._executor, self.pos.load_product_catalog)
+        self.pos.product_catalog.subscribe(self._on_products_changed)
+        server = await asyncio.start_server(self._handle_client, host, port, limit=MAX_LINE_BYTES)
+        if on_started:
+            on_started(server.sockets[0].getsockname()[:2])
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.pos.db_manager.close_all()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Server katalog & checkout POS untuk beberapa kasir.")
+    parser.add_argument('--host', default="127.0.0.1", help="Alamat yang didengarkan (0.0.0.0 untuk semua jaringan).")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port TCP (0 = pilih port bebas).")
+    parser.add_argument('--db', default=None, help="Path database SQLite (default: pos_data.db).")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        os.environ['POS_DB_PATH'] = args.db
+    import py1 # Diimpor setelah POS_DB_PATH diatur: membuat/memigrasi tabel di database yang dipilih
+
+    server = PosServer(py1)
+    def started(address):
+        print(f"Server POS berjalan di {address[0]}:{address[1]}", flush=True)
+    try:
+        asyncio.run(server.serve(args.host, args.port, on_started=started))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
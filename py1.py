@@ -2,9 +2,31 @@ import tkinter as tk
 from tkinter import ttk, messagebox, Toplevel, filedialog
 import sqlite3
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 import csv
+import gzip
 import json # Import json for storing cart items in sales history
+import threading
+import atexit
+from contextlib import contextmanager
+from functools import lru_cache
+from collections import namedtuple, deque
+from operator import attrgetter, itemgetter
+import bisect
+import re
+import heapq
+import queue
+import socket
+import time
+import uuid
+
+from receipt import ReceiptRenderer, receipt_layout
+from pos_client import PosServerClient, ServerError, parse_server_address
+import diagnostics
+from diagnostics import timed
+
+STARTUP_STARTED = time.perf_counter() # Awal pengukuran waktu startup (histogram startup.* di jendela F8)
 
 try:
     import win32print # This module is specific to Windows for printing.
@@ -13,84 +35,943 @@ except ImportError:
     print("Warning: 'win32print' module not found. Printing to physical printer will not be available. Receipts will be saved to file.")
 
 # --- Helper Function for Indonesian Currency Formatting ---
+# Uang disimpan sebagai rupiah bulat (int) di database, keranjang, dan total transaksi.
+@lru_cache(maxsize=8192) # Harga yang sama muncul berulang kali di setiap refresh Treeview dan struk
 def format_currency_id(amount, include_decimals=True):
-    """Formats a float as Indonesian Rupiah (RpX.XXX,XX or RpX.XXX)."""
-    if not isinstance(amount, (int, float)):
+    """Formats an amount in rupiah as Indonesian Rupiah (RpX.XXX,XX or RpX.XXX)."""
+    if type(amount) is not int:
         try:
             amount = float(amount)
         except (ValueError, TypeError):
             return "Rp0,00" if include_decimals else "Rp0"
+        if not amount.is_integer():
+            # Nilai lama dengan pecahan (sebelum migrasi ke rupiah bulat)
+            integer_part = int(amount)
+            formatted = f"Rp{integer_part:,}".replace(",", ".")
+            if include_decimals:
+                return f"{formatted},{int(round((amount - integer_part) * 100)):02d}"
+            return formatted
+        amount = int(amount)
+
+    # Format with comma thousands separator, then swap to dot in a single replace
+    formatted = f"Rp{amount:,}".replace(",", ".")
+    return formatted + ",00" if include_decimals else formatted
+
+MAX_RUPIAH = 10**15 # Batas atas harga yang diterima (jauh di dalam rentang INTEGER SQLite)
+
+def parse_rupiah(text):
+    """Mengubah input harga ('Rp1.234.567', '1.500', '1500,50') menjadi rupiah bulat (int), pecahan dibulatkan
+    ke atas mulai ,50. Diurai dengan Decimal agar tidak ada galat pembulatan float.
+    Melempar ValueError jika bukan angka, bukan bilangan hingga (inf/nan), atau terlalu besar.
+    """
+    cleaned = str(text).strip().replace('Rp', '').replace('.', '').replace(',', '.') # Format Indonesia: titik = ribuan
+    try:
+        amount = Decimal(cleaned)
+    except InvalidOperation:
+        raise ValueError(f"Harga tidak valid: {text!r}") from None
+    if not amount.is_finite() or abs(amount) >= MAX_RUPIAH:
+        raise ValueError("Harga tidak valid")
+    return int(amount.to_integral_value(rounding=ROUND_HALF_UP))
 
-    integer_part = int(amount)
-    
-    # Format integer part with dot as thousands separator
-    # Use string formatting and then replace default comma with dot
-    formatted_integer = "{:,.0f}".format(integer_part).replace(",", "#").replace(".", ",").replace("#", ".")
+# --- 1. Fungsi Database SQLite ---
+DB_PATH = os.environ.get('POS_DB_PATH', 'pos_data.db') # pos_server.py --db mengatur variabel ini
+SEARCH_RESULT_LIMIT = 100 # Maksimal hasil live search yang ditampilkan
+LOW_STOCK_THRESHOLD = 10 # Stok minimum default (produk yang titik pesan ulangnya belum diatur)
+SALES_HISTORY_LIMIT = 500 # Jumlah transaksi terbaru yang ditampilkan di riwayat penjualan
+STOCK_HISTORY_LIMIT = 1000 # Jumlah pergerakan stok terbaru yang ditampilkan per produk
 
-    if include_decimals:
-        decimal_part = int(round((amount - integer_part) * 100))
-        return f"Rp{formatted_integer},{decimal_part:02d}"
-    else:
-        return f"Rp{formatted_integer}"
+class DatabaseManager:
+    """Mengelola koneksi SQLite jangka panjang yang dipakai ulang oleh semua helper database.
+
+    Setiap thread mendapat satu koneksi sendiri yang dibuka sekali lalu dipakai terus,
+    sehingga satu scan barcode tidak lagi membuka dan menutup beberapa koneksi.
+    """
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",        # Pembaca tidak memblokir penulis (dan sebaliknya)
+        "PRAGMA synchronous=NORMAL",      # Aman dengan WAL, fsync hanya saat checkpoint
+        "PRAGMA cache_size=-16000",       # ~16 MB page cache per koneksi
+        "PRAGMA mmap_size=268435456",     # 256 MB memory-mapped I/O
+        "PRAGMA temp_store=MEMORY",
+    )
+    CACHED_STATEMENTS = 256 # Prepared statement cache per koneksi (default sqlite3: 128)
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def connection(self):
+        """Mengembalikan koneksi milik thread saat ini, membukanya jika belum ada."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None: transaksi dikelola eksplisit lewat transaction()
+            conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False,
+                                   cached_statements=self.CACHED_STATEMENTS)
+            for pragma in self.PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """Menjalankan blok di dalam satu transaksi (COMMIT jika sukses, ROLLBACK jika gagal).
+
+        Transaksi bersarang digabung ke transaksi terluar. immediate=True mengambil
+        kunci tulis di awal (BEGIN IMMEDIATE) agar baca-lalu-tulis tidak balapan.
+        """
+        conn = self.connection()
+        if self._local.depth > 0:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+
+    def close_thread_connection(self):
+        """Menutup koneksi milik thread saat ini. Dipanggil di akhir thread pekerja (impor, ekspor, muat
+        ulang katalog) agar koneksinya tidak tetap terbuka sampai aplikasi ditutup.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._lock:
+            if conn not in self._connections:
+                return # Sudah ditutup oleh close_all()
+            self._connections.remove(conn)
+        try:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+        except sqlite3.Error as e:
+            print(f"Error saat menutup koneksi database: {e}")
+        finally:
+            conn.close()
+
+    def close_all(self):
+        """Menutup semua koneksi dengan bersih (dipanggil saat aplikasi ditutup)."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                # Perbarui statistik indeks yang sudah usang (biasanya tidak melakukan apa-apa), lalu
+                # gabungkan WAL kembali ke file database utama
+                conn.execute("PRAGMA optimize")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.Error as e:
+                print(f"Error saat menutup koneksi database: {e}")
+            finally:
+                conn.close()
+        self._local = threading.local()
+
+db_manager = DatabaseManager()
+atexit.register(db_manager.close_all)
 
-# --- 1. Fungsi Database SQLite ---
 def connect_db():
-    """Membangun koneksi ke database SQLite."""
-    conn = sqlite3.connect('pos_data.db')
-    return conn
+    """Mengembalikan koneksi SQLite bersama milik thread ini.
+    Koneksi dikelola oleh db_manager, jangan ditutup oleh pemanggil.
+    """
+    return db_manager.connection()
+
+# --- Cache Katalog Produk di Memori ---
+ProductRecord = namedtuple('ProductRecord', ['id', 'name', 'price', 'stock'])
+
+class ProductSearchIndex:
+    """Indeks pencarian ID/nama produk di memori untuk live search.
+
+    Setiap produk mendapat nomor slot; slot diberikan berurutan menurut nama saat
+    indeks dibangun. Untuk setiap trigram disimpan bitmask slot yang mengandungnya
+    (int Python), sehingga kandidat didapat dari AND beberapa bitmask dan bisa dibaca
+    urut nama tanpa perlu sorting. Teks diberi padding agar setiap 1-2 huruf juga
+    merupakan awalan suatu trigram (untuk query pendek).
+
+    Urutan hasil: ID persis sama, nama berawalan kata kunci, lalu substring ID/nama,
+    masing-masing urut nama. Hanya `limit` hasil teratas yang dikembalikan.
+    """
+    GRAM = 3
+    PADDING = '\0' * (GRAM - 1)
+    MIN_TAIL_REBUILD = 2048 # Produk baru setelah build tidak urut nama; build ulang jika terlalu banyak
+
+    def __init__(self):
+        self.rebuild(())
+
+    @classmethod
+    def _grams(cls, text, padded=True):
+        if padded:
+            text += cls.PADDING
+        return {text[i:i + cls.GRAM] for i in range(len(text) - cls.GRAM + 1)}
+
+    def rebuild(self, products):
+        """Membangun ulang indeks dari pasangan (product_id, name)."""
+        entries = sorted((name.lower(), product_id.lower(), product_id) for product_id, name in products)
+        self._keys = [(id_lower, name_lower, product_id) for name_lower, id_lower, product_id in entries] # per slot, None jika dihapus
+        self._slots = {product_id: slot for slot, (_, _, product_id) in enumerate(self._keys)}
+        self._ids = {id_lower: product_id for id_lower, _, product_id in self._keys}
+        self._sorted_names = [name_lower for name_lower, _, _ in entries]
+        self._sorted_count = len(entries)
+
+        # Set bit di bytearray dulu, baru diubah ke int sekali per n-gram
+        size = (len(entries) + 7) // 8
+        buffers = {}
+        for slot, (id_lower, name_lower, _) in enumerate(self._keys):
+            byte_index, bit = slot >> 3, 1 << (slot & 7)
+            for gram in self._grams(id_lower) | self._grams(name_lower):
+                buffer = buffers.get(gram)
+                if buffer is None:
+                    buffer = buffers[gram] = bytearray(size)
+                buffer[byte_index] |= bit
+        self._masks = {gram: int.from_bytes(buffer, 'little') for gram, buffer in buffers.items()}
+        self._short_grams = {} # {awalan 1-2 huruf: set(trigram)} untuk query pendek
+        for gram in self._masks:
+            self._register_short(gram)
+
+    def _register_short(self, gram):
+        for n in range(1, self.GRAM):
+            self._short_grams.setdefault(gram[:n], set()).add(gram)
+
+    def _unregister_short(self, gram):
+        for n in range(1, self.GRAM):
+            grams = self._short_grams.get(gram[:n])
+            if grams is not None:
+                grams.discard(gram)
+                if not grams:
+                    del self._short_grams[gram[:n]]
+
+    def add(self, product_id, name):
+        self.remove(product_id)
+        tail = len(self._keys) - self._sorted_count
+        if tail >= max(self.MIN_TAIL_REBUILD, self._sorted_count // 4):
+            self.rebuild([(key[2], key[1]) for key in self._keys if key] + [(product_id, name)])
+            return
+
+        id_lower, name_lower = product_id.lower(), name.lower()
+        slot = len(self._keys)
+        self._keys.append((id_lower, name_lower, product_id))
+        self._slots[product_id] = slot
+        self._ids[id_lower] = product_id
+        bit = 1 << slot
+        masks = self._masks
+        for gram in self._grams(id_lower) | self._grams(name_lower):
+            mask = masks.get(gram)
+            if mask is None:
+                masks[gram] = bit
+                self._register_short(gram)
+            else:
+                masks[gram] = mask | bit
+
+    def remove(self, product_id):
+        slot = self._slots.pop(product_id, None)
+        if slot is None:
+            return
+        id_lower, name_lower, _ = self._keys[slot]
+        self._keys[slot] = None
+        self._ids.pop(id_lower, None)
+        clear = ~(1 << slot)
+        masks = self._masks
+        for gram in self._grams(id_lower) | self._grams(name_lower):
+            mask = masks[gram] & clear
+            if mask:
+                masks[gram] = mask
+            else:
+                del masks[gram]
+                self._unregister_short(gram)
+
+    def _candidates(self, query):
+        """Bitmask slot yang memuat semua n-gram query (superset dari hasil sebenarnya)."""
+        masks = self._masks
+        if len(query) < self.GRAM:
+            mask = 0
+            for gram in self._short_grams.get(query, ()):
+                mask |= masks[gram]
+            return mask
+        mask = -1
+        for gram in self._grams(query, padded=False):
+            mask &= masks.get(gram, 0)
+            if not mask:
+                break
+        return mask
+
+    @staticmethod
+    def _iter_slots(mask):
+        """Menghasilkan nomor slot dari bit yang aktif, urut naik."""
+        bits = bin(mask)[:1:-1] # Bit paling rendah di depan
+        slot = bits.find('1')
+        while slot != -1:
+            yield slot
+            slot = bits.find('1', slot + 1)
+
+    def search(self, query, limit):
+        """Mengembalikan daftar product_id yang cocok dengan query, sudah diurutkan."""
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+        mask = self._candidates(query)
+        results = []
+
+        exact = self._ids.get(query)
+        if exact is not None:
+            results.append(exact)
+            mask &= ~(1 << self._slots[exact])
+
+        # Nama berawalan query: satu rentang slot bersambung di bagian yang terurut
+        lo = bisect.bisect_left(self._sorted_names, query)
+        hi = bisect.bisect_left(self._sorted_names, query + '\U0010ffff', lo)
+        mask &= ~(((1 << hi) - 1) ^ ((1 << lo) - 1))
+        tail_mask = mask >> self._sorted_count << self._sorted_count
+        mask ^= tail_mask
+
+        # Produk di ekor (belum terurut) sedikit; cek langsung lalu urutkan
+        tail_prefix, tail_substring = [], []
+        for slot in self._iter_slots(tail_mask):
+            id_lower, name_lower, product_id = self._keys[slot]
+            if name_lower.startswith(query):
+                tail_prefix.append((name_lower, product_id))
+            elif query in name_lower or query in id_lower:
+                tail_substring.append((name_lower, product_id))
+        tail_prefix.sort()
+        tail_substring.sort()
+
+        keys = self._keys
+        prefix = ((keys[slot][1], keys[slot][2]) for slot in range(lo, hi) if keys[slot] is not None and keys[slot][2] != exact)
+        substring = ((keys[slot][1], keys[slot][2]) for slot in self._iter_slots(mask)
+                     if query in keys[slot][1] or query in keys[slot][0])
+        for bucket in (heapq.merge(prefix, tail_prefix), heapq.merge(substring, tail_substring)):
+            for _, product_id in bucket:
+                if len(results) >= limit:
+                    return results
+                results.append(product_id)
+        return results
+
+class ProductCatalog:
+    """Cache seluruh katalog produk di memori, diindeks berdasarkan ID produk (barcode).
+    Setelah dimuat, pencarian per ID adalah satu lookup dict tanpa akses disk.
+    """
+    def __init__(self):
+        self._products = {} # {product_id: ProductRecord}
+        self._lock = threading.RLock()
+        self.search_index = ProductSearchIndex()
+        self.search_ready = True # False selama indeks pencarian dibangun di latar belakang
+        self._index_backlog = None # ID produk yang berubah selama indeks dibangun (None jika tidak sedang membangun)
+        self._index_generation = 0
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+        self._listeners = []
+        self._batch = threading.local()
+
+    def load(self, rows, index_in_background=False):
+        """Mengisi ulang cache dari baris (id, name, price, stock).
+        Dengan index_in_background=True, lookup per ID langsung siap dan indeks pencarian (bagian
+        terlama) dibangun di thread lain; sampai selesai, search() memeriksa produk satu per satu.
+        """
+        products = {}
+        for prod_id, name, price, stock in rows:
+            prod_id = str(prod_id).strip()
+            products[prod_id] = ProductRecord(prod_id, name, price, stock)
+        with self._lock:
+            self._products = products
+            self._index_generation += 1
+            if index_in_background:
+                self.search_ready = False
+                self._index_backlog = []
+                threading.Thread(target=self._build_search_index, args=(products, self._index_generation),
+                                 name="pos-search-index", daemon=True).start()
+            else:
+                self.search_index.rebuild((record.id, record.name) for record in products.values())
+                self.search_ready = True
+                self._index_backlog = None
+            self.loaded = True
+
+    def _build_search_index(self, products, generation):
+        index = ProductSearchIndex()
+        index.rebuild((record.id, record.name) for record in products.values())
+        with self._lock:
+            if generation != self._index_generation:
+                return # Katalog sudah dimuat ulang sementara indeks ini dibangun
+            for product_id in self._index_backlog:
+                record = self._products.get(product_id)
+                if record is None:
+                    index.remove(product_id)
+                else:
+                    index.add(product_id, record.name)
+            self.search_index = index
+            self._index_backlog = None
+            self.search_ready = True
+
+    def get(self, product_id):
+        """Mengambil ProductRecord berdasarkan ID, atau None jika tidak ada."""
+        record = self._products.get(product_id)
+        if record is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return record
+
+    def peek(self, product_id):
+        """Seperti get(), tetapi tidak dihitung ke statistik hit/miss (untuk refresh tampilan)."""
+        return self._products.get(product_id)
+
+    def put(self, record):
+        with self._lock:
+            self._products[record.id] = record
+            if self._index_backlog is not None:
+                self._index_backlog.append(record.id)
+            else:
+                self.search_index.add(record.id, record.name)
+
+    def update_stock(self, product_id, stock):
+        with self._lock:
+            record = self._products.get(product_id)
+            if record is not None:
+                self._products[product_id] = record._replace(stock=stock)
+
+    def remove(self, product_id):
+        with self._lock:
+            self._products.pop(product_id, None)
+            if self._index_backlog is not None:
+                self._index_backlog.append(product_id)
+            else:
+                self.search_index.remove(product_id)
+
+    def all_products(self):
+        """Semua ProductRecord, diurutkan berdasarkan nama."""
+        with self._lock:
+            return sorted(self._products.values(), key=attrgetter('name'))
+
+    @timed("search.ProductCatalog.search")
+    def search(self, search_term, limit):
+        """Mencari produk berdasarkan ID/nama lewat indeks, mengembalikan ProductRecord terurut."""
+        with self._lock:
+            if not self.search_ready:
+                return self._scan_search(search_term, limit)
+            return [self._products[product_id] for product_id in self.search_index.search(search_term, limit)]
+
+    def _scan_search(self, search_term, limit):
+        """search() tanpa indeks (selama indeks dibangun): urutan hasil sama, tetapi memeriksa semua produk."""
+        query = search_term.strip().lower()
+        if not query or limit <= 0:
+            return []
+        exact, prefix, substring = [], [], []
+        for record in self._products.values():
+            id_lower, name_lower = record.id.lower(), record.name.lower()
+            if id_lower == query:
+                exact.append(record)
+            elif name_lower.startswith(query):
+                prefix.append((name_lower, record.id, record))
+            elif query in name_lower or query in id_lower:
+                substring.append((name_lower, record.id, record))
+        prefix.sort(key=itemgetter(0, 1))
+        substring.sort(key=itemgetter(0, 1))
+        return (exact[:1] + [entry[2] for entry in prefix] + [entry[2] for entry in substring])[:limit]
+
+    def subscribe(self, callback):
+        """Mendaftarkan callback(product_ids) yang dipanggil setiap kali produk berubah di database."""
+        self._listeners.append(callback)
+
+    def notify_changed(self, product_ids):
+        """Memberi tahu semua listener ID produk yang baru saja berubah (setelah COMMIT)."""
+        pending = getattr(self._batch, 'product_ids', None)
+        if pending is not None:
+            pending.update(product_ids)
+            return
+        product_ids = frozenset(product_ids)
+        if product_ids:
+            for callback in list(self._listeners):
+                callback(product_ids)
+
+    @contextmanager
+    def batch_changes(self):
+        """Mengumpulkan notifikasi perubahan di dalam blok dan mengirimnya sekali di akhir."""
+        if getattr(self._batch, 'product_ids', None) is not None:
+            yield # Sudah di dalam batch
+            return
+        self._batch.product_ids = set()
+        try:
+            yield
+        finally:
+            product_ids, self._batch.product_ids = self._batch.product_ids, None
+            self.notify_changed(product_ids)
+
+    def stats(self):
+        """Mengembalikan statistik cache: jumlah produk, hit, dan miss."""
+        return {'size': len(self._products), 'hits': self.hits, 'misses': self.misses}
+
+product_catalog = ProductCatalog()
+
+@timed("db.load_product_catalog")
+def load_product_catalog(index_in_background=False):
+    """Memuat seluruh tabel products ke cache katalog (dipanggil sekali saat aplikasi dimulai)."""
+    conn = connect_db()
+    product_catalog.load(conn.execute("SELECT id, name, price, stock FROM products"), index_in_background)
+    reorder_points.load(conn.execute("SELECT id, min_stock, reorder_qty FROM products WHERE min_stock != ? OR reorder_qty != 0",
+                                     (DEFAULT_REORDER_POINT.min_stock,)))
 
 def create_table():
     """Membuat tabel 'products' jika belum ada.
     Menambahkan kolom 'stock' jika belum ada.
     """
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS products (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL UNIQUE,
-            price REAL NOT NULL,
-            stock INTEGER DEFAULT 0
-        )
-    ''')
-    conn.commit()
-
-    # Memastikan kolom 'stock' ada di tabel 'products'
-    try:
-        cursor.execute("ALTER TABLE products ADD COLUMN stock INTEGER DEFAULT 0")
-        conn.commit()
-    except sqlite3.OperationalError as e:
-        # Menangani error jika kolom 'stock' sudah ada
-        if "duplicate column name: stock" in str(e):
-            pass # Kolom sudah ada, tidak perlu melakukan apa-apa
-        else:
-            print(f"Error saat menambahkan kolom stock: {e}")
-    conn.close()
+    with db_manager.transaction() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS products (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE,
+                price INTEGER NOT NULL, -- Rupiah bulat
+                stock INTEGER DEFAULT 0
+            )
+        ''')
+        # Database dari versi awal aplikasi belum punya kolom 'stock'
+        if 'stock' not in {row[1] for row in conn.execute("PRAGMA table_info(products)")}:
+            conn.execute("ALTER TABLE products ADD COLUMN stock INTEGER DEFAULT 0")
 
 def create_sales_table():
     """Membuat tabel 'sales' jika belum ada."""
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute('''
+    connect_db().execute('''
         CREATE TABLE IF NOT EXISTS sales (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             timestamp TEXT NOT NULL,
-            total_amount REAL NOT NULL,
-            payment REAL NOT NULL,
-            change REAL NOT NULL,
-            items TEXT NOT NULL -- Stored as JSON string of product_id, name, price, quantity
+            total_amount INTEGER NOT NULL, -- Rupiah bulat
+            payment INTEGER NOT NULL,
+            change INTEGER NOT NULL,
+            items TEXT NOT NULL -- JSON lama (product_id, name, price, quantity); rincian baru ada di sale_items
         )
     ''')
-    conn.commit()
-    conn.close()
 
-def insert_product(product_id, name, price, stock):
-    """Menambahkan produk baru ke database."""
+def create_sale_items_table():
+    """Membuat tabel 'sale_items' (satu baris per produk per transaksi) beserta indeksnya."""
+    with db_manager.transaction() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS sale_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sale_id INTEGER NOT NULL REFERENCES sales(id),
+                product_id TEXT NOT NULL,
+                name TEXT NOT NULL,     -- Nama & harga saat transaksi (produk bisa diubah/dihapus kemudian)
+                unit_price INTEGER NOT NULL,
+                quantity INTEGER NOT NULL,
+                subtotal INTEGER NOT NULL
+            )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sale_items_sale_id ON sale_items(sale_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sale_items_product_id ON sale_items(product_id)")
+
+def create_sales_summary_tables():
+    """Membuat tabel rollup laporan penjualan dan indeks waktu transaksi.
+    daily_sales_summary: total per hari per jam; daily_product_summary dan monthly_product_summary:
+    penjualan per produk per hari/bulan. Semuanya diperbarui saat checkout, sehingga laporan setahun cukup membaca ratusan baris.
+    """
+    with db_manager.transaction() as conn:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_timestamp ON sales(timestamp)")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS daily_sales_summary (
+                day TEXT NOT NULL,              -- YYYY-MM-DD
+                hour INTEGER NOT NULL,          -- 0..23
+                sale_count INTEGER NOT NULL,
+                items_sold INTEGER NOT NULL,
+                total_amount INTEGER NOT NULL,
+                PRIMARY KEY (day, hour)
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS daily_product_summary (
+                day TEXT NOT NULL,
+                product_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                quantity INTEGER NOT NULL,
+                revenue INTEGER NOT NULL,
+                PRIMARY KEY (day, product_id)
+            ) WITHOUT ROWID
+        ''')
+        # Rollup per bulan agar produk terlaris setahun tidak perlu membaca 365 hari x jumlah produk
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS monthly_product_summary (
+                month TEXT NOT NULL,            -- YYYY-MM
+                product_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                quantity INTEGER NOT NULL,
+                revenue INTEGER NOT NULL,
+                PRIMARY KEY (month, product_id)
+            ) WITHOUT ROWID
+        ''')
+
+STOCK_MOVEMENT_REASONS = {'sale': "Penjualan", 'adjustment': "Penyesuaian", 'import': "Impor CSV", 'receipt': "Penerimaan"}
+
+def create_stock_movements_table():
+    """Membuat buku besar 'stock_movements' (hanya ditambah, tidak pernah diubah).
+    Setiap perubahan stok dicatat di transaksi yang sama dengan perubahan products.stock;
+    products.stock tetap menjadi snapshot stok saat ini. stock_after menyimpan stok setelah
+    pergerakan, sehingga stok pada waktu tertentu cukup dicari lewat indeks tanpa menjumlah riwayat.
+    """
+    with db_manager.transaction() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS stock_movements (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                product_id TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                reason TEXT NOT NULL CHECK (reason IN ('sale', 'adjustment', 'import', 'receipt')),
+                quantity_change INTEGER NOT NULL,
+                stock_after INTEGER NOT NULL,
+                reference TEXT           -- mis. ID transaksi untuk 'sale'
+            )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_product_time ON stock_movements(product_id, timestamp)")
+
+# --- Migrasi Skema Berversi ---
+# PRAGMA user_version adalah versi skema database; tabel schema_version mencatat kapan setiap versi
+# diterapkan. Perubahan skema berikutnya ditulis sebagai @schema_migration(versi, "keterangan"):
+# fungsinya menerima koneksi dan dijalankan sekali, dalam satu transaksi bersama kenaikan user_version.
+SCHEMA_MIGRATIONS = {} # {versi: (keterangan, fungsi(conn))}
+ANALYSIS_LIMIT = 1000 # Baris yang diperiksa ANALYZE per indeks (cukup untuk statistik perencana query)
+
+def schema_migration(version, description):
+    """Dekorator: mendaftarkan fungsi migrasi untuk versi skema `version`."""
+    def register(func):
+        if version in SCHEMA_MIGRATIONS:
+            raise ValueError(f"Migrasi skema versi {version} sudah terdaftar.")
+        SCHEMA_MIGRATIONS[version] = (description, func)
+        return func
+    return register
+
+SALE_ITEMS_BACKFILL_BATCH = 500
+
+def _sale_item_rows(sale_id, cart):
+    """Baris sale_items untuk satu keranjang {product_id: {'name', 'price', 'quantity'}}."""
+    return [(sale_id, str(prod_id).strip(), item_data['name'], item_data['price'], item_data['quantity'],
+             item_data['price'] * item_data['quantity'])
+            for prod_id, item_data in cart.items()]
+
+@schema_migration(1, "Rincian JSON sales.items dipindahkan ke sale_items")
+def backfill_sale_items(conn):
+    """Memindahkan isi JSON lama di sales.items ke tabel sale_items.
+    Dibaca per batch berdasarkan ID (tidak pernah memuat seluruh tabel sales); transaksi yang sudah
+    punya baris sale_items dilewati.
+    """
+    migrated, last_id = 0, 0
+    while True:
+        batch = conn.execute("""SELECT id, items FROM sales
+                                WHERE id > ? AND NOT EXISTS (SELECT 1 FROM sale_items WHERE sale_id = sales.id)
+                                ORDER BY id LIMIT ?""", (last_id, SALE_ITEMS_BACKFILL_BATCH)).fetchall()
+        if not batch:
+            break
+        rows = []
+        for sale_id, items in batch:
+            try:
+                cart = json.loads(items)
+                if cart:
+                    rows.extend(_sale_item_rows(sale_id, cart))
+            except (ValueError, TypeError, KeyError, AttributeError) as e:
+                print(f"Error migrating items of sale {sale_id}: {e}")
+        conn.executemany("""INSERT INTO sale_items (sale_id, product_id, name, unit_price, quantity, subtotal)
+                            VALUES (?, ?, ?, ?, ?, ?)""", rows)
+        migrated += len(batch)
+        last_id = batch[-1][0]
+    return migrated
+
+def rebuild_sales_summary():
+    """Membangun ulang tabel rollup dari sales dan sale_items (satu kali setelah upgrade, atau untuk perbaikan)."""
+    with db_manager.transaction(immediate=True) as conn:
+        conn.execute("DELETE FROM daily_sales_summary")
+        conn.execute("DELETE FROM daily_product_summary")
+        conn.execute("DELETE FROM monthly_product_summary")
+        conn.execute("""INSERT INTO daily_sales_summary (day, hour, sale_count, items_sold, total_amount)
+                        SELECT substr(s.timestamp, 1, 10), CAST(substr(s.timestamp, 12, 2) AS INTEGER), COUNT(*),
+                               COALESCE(SUM((SELECT SUM(quantity) FROM sale_items WHERE sale_id = s.id)), 0),
+                               SUM(s.total_amount)
+                        FROM sales s GROUP BY 1, 2""")
+        conn.execute("""INSERT INTO daily_product_summary (day, product_id, name, quantity, revenue)
+                        SELECT substr(s.timestamp, 1, 10), si.product_id, MAX(si.name), SUM(si.quantity), SUM(si.subtotal)
+                        FROM sale_items si JOIN sales s ON s.id = si.sale_id GROUP BY 1, 2""")
+        conn.execute("""INSERT INTO monthly_product_summary (month, product_id, name, quantity, revenue)
+                        SELECT substr(day, 1, 7), product_id, name, SUM(quantity), SUM(revenue)
+                        FROM daily_product_summary GROUP BY 1, 2""")
+
+@schema_migration(2, "Rollup laporan penjualan dibangun dari data lama")
+def ensure_sales_summary(conn):
+    """Mengisi rollup dari data penjualan yang sudah ada (transaksi migrasi yang sedang berjalan dipakai ulang)."""
+    rebuild_sales_summary()
+
+MONEY_COLUMNS = {
+    'products': ('price',),
+    'sales': ('total_amount', 'payment', 'change'),
+    'sale_items': ('unit_price', 'subtotal'),
+    'daily_sales_summary': ('total_amount',),
+    'daily_product_summary': ('revenue',),
+    'monthly_product_summary': ('revenue',),
+}
+
+@schema_migration(3, "Kolom uang menjadi rupiah bulat (INTEGER)")
+def migrate_money_to_integer(conn):
+    """Kolom uang REAL menjadi INTEGER (rupiah bulat).
+    SQLite tidak bisa mengubah tipe kolom, jadi tabel dibangun ulang: buat tabel baru dengan skema
+    yang sama tetapi INTEGER, salin data dengan pembulatan, hapus tabel lama, lalu ganti nama.
+    Tabel yang sudah INTEGER hanya dibulatkan nilainya yang masih berupa pecahan.
+    """
+    for table, money_columns in MONEY_COLUMNS.items():
+        columns = [(row[1], row[2].upper()) for row in conn.execute(f"PRAGMA table_info({table})")]
+        rounded = [f"CAST(ROUND({name}) AS INTEGER)" if name in money_columns else name for name, _ in columns]
+        if not any(name in money_columns and declared_type == "REAL" for name, declared_type in columns):
+            for name in money_columns:
+                conn.execute(f"UPDATE {table} SET {name} = CAST(ROUND({name}) AS INTEGER) WHERE typeof({name}) = 'real'")
+            continue
+
+        table_sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+        index_sqls = [row[0] for row in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,))]
+        new_sql = re.sub(rf"^(\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?){table}\b", rf"\g<1>{table}_new", table_sql, flags=re.I)
+        for name in money_columns:
+            new_sql = re.sub(rf"\b({name})\s+REAL\b", r"\1 INTEGER", new_sql, flags=re.I)
+        conn.execute(new_sql)
+        conn.execute(f"INSERT INTO {table}_new ({', '.join(name for name, _ in columns)}) SELECT {', '.join(rounded)} FROM {table}")
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+        for index_sql in index_sqls:
+            conn.execute(index_sql)
+
+@schema_migration(4, "Saldo awal buku besar stok")
+def ensure_stock_ledger_baseline(conn):
+    """Mencatat stok saat ini sebagai saldo awal setiap produk di buku besar."""
+    conn.execute("""INSERT INTO stock_movements (product_id, timestamp, reason, quantity_change, stock_after, reference)
+                    SELECT id, ?, 'adjustment', stock, stock, 'Saldo awal' FROM products""", (current_timestamp(),))
+
+@schema_migration(5, "Tabel outbox_receipts untuk sinkronisasi kasir")
+def create_outbox_receipts_table(conn):
+    """Tabel 'outbox_receipts': entri outbox kasir yang sudah diterapkan di database ini.
+    UID entri menjadi kunci idempotensi, jadi batch yang dikirim ulang tidak dicatat dua kali.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS outbox_receipts (
+            uid TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL CHECK (status IN ('applied', 'conflict')),
+            detail TEXT,
+            sale_id INTEGER REFERENCES sales(id),
+            applied_at TEXT NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+@schema_migration(6, "Indeks stok produk dan waktu transaksi")
+def add_query_indexes(conn):
+    """Indeks untuk query yang sebelumnya membaca seluruh tabel.
+    products(stock, name, id): laporan stok rendah (WHERE stock <= ? ORDER BY stock, name) dibaca langsung
+    dari indeks, tanpa scan tabel dan tanpa sort.
+    products(name) sudah punya indeks dari constraint UNIQUE; idx_sales_timestamp dipastikan ada untuk
+    database yang dibuat sebelum indeks itu ditambahkan.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_products_stock ON products(stock, name, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_timestamp ON sales(timestamp)")
+
+@schema_migration(7, "Titik pesan ulang per produk (stok minimum, jumlah pesan ulang)")
+def add_reorder_points(conn):
+    """Kolom products.min_stock dan products.reorder_qty, serta indeks parsial laporan stok rendah.
+    min_stock produk lama diisi ambang batas global sebelumnya (LOW_STOCK_THRESHOLD), jadi isi laporan
+    tidak berubah sampai titik pesan ulang diatur. Indeks parsial hanya berisi produk dengan
+    stock <= min_stock: laporan membaca baris yang memenuhi syarat saja, berapa pun besar katalognya.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(products)")}
+    if 'min_stock' not in columns:
+        conn.execute(f"ALTER TABLE products ADD COLUMN min_stock INTEGER NOT NULL DEFAULT {LOW_STOCK_THRESHOLD}")
+    if 'reorder_qty' not in columns:
+        conn.execute("ALTER TABLE products ADD COLUMN reorder_qty INTEGER NOT NULL DEFAULT 0")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_products_reorder ON products(stock, name, id, min_stock, reorder_qty) WHERE stock <= min_stock")
+
+SCHEMA_VERSION = max(SCHEMA_MIGRATIONS) # Versi skema yang diharapkan kode ini
+
+def create_schema_version_table():
+    """Membuat tabel 'schema_version' (riwayat migrasi yang sudah diterapkan)."""
+    connect_db().execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    ''')
+
+def create_tables():
+    """Membuat semua tabel yang belum ada (CREATE ... IF NOT EXISTS), sebelum migrasi dijalankan."""
+    create_table()
+    create_sales_table()
+    create_sale_items_table()
+    create_sales_summary_tables()
+    create_stock_movements_table()
+    create_schema_version_table()
+
+def ensure_schema():
+    """Menerapkan migrasi yang belum dijalankan, berurutan, satu transaksi per versi.
+    Database yang sudah di SCHEMA_VERSION cukup membaca PRAGMA user_version. Jika ada migrasi yang
+    diterapkan, statistik tabel diperbarui (ANALYZE) agar perencana query langsung memakai indeks baru.
+    Mengembalikan daftar versi yang diterapkan.
+    """
     conn = connect_db()
-    cursor = conn.cursor()
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    if current >= SCHEMA_VERSION:
+        return []
+    create_tables()
+    applied = []
+    for version in range(current + 1, SCHEMA_VERSION + 1):
+        description, migrate = SCHEMA_MIGRATIONS[version]
+        with db_manager.transaction(immediate=True) as conn:
+            migrate(conn)
+            conn.execute("INSERT OR REPLACE INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                         (version, description, current_timestamp()))
+            conn.execute(f"PRAGMA user_version = {version}")
+        applied.append(version)
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    conn.execute("ANALYZE")
+    return applied
+
+def current_timestamp():
+    """Waktu sekarang dalam format kolom timestamp database."""
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def _record_stock_movements(conn, timestamp, reason, movements, reference=None):
+    """Mencatat pergerakan stok (product_id, perubahan, stok setelahnya) di transaksi `conn` yang sedang berjalan."""
+    conn.executemany("""INSERT INTO stock_movements (product_id, timestamp, reason, quantity_change, stock_after, reference)
+                        VALUES (?, ?, ?, ?, ?, ?)""",
+                     [(product_id, timestamp, reason, change, stock_after, reference)
+                      for product_id, change, stock_after in movements])
+
+@timed("db.get_stock_movements")
+def get_stock_movements(product_id, limit=None):
+    """Riwayat pergerakan stok satu produk, terbaru dulu: (waktu, alasan, perubahan, stok setelah, referensi)."""
+    query = """SELECT timestamp, reason, quantity_change, stock_after, reference FROM stock_movements
+               WHERE product_id = ? ORDER BY timestamp DESC, id DESC"""
+    params = [str(product_id).strip()]
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return connect_db().execute(query, params).fetchall()
+
+@timed("db.get_stock_as_of")
+def get_stock_as_of(product_id, timestamp):
+    """Stok produk pada waktu `timestamp` (YYYY-MM-DD HH:MM:SS), atau None jika belum ada catatan saat itu.
+    Satu pencarian indeks (product_id, timestamp): pergerakan terakhir sebelum waktu tersebut.
+    """
+    row = connect_db().execute("""SELECT stock_after FROM stock_movements
+                                  WHERE product_id = ? AND timestamp <= ?
+                                  ORDER BY timestamp DESC, id DESC LIMIT 1""", (str(product_id).strip(), timestamp)).fetchone()
+    return row[0] if row else None
+
+@timed("db.get_all_stock_as_of")
+def get_all_stock_as_of(timestamp):
+    """Stok semua produk pada waktu `timestamp`: (ID, nama, stok saat itu, stok sekarang), urut nama."""
+    return connect_db().execute("""SELECT p.id, p.name,
+                                          (SELECT stock_after FROM stock_movements
+                                           WHERE product_id = p.id AND timestamp <= ?
+                                           ORDER BY timestamp DESC, id DESC LIMIT 1),
+                                          p.stock
+                                   FROM products p ORDER BY p.name""", (timestamp,)).fetchall()
+
+def _update_sales_summary(conn, timestamp, total_amount, item_rows):
+    """Menambahkan satu transaksi ke tabel rollup (di dalam transaksi checkout yang sama)."""
+    day, hour = timestamp[:10], int(timestamp[11:13])
+    conn.execute("""INSERT INTO daily_sales_summary (day, hour, sale_count, items_sold, total_amount) VALUES (?, ?, 1, ?, ?)
+                    ON CONFLICT(day, hour) DO UPDATE SET sale_count = sale_count + 1,
+                        items_sold = items_sold + excluded.items_sold, total_amount = total_amount + excluded.total_amount""",
+                 (day, hour, sum(row[4] for row in item_rows), total_amount))
+    conn.executemany("""INSERT INTO daily_product_summary (day, product_id, name, quantity, revenue) VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(day, product_id) DO UPDATE SET name = excluded.name,
+                            quantity = quantity + excluded.quantity, revenue = revenue + excluded.revenue""",
+                     [(day, row[1], row[2], row[4], row[5]) for row in item_rows])
+    conn.executemany("""INSERT INTO monthly_product_summary (month, product_id, name, quantity, revenue) VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(month, product_id) DO UPDATE SET name = excluded.name,
+                            quantity = quantity + excluded.quantity, revenue = revenue + excluded.revenue""",
+                     [(day[:7], row[1], row[2], row[4], row[5]) for row in item_rows])
+
+@timed("db.get_daily_sales")
+def get_daily_sales(start_day, end_day):
+    """Total per hari dalam rentang [start_day, end_day] (format YYYY-MM-DD): (hari, transaksi, item, total)."""
+    return connect_db().execute("""SELECT day, SUM(sale_count), SUM(items_sold), SUM(total_amount)
+                                   FROM daily_sales_summary WHERE day BETWEEN ? AND ?
+                                   GROUP BY day ORDER BY day""", (start_day, end_day)).fetchall()
+
+@timed("db.get_hourly_sales")
+def get_hourly_sales(start_day, end_day):
+    """Total per jam dalam rentang hari: (jam, transaksi, item, total)."""
+    return connect_db().execute("""SELECT hour, SUM(sale_count), SUM(items_sold), SUM(total_amount)
+                                   FROM daily_sales_summary WHERE day BETWEEN ? AND ?
+                                   GROUP BY hour ORDER BY hour""", (start_day, end_day)).fetchall()
+
+def _full_months(start_day, end_day):
+    """Bulan (YYYY-MM) pertama dan terakhir yang seluruh harinya ada di [start_day, end_day], atau None."""
+    start = datetime.strptime(start_day, "%Y-%m-%d")
+    end = datetime.strptime(end_day, "%Y-%m-%d")
+    first = start if start.day == 1 else (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    last = end if (end + timedelta(days=1)).day == 1 else end.replace(day=1) - timedelta(days=1)
+    if first > last:
+        return None
+    return first.strftime("%Y-%m"), last.strftime("%Y-%m")
+
+@timed("db.get_top_products")
+def get_top_products(start_day, end_day, limit=None):
+    """Penjualan per produk dalam rentang hari, terlaris dulu: (ID, nama, jumlah, pendapatan).
+    Bulan penuh dibaca dari monthly_product_summary, sisa hari di tepi rentang dari daily_product_summary.
+    """
+    full_months = _full_months(start_day, end_day)
+    if full_months:
+        first_month, last_month = full_months
+        # Hari di luar bulan penuh: sebelum bulan pertama dan sesudah bulan terakhir
+        source = """SELECT day AS period, product_id, name, quantity, revenue FROM daily_product_summary
+                    WHERE day >= ? AND day < ?
+                    UNION ALL
+                    SELECT day, product_id, name, quantity, revenue FROM daily_product_summary
+                    WHERE day > ? AND day <= ?
+                    UNION ALL
+                    SELECT month || '-31', product_id, name, quantity, revenue FROM monthly_product_summary
+                    WHERE month BETWEEN ? AND ?"""
+        params = [start_day, first_month + "-01", last_month + "-31", end_day, first_month, last_month]
+    else:
+        source = """SELECT day AS period, product_id, name, quantity, revenue FROM daily_product_summary
+                    WHERE day BETWEEN ? AND ?"""
+        params = [start_day, end_day]
+    # MAX(period) membuat SQLite mengambil nama dari periode terakhir produk itu terjual
+    query = f"""SELECT product_id, name, quantity, revenue FROM (
+                    SELECT product_id, name, MAX(period), SUM(quantity) AS quantity, SUM(revenue) AS revenue
+                    FROM ({source}) GROUP BY product_id)
+                ORDER BY quantity DESC, revenue DESC"""
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return connect_db().execute(query, params).fetchall()
+
+@timed("db.get_sales_in_range")
+def get_sales_in_range(start_day, end_day, limit=None):
+    """Daftar transaksi dalam rentang hari (terbaru dulu), memakai indeks sales.timestamp."""
+    # Batas atas eksklusif: semua timestamp di hari end_day lebih kecil dari end_day + spasi + '~'
+    query = """SELECT id, timestamp, total_amount, payment, change FROM sales
+               WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp DESC"""
+    params = [start_day, end_day + " ~"]
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return connect_db().execute(query, params).fetchall()
+
+@timed("db.insert_product")
+def insert_product(product_id, name, price, stock):
+    """Menambahkan produk baru ke database. Stok awal dicatat sebagai penerimaan barang."""
+    if remote_server is not None:
+        return _call_server('add_product', product_id=product_id, name=name, price=price, stock=stock)
     try:
-        cursor.execute("INSERT INTO products (id, name, price, stock) VALUES (?, ?, ?, ?)", (product_id, name, price, stock))
-        conn.commit()
+        with db_manager.transaction() as conn:
+            conn.execute("INSERT INTO products (id, name, price, stock) VALUES (?, ?, ?, ?)", (product_id, name, price, stock))
+            _record_stock_movements(conn, current_timestamp(), 'receipt', [(str(product_id).strip(), stock, stock)])
+        product_catalog.put(ProductRecord(str(product_id).strip(), name, price, stock))
+        product_catalog.notify_changed({str(product_id).strip()})
         return True, "Produk berhasil ditambahkan."
     except sqlite3.IntegrityError as e:
         if "UNIQUE constraint failed: products.id" in str(e):
@@ -99,101 +980,2083 @@ def insert_product(product_id, name, price, stock):
             return False, f"Produk dengan nama '{name}' sudah ada. Harap gunakan nama lain."
         else:
             return False, f"Terjadi kesalahan database: {e}"
-    finally:
-        conn.close()
 
+@timed("db.get_all_products")
 def get_all_products():
     """Mengambil semua produk dari database, diurutkan berdasarkan nama."""
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name, price, stock FROM products ORDER BY name ASC")
-    products = cursor.fetchall()
-    conn.close()
-    return products
+    if product_catalog.loaded:
+        return product_catalog.all_products()
+    return connect_db().execute("SELECT id, name, price, stock FROM products ORDER BY name ASC").fetchall()
 
+@timed("db.get_product_by_id")
 def get_product_by_id(product_id):
-    """Mengambil produk berdasarkan ID."""
-    conn = connect_db()
-    cursor = conn.cursor()
+    """Mengambil produk berdasarkan ID (dari cache katalog jika sudah dimuat)."""
     # Ensure the product_id is stripped before querying the database
-    cursor.execute("SELECT id, name, price, stock FROM products WHERE id = ?", (product_id.strip(),))
-    product = cursor.fetchone()
-    conn.close()
-    return product
-
-def get_products_by_search_term(search_term):
-    """Mengambil produk berdasarkan istilah pencarian (ID atau Nama)."""
-    conn = connect_db()
-    cursor = conn.cursor()
-    # Use LIKE for partial matching, and COLLATE NOCASE for case-insensitive search
-    cursor.execute("SELECT id, name, price, stock FROM products WHERE id LIKE ? OR name LIKE ? ORDER BY name ASC", 
-                    ('%' + search_term + '%', '%' + search_term + '%'))
-    products = cursor.fetchall()
-    conn.close()
-    return products
-
+    product_id = product_id.strip()
+    if product_catalog.loaded:
+        return product_catalog.get(product_id)
+    return connect_db().execute("SELECT id, name, price, stock FROM products WHERE id = ?", (product_id,)).fetchone()
+
+@timed("db.get_products_by_search_term")
+def get_products_by_search_term(search_term, limit=SEARCH_RESULT_LIMIT):
+    """Mengambil produk berdasarkan istilah pencarian (ID atau Nama).
+    Urutan: ID persis sama, nama berawalan istilah, lalu substring; maksimal `limit` hasil.
+    """
+    if product_catalog.loaded:
+        return product_catalog.search(search_term, limit)
+    # Fallback sebelum katalog dimuat. LIKE is case-insensitive for ASCII in SQLite.
+    return connect_db().execute(
+        """SELECT id, name, price, stock FROM products
+           WHERE id LIKE ? OR name LIKE ?
+           ORDER BY CASE WHEN id = ? THEN 0 WHEN name LIKE ? THEN 1 ELSE 2 END, name ASC
+           LIMIT ?""",
+        ('%' + search_term + '%', '%' + search_term + '%', search_term, search_term + '%', limit)).fetchall()
+
+@timed("db.delete_product_by_id")
 def delete_product_by_id(product_id):
-    """Menghapus produk berdasarkan ID."""
-    conn = None
+    """Menghapus produk berdasarkan ID. Sisa stoknya dicatat sebagai penyesuaian ke nol."""
+    if remote_server is not None:
+        return _call_server('delete_product', product_id=product_id)
     try:
-        conn = connect_db()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM products WHERE id = ?", (product_id,))
-        conn.commit()
+        with db_manager.transaction(immediate=True) as conn:
+            row = conn.execute("SELECT stock FROM products WHERE id = ?", (product_id,)).fetchone()
+            conn.execute("DELETE FROM products WHERE id = ?", (product_id,))
+            if row and row[0]:
+                _record_stock_movements(conn, current_timestamp(), 'adjustment', [(str(product_id).strip(), -row[0], 0)],
+                                        reference="Produk dihapus")
+        product_catalog.remove(str(product_id).strip())
+        reorder_points.remove(str(product_id).strip())
+        product_catalog.notify_changed({str(product_id).strip()})
         return True, "Produk berhasil dihapus."
     except sqlite3.Error as e:
         print(f"Error deleting product: {e}")
         return False, f"Gagal menghapus produk: {e}"
-    finally:
-        if conn:
-            conn.close()
 
-def update_product_stock(product_id, new_stock):
-    """Memperbarui stok produk berdasarkan ID."""
-    conn = connect_db()
-    cursor = conn.cursor()
+@timed("db.update_product_stock")
+def update_product_stock(product_id, new_stock, reason='adjustment', reference=None):
+    """Memperbarui stok produk berdasarkan ID dan mencatat selisihnya di buku besar stok."""
+    if sale_outbox is not None:
+        return _queue_stock_update(product_id, new_stock, reason, reference)
+    if remote_server is not None:
+        return _call_server('update_stock', product_id=product_id, new_stock=new_stock, reason=reason, reference=reference)
     try:
-        cursor.execute("UPDATE products SET stock = ? WHERE id = ?", (new_stock, product_id))
-        conn.commit()
+        with db_manager.transaction(immediate=True) as conn:
+            if not _set_product_stock(conn, product_id, new_stock, current_timestamp(), reason, reference):
+                return False, f"Produk dengan ID '{product_id}' tidak ditemukan."
+        product_catalog.update_stock(str(product_id).strip(), new_stock)
+        product_catalog.notify_changed({str(product_id).strip()})
         return True, "Stok berhasil diperbarui."
     except sqlite3.Error as e:
         print(f"Error updating stock: {e}")
         return False, f"Gagal memperbarui stok: {e}"
-    finally:
-        conn.close()
-
-def get_low_stock_products(threshold=10):
-    """Mengambil produk dengan stok di bawah ambang batas tertentu."""
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name, stock FROM products WHERE stock <= ? ORDER BY stock ASC, name ASC", (threshold,))
-    low_stock_products = cursor.fetchall()
-    conn.close()
-    return low_stock_products
 
+def _set_product_stock(conn, product_id, new_stock, timestamp, reason, reference=None):
+    """Mengatur stok satu produk di dalam transaksi `conn` dan mencatat selisihnya. False jika produk tidak ada."""
+    row = conn.execute("SELECT stock FROM products WHERE id = ?", (product_id,)).fetchone()
+    if row is None:
+        return False
+    conn.execute("UPDATE products SET stock = ? WHERE id = ?", (new_stock, product_id))
+    if new_stock != row[0]:
+        _record_stock_movements(conn, timestamp, reason, [(str(product_id).strip(), new_stock - row[0], new_stock)],
+                                reference=reference)
+    return True
+
+@timed("db.get_low_stock_products")
+def get_low_stock_products(threshold=None):
+    """Produk yang stoknya sudah mencapai titik pesan ulang: (ID, nama, stok, stok minimum, jumlah pesan ulang).
+    Tanpa `threshold` setiap produk dibandingkan dengan min_stock-nya sendiri (indeks parsial
+    idx_products_reorder); dengan `threshold` dipakai satu ambang batas untuk semua produk.
+    """
+    if remote_server is not None:
+        # Katalog dan titik pesan ulang klien selalu mengikuti server lewat push, jadi laporan dibaca dari memori
+        low = []
+        for record in product_catalog.all_products():
+            point = reorder_points.get(record.id)
+            if record.stock <= (point.min_stock if threshold is None else threshold):
+                low.append((record.stock, record.name, record.id, point))
+        return [(prod_id, name, stock, *point) for stock, name, prod_id, point in sorted(low)]
+    if threshold is None:
+        return connect_db().execute("""SELECT id, name, stock, min_stock, reorder_qty FROM products
+                                       WHERE stock <= min_stock ORDER BY stock ASC, name ASC""").fetchall()
+    return connect_db().execute("""SELECT id, name, stock, min_stock, reorder_qty FROM products
+                                   WHERE stock <= ? ORDER BY stock ASC, name ASC""", (threshold,)).fetchall()
+
+@timed("db.set_reorder_point")
+def set_reorder_point(product_id, min_stock, reorder_qty):
+    """Mengatur stok minimum dan jumlah pesan ulang (kelipatan pemesanan) satu produk."""
+    if remote_server is not None:
+        return _call_server('set_reorder_point', product_id=product_id, min_stock=min_stock, reorder_qty=reorder_qty)
+    product_id = str(product_id).strip()
+    try:
+        with db_manager.transaction() as conn:
+            updated = conn.execute("UPDATE products SET min_stock = ?, reorder_qty = ? WHERE id = ?",
+                                   (min_stock, reorder_qty, product_id)).rowcount
+        if not updated:
+            return False, f"Produk dengan ID '{product_id}' tidak ditemukan."
+        reorder_points.set(product_id, min_stock, reorder_qty)
+        product_catalog.notify_changed({product_id})
+        return True, "Titik pesan ulang berhasil disimpan."
+    except sqlite3.Error as e:
+        print(f"Error updating reorder point: {e}")
+        return False, f"Gagal menyimpan titik pesan ulang: {e}"
+
+def get_purchase_order_lines():
+    """Usulan purchase order: (ID, nama, stok, stok minimum, jumlah pesan ulang, jumlah yang dipesan)."""
+    return [(prod_id, name, stock, min_stock, reorder_qty,
+             suggested_order_quantity(stock, ReorderPoint(min_stock, reorder_qty)))
+            for prod_id, name, stock, min_stock, reorder_qty in get_low_stock_products()]
+
+def export_purchase_order_csv(file_path):
+    """Menulis usulan purchase order ke file CSV."""
+    lines = get_purchase_order_lines()
+    if not lines:
+        return False, "Tidak ada produk yang perlu dipesan ulang."
+    try:
+        with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['ID Produk', 'Nama Produk', 'Stok', 'Stok Minimum', 'Kelipatan Pesan', 'Jumlah Pesan'])
+            writer.writerows(lines)
+    except OSError as e:
+        return False, f"Gagal menyimpan purchase order: {e}"
+    return True, f"{len(lines)} produk ditulis ke purchase order."
+
+def _insert_sale_rows(conn, timestamp, total_amount, payment, change, cart):
+    """Menulis satu baris sales dan baris sale_items-nya di dalam transaksi `conn` yang sedang berjalan."""
+    # Rincian item kini ada di sale_items; kolom JSON lama hanya diisi daftar kosong
+    sale_id = conn.execute("INSERT INTO sales (timestamp, total_amount, payment, change, items) VALUES (?, ?, ?, ?, '[]')",
+                           (timestamp, total_amount, payment, change)).lastrowid
+    item_rows = _sale_item_rows(sale_id, cart)
+    conn.executemany("""INSERT INTO sale_items (sale_id, product_id, name, unit_price, quantity, subtotal)
+                        VALUES (?, ?, ?, ?, ?, ?)""", item_rows)
+    _update_sales_summary(conn, timestamp, total_amount, item_rows)
+    return sale_id
+
+@timed("db.insert_sale")
 def insert_sale(timestamp, total_amount, payment, change, items):
     """Menambahkan transaksi penjualan baru ke database."""
-    conn = connect_db()
-    cursor = conn.cursor()
     try:
-        # items will be a JSON string of the cart contents
-        cursor.execute("INSERT INTO sales (timestamp, total_amount, payment, change, items) VALUES (?, ?, ?, ?, ?)",
-                       (timestamp, total_amount, payment, change, items))
-        conn.commit()
+        # items: dict keranjang (atau string JSON dengan format yang sama)
+        if isinstance(items, str):
+            items = json.loads(items)
+        with db_manager.transaction() as conn:
+            _insert_sale_rows(conn, timestamp, total_amount, payment, change, items)
         return True, "Transaksi berhasil disimpan."
     except sqlite3.Error as e:
         print(f"Error inserting sale: {e}")
         return False, f"Gagal menyimpan transaksi: {e}"
+
+@timed("db.get_sale_items")
+def get_sale_items(sale_id):
+    """Mengambil rincian item satu transaksi."""
+    return connect_db().execute("""SELECT product_id, name, unit_price, quantity, subtotal FROM sale_items
+                                   WHERE sale_id = ? ORDER BY id""", (sale_id,)).fetchall()
+
+@timed("db.get_product_sales_totals")
+def get_product_sales_totals(start_timestamp=None, end_timestamp=None, limit=None):
+    """Total terjual dan pendapatan per produk (terlaris dulu), opsional dalam rentang waktu [start, end)."""
+    query = """SELECT si.product_id, MAX(si.name), SUM(si.quantity), SUM(si.subtotal)
+               FROM sale_items si"""
+    conditions, params = [], []
+    if start_timestamp or end_timestamp:
+        query += " JOIN sales s ON s.id = si.sale_id"
+        if start_timestamp:
+            conditions.append("s.timestamp >= ?")
+            params.append(start_timestamp)
+        if end_timestamp:
+            conditions.append("s.timestamp < ?")
+            params.append(end_timestamp)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " GROUP BY si.product_id ORDER BY SUM(si.quantity) DESC, SUM(si.subtotal) DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return connect_db().execute(query, params).fetchall()
+
+@timed("db.get_product_sales_history")
+def get_product_sales_history(product_id):
+    """Riwayat penjualan satu produk: (waktu, jumlah, subtotal) terbaru dulu."""
+    return connect_db().execute("""SELECT s.timestamp, si.quantity, si.subtotal
+                                   FROM sale_items si JOIN sales s ON s.id = si.sale_id
+                                   WHERE si.product_id = ? ORDER BY s.timestamp DESC""", (product_id,)).fetchall()
+
+class StockError(Exception):
+    """Stok tidak mencukupi atau produk tidak ditemukan saat checkout."""
+
+@timed("db.checkout_sale")
+def checkout_sale(cart, timestamp, total_amount, payment, change, reservation_owner=None):
+    """Menyimpan seluruh keranjang dalam satu transaksi database.
+    Stok semua item diperiksa dulu; jika ada satu item yang stoknya kurang,
+    seluruh keranjang dibatalkan. Pengurangan stok dan pencatatan penjualan
+    dilakukan dalam satu COMMIT. Reservasi stok milik `reservation_owner` ikut dilepas.
+    """
+    if sale_outbox is not None:
+        # Mode kasir: disimpan dulu ke outbox lokal, lalu dikirim ke server oleh OutboxSyncer
+        return _queue_sale(cart, timestamp, total_amount, payment, change, reservation_owner)
+    if remote_server is not None:
+        # Server menjalankan checkout_sale yang sama secara berurutan untuk semua kasir
+        return _call_server('checkout', cart=cart, timestamp=timestamp, total_amount=total_amount, payment=payment, change=change,
+                            reservation_owner=reservation_owner)
+    lines = [(item_data['quantity'], prod_id) for prod_id, item_data in cart.items()]
+    try:
+        # BEGIN IMMEDIATE: ambil kunci tulis sebelum cek stok agar tidak balapan dengan penulis lain
+        with db_manager.transaction(immediate=True) as conn:
+            placeholders = ", ".join("?" * len(lines))
+            current_stock = dict(conn.execute(f"SELECT id, stock FROM products WHERE id IN ({placeholders})",
+                                              [prod_id for _, prod_id in lines]))
+            for quantity_sold, prod_id in lines:
+                name = cart[prod_id]['name']
+                if prod_id not in current_stock:
+                    raise StockError(f"Produk '{name}' tidak ditemukan saat memperbarui stok.")
+                if current_stock[prod_id] - quantity_sold < 0:
+                    raise StockError(f"Stok '{name}' tidak mencukupi (tersisa {current_stock[prod_id]}).")
+
+            conn.executemany("UPDATE products SET stock = stock - ? WHERE id = ?", lines)
+            sale_id = _insert_sale_rows(conn, timestamp, total_amount, payment, change, cart)
+            _record_stock_movements(conn, timestamp, 'sale',
+                                    [(prod_id, -quantity_sold, current_stock[prod_id] - quantity_sold) for quantity_sold, prod_id in lines],
+                                    reference=str(sale_id))
+        for quantity_sold, prod_id in lines:
+            product_catalog.update_stock(prod_id, current_stock[prod_id] - quantity_sold)
+        if reservation_owner:
+            # Unit yang terjual sudah keluar dari stok, jadi pegangannya di keranjang dilepas
+            stock_reservations.consume(reservation_owner, {prod_id: quantity_sold for quantity_sold, prod_id in lines})
+        product_catalog.notify_changed(current_stock)
+        return True, "Transaksi berhasil disimpan."
+    except StockError as e:
+        return False, str(e)
+    except sqlite3.Error as e:
+        print(f"Error during checkout: {e}")
+        return False, f"Gagal menyimpan transaksi: {e}"
+
+# --- Reservasi Stok Keranjang ---
+# Unit yang sudah masuk keranjang dipegang (reserved) sampai checkout atau dikeluarkan dari keranjang.
+# Tersedia untuk dijual = stok katalog - reserved, dibaca dari memori tanpa query database.
+RESERVATION_TTL = 30 * 60 # Detik; dipakai server: pegangan kasir yang tidak aktif selama ini dilepas
+
+StockLevel = namedtuple('StockLevel', ['stock', 'reserved', 'available'])
+
+class StockReservations:
+    """Unit yang dipegang keranjang per produk, dicatat per pemegang (owner = satu keranjang).
+
+    Di aplikasi tunggal instance ini menjadi acuan stok tersedia. Di mode multi-kasir acuannya
+    instance di server (semua keranjang kasir); kasir hanya mencerminkan pegangan keranjangnya sendiri.
+    """
+    def __init__(self, catalog, ttl=None):
+        self.catalog = catalog
+        self.ttl = ttl # None: pegangan tidak pernah kedaluwarsa
+        self.rejected = 0
+        self._reserved = {} # {product_id: total unit dipegang semua keranjang}
+        self._holds = {} # {owner: {product_id: unit}}
+        self._last_active = {} # {owner: time.monotonic() saat pegangan terakhir berubah}
+        self._next_expiry_check = 0.0
+        self._lock = threading.Lock()
+
+    def reserved(self, product_id):
+        return self._reserved.get(product_id, 0)
+
+    def available(self, product_id):
+        """Unit yang masih bisa masuk keranjang (0 jika produk tidak ada)."""
+        record = self.catalog.peek(product_id)
+        return record.stock - self._reserved.get(product_id, 0) if record else 0
+
+    def levels(self, product_id):
+        """StockLevel(stok, reserved, tersedia), atau None jika produk tidak ada."""
+        record = self.catalog.peek(product_id)
+        if record is None:
+            return None
+        reserved = self._reserved.get(product_id, 0)
+        return StockLevel(record.stock, reserved, record.stock - reserved)
+
+    def held(self, owner, product_id):
+        return self._holds.get(owner, {}).get(product_id, 0)
+
+    def reserve(self, owner, product_id, quantity, force=False):
+        """Menambah (quantity > 0) atau melepas (quantity < 0) pegangan owner atas satu produk.
+        Penambahan yang melebihi stok tersedia ditolak kecuali force=True (untuk mencerminkan
+        keputusan server). Mengembalikan (berhasil, tersedia setelahnya).
+        """
+        with self._lock:
+            if self.ttl is not None:
+                self._expire_idle()
+            record = self.catalog.peek(product_id)
+            stock = record.stock if record else 0
+            reserved = self._reserved.get(product_id, 0)
+            held = self._holds.get(owner, {}).get(product_id, 0)
+            quantity = max(quantity, -held)
+            if quantity > 0 and not force and (record is None or stock - reserved < quantity):
+                self.rejected += 1
+                return False, stock - reserved
+            self._change(owner, product_id, held + quantity, reserved + quantity)
+            return True, stock - reserved - quantity
+
+    def consume(self, owner, quantities):
+        """Melepas pegangan untuk unit yang sudah terjual: {product_id: jumlah}."""
+        with self._lock:
+            holds = self._holds.get(owner, {})
+            for product_id, quantity in quantities.items():
+                held = holds.get(product_id, 0)
+                released = min(quantity, held)
+                if released:
+                    self._change(owner, product_id, held - released, self._reserved[product_id] - released)
+
+    def release_all(self, owner):
+        """Melepas semua pegangan owner; mengembalikan {product_id: unit yang dilepas}."""
+        with self._lock:
+            holds = self._holds.pop(owner, {})
+            self._last_active.pop(owner, None)
+            for product_id, held in holds.items():
+                self._set_reserved(product_id, self._reserved[product_id] - held)
+            return holds
+
+    def _change(self, owner, product_id, held, reserved):
+        """Menyimpan pegangan baru (dipanggil dengan self._lock dipegang)."""
+        holds = self._holds.setdefault(owner, {})
+        if held:
+            holds[product_id] = held
+        else:
+            holds.pop(product_id, None)
+            if not holds:
+                del self._holds[owner]
+        self._set_reserved(product_id, reserved)
+        self._last_active[owner] = time.monotonic()
+
+    def _set_reserved(self, product_id, reserved):
+        if reserved:
+            self._reserved[product_id] = reserved
+        else:
+            self._reserved.pop(product_id, None)
+
+    def _expire_idle(self):
+        """Melepas pegangan owner yang tidak aktif lebih dari ttl (kasir mati tanpa sempat melepas)."""
+        now = time.monotonic()
+        if now < self._next_expiry_check:
+            return
+        self._next_expiry_check = now + min(self.ttl, 60)
+        for owner, last_active in list(self._last_active.items()):
+            if now - last_active > self.ttl:
+                for product_id, held in self._holds.pop(owner, {}).items():
+                    self._set_reserved(product_id, self._reserved[product_id] - held)
+                del self._last_active[owner]
+
+    def stats(self):
+        """Jumlah keranjang pemegang, produk yang dipegang, total unit dipegang, dan penambahan yang ditolak."""
+        return {'owners': len(self._holds), 'products': len(self._reserved),
+                'units': sum(self._reserved.values()), 'rejected': self.rejected}
+
+stock_reservations = StockReservations(product_catalog)
+
+def reserve_stock(owner, product_id, quantity):
+    """Memegang (quantity > 0) atau melepas (quantity < 0) stok untuk keranjang `owner`: (berhasil, tersedia).
+    Di mode kasir server yang memutuskan, agar dua kasir tidak menjual unit terakhir yang sama. Saat
+    server tidak terjangkau hanya stok lokal yang diperiksa; bentroknya muncul sebagai konflik outbox.
+    """
+    if remote_server is not None and (outbox_syncer is None or outbox_syncer.online):
+        try:
+            success, server_available = remote_server.call('reserve', owner=owner, product_id=product_id, quantity=quantity)
+        except ServerError:
+            pass
+        else:
+            if not success:
+                return False, min(server_available, stock_reservations.available(product_id))
+            _, available = stock_reservations.reserve(owner, product_id, quantity, force=True)
+            return True, min(server_available, available)
+    return stock_reservations.reserve(owner, product_id, quantity)
+
+def release_reservations(owner):
+    """Melepas semua pegangan keranjang `owner` (keranjang dikosongkan atau aplikasi ditutup)."""
+    released = stock_reservations.release_all(owner)
+    if released and remote_server is not None:
+        try:
+            remote_server.submit('release_reservations', owner=owner) # Tidak perlu menunggu jawaban
+        except ServerError:
+            pass # Server melepasnya sendiri setelah RESERVATION_TTL
+    return released
+
+# --- Titik Pesan Ulang (Reorder Point) ---
+# Setiap produk punya stok minimum (min_stock) dan jumlah pesan ulang (reorder_qty, mis. isi satu karton).
+# Produk masuk laporan stok rendah saat stock <= min_stock. Nilainya disimpan di tabel products dan
+# dicerminkan di memori, sehingga laporan bisa diperbarui per produk saat stoknya berubah.
+ReorderPoint = namedtuple('ReorderPoint', ['min_stock', 'reorder_qty'])
+DEFAULT_REORDER_POINT = ReorderPoint(LOW_STOCK_THRESHOLD, 0) # Nilai kolom untuk produk yang belum diatur
+
+class ReorderPoints:
+    """Titik pesan ulang per produk di memori. Hanya produk yang berbeda dari DEFAULT_REORDER_POINT yang
+    disimpan, jadi katalog besar dengan sedikit pengaturan tetap kecil.
+    """
+    def __init__(self):
+        self._points = {} # {product_id: ReorderPoint}
+
+    def load(self, rows):
+        """Mengisi ulang dari baris (id, min_stock, reorder_qty)."""
+        points = {}
+        for prod_id, min_stock, reorder_qty in rows:
+            point = ReorderPoint(min_stock, reorder_qty)
+            if point != DEFAULT_REORDER_POINT:
+                points[str(prod_id).strip()] = point
+        self._points = points
+
+    def get(self, product_id):
+        return self._points.get(product_id, DEFAULT_REORDER_POINT)
+
+    def set(self, product_id, min_stock, reorder_qty):
+        point = ReorderPoint(min_stock, reorder_qty)
+        if point == DEFAULT_REORDER_POINT:
+            self._points.pop(product_id, None)
+        else:
+            self._points[product_id] = point
+
+    def remove(self, product_id):
+        self._points.pop(product_id, None)
+
+    def is_low(self, record):
+        """True jika stok ProductRecord sudah mencapai stok minimumnya."""
+        return record.stock <= self.get(record.id).min_stock
+
+    def snapshot(self):
+        """{product_id: [min_stock, reorder_qty]} untuk produk yang tidak memakai nilai default."""
+        return {product_id: list(point) for product_id, point in self._points.items()}
+
+reorder_points = ReorderPoints()
+
+def suggested_order_quantity(stock, point):
+    """Jumlah yang disarankan untuk dipesan agar stok kembali di atas stok minimum.
+    Jika reorder_qty diatur, jumlahnya dibulatkan ke atas ke kelipatan reorder_qty; 0 jika stok masih cukup.
+    """
+    needed = point.min_stock - stock + 1
+    if needed <= 0:
+        return 0
+    if point.reorder_qty > 0:
+        return -(-needed // point.reorder_qty) * point.reorder_qty
+    return needed
+
+# --- Mode Klien Multi-Kasir ---
+# Jika POS_SERVER=host:port diatur, database dimiliki pos_server.py: penulisan produk dan checkout
+# dikirim ke server, sedangkan pembacaan dilayani dari product_catalog yang diperbarui lewat push.
+remote_server = None # PosServerClient saat berjalan sebagai klien
+
+class ServerCatalogSync:
+    """Menjaga product_catalog klien sama dengan katalog server: snapshot sekali, lalu push per perubahan.
+
+    Push yang datang selagi snapshot dimuat ditahan dulu, dan push dengan versi <= versi snapshot
+    dibuang. Jika ada versi yang terlewat, katalog dimuat ulang dari snapshot baru.
+    Stok yang ditampilkan = stok server dikurangi penjualan (dan perubahan stok) di outbox yang belum tersinkron.
+    """
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.client = None
+        self.version = None # None: snapshot belum dimuat
+        self.reloads = 0
+        self.server_stock = {} # {product_id: stok menurut server}
+        self.pending = {} # {product_id: pengurangan stok dari outbox kasir ini yang belum sampai di server}
+        self._held = []
+        self._lock = threading.Lock()
+
+    def reload(self):
+        """Memuat ulang seluruh katalog dari server (juga dipanggil setelah koneksi push tersambung lagi)."""
+        with self._lock:
+            self.version = None
+            self._held = []
+        self.client.subscribe() # Berlangganan dulu agar tidak ada perubahan yang lolos di antara snapshot dan push
+        snapshot = self.client.call('catalog')
+        previous_ids = {record.id for record in self.catalog.all_products()}
+        with self.catalog.batch_changes():
+            with self._lock:
+                self.server_stock = {row[0]: row[3] for row in snapshot['products']}
+                pending = self.pending
+                self.catalog.load((prod_id, name, price, stock - pending.get(prod_id, 0))
+                                  for prod_id, name, price, stock in snapshot['products'])
+                reorder_points.load((prod_id, *point) for prod_id, point in snapshot.get('reorder_points', {}).items())
+                self.version = snapshot['version']
+                held, self._held = self._held, []
+                for message in held:
+                    self._apply(message)
+            self.catalog.notify_changed(previous_ids | self.server_stock.keys())
+        self.reloads += 1
+
+    def on_push(self, message):
+        """Dipanggil dari thread pembaca koneksi untuk setiap push server."""
+        with self._lock:
+            if self.version is None:
+                self._held.append(message)
+                return
+            if message['version'] <= self.version:
+                return
+            if message['version'] != self.version + 1:
+                self.version = None # Ada push yang terlewat
+                threading.Thread(target=self._reload_quietly, daemon=True).start()
+                return
+            self._apply(message)
+
+    def _reload_quietly(self):
+        try:
+            self.reload()
+        except ServerError as e:
+            print(f"Gagal memuat ulang katalog dari server: {e}")
+        finally:
+            db_manager.close_thread_connection()
+
+    def _apply(self, message):
+        """Menerapkan satu push ke katalog (dipanggil dengan self._lock dipegang)."""
+        if message['version'] <= self.version:
+            return
+        self.version = message['version']
+        for prod_id, name, price, stock in message['changed']:
+            self.server_stock[prod_id] = stock
+            stock -= self.pending.get(prod_id, 0)
+            record = self.catalog.peek(prod_id)
+            if record is not None and record.name == name and record.price == price:
+                self.catalog.update_stock(prod_id, stock)
+            else:
+                self.catalog.put(ProductRecord(prod_id, name, price, stock))
+        for prod_id, (min_stock, reorder_qty) in message.get('reorder_points', {}).items():
+            reorder_points.set(prod_id, min_stock, reorder_qty)
+        for prod_id in message['removed']:
+            self.server_stock.pop(prod_id, None)
+            self.catalog.remove(prod_id)
+            reorder_points.remove(prod_id)
+        self.catalog.notify_changed([record[0] for record in message['changed']] + message['removed'])
+
+    def adjust_pending(self, quantities, sign=1):
+        """Menambah (sign=1, saat masuk outbox) atau mengurangi (sign=-1, setelah tersinkron) penjualan tertunda."""
+        with self._lock:
+            for prod_id, quantity in quantities.items():
+                remaining = self.pending.get(prod_id, 0) + sign * quantity
+                if remaining:
+                    self.pending[prod_id] = remaining
+                else:
+                    self.pending.pop(prod_id, None)
+                if prod_id in self.server_stock:
+                    self.catalog.update_stock(prod_id, self.server_stock[prod_id] - remaining)
+        self.catalog.notify_changed(quantities)
+
+# --- Outbox Lokal Mode Kasir (Offline-First) ---
+# Di mode kasir, checkout dan perubahan stok ditulis dulu ke outbox lokal (satu COMMIT dengan fsync),
+# lalu dikirim ke server per batch oleh OutboxSyncer. Checkout tetap jalan saat server lambat/mati.
+OUTBOX_DB_PATH = os.environ.get('POS_OUTBOX_PATH', 'pos_outbox.db')
+OUTBOX_BATCH_SIZE = 100 # Entri per permintaan sinkronisasi
+OUTBOX_SYNC_INTERVAL = 2.0 # Detik antar pemeriksaan outbox saat tidak ada checkout baru
+OUTBOX_MAX_BACKOFF = 30.0 # Jeda maksimal antar percobaan saat server tidak terjangkau
+
+def outbox_entry_quantities(kind, payload):
+    """{product_id: pengurangan stok} dari satu entri outbox, untuk stok tampilan selagi entri belum tersinkron.
+    Perubahan stok manual dihitung sebagai selisih terhadap stok yang terlihat di kasir (negatif jika stok ditambah).
+    """
+    if kind == 'sale':
+        return {prod_id: item_data['quantity'] for prod_id, item_data in payload['cart'].items()}
+    if payload.get('expected_stock') is None: # Entri dari versi lama hanya membawa stok baru
+        return {}
+    return {payload['product_id']: payload['expected_stock'] - payload['new_stock']}
+
+class DurableDatabaseManager(DatabaseManager):
+    """DatabaseManager yang melakukan fsync di setiap COMMIT (synchronous=FULL).
+    Dipakai untuk outbox: data di sana belum ada di server, jadi tidak boleh hilang saat listrik padam.
+    """
+    PRAGMAS = tuple(pragma for pragma in DatabaseManager.PRAGMAS if "synchronous" not in pragma) + ("PRAGMA synchronous=FULL",)
+
+class SaleOutbox:
+    """Antrean tulis lokal yang tahan restart. Setiap entri punya UID unik sebagai kunci idempotensi di server."""
+    def __init__(self, db_path=OUTBOX_DB_PATH):
+        self.db = DurableDatabaseManager(db_path)
+        with self.db.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS outbox (
+                    seq INTEGER PRIMARY KEY, -- Urutan pengiriman = urutan kejadian di kasir
+                    uid TEXT NOT NULL UNIQUE,
+                    kind TEXT NOT NULL CHECK (kind IN ('sale', 'stock')),
+                    created_at TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'synced', 'conflict')),
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    detail TEXT,
+                    synced_at TEXT
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox(seq) WHERE status = 'pending'")
+
+    def add(self, kind, payload):
+        """Menyimpan satu entri (COMMIT + fsync sebelum kembali) dan mengembalikan UID-nya."""
+        uid = uuid.uuid4().hex
+        with self.db.transaction() as conn:
+            conn.execute("INSERT INTO outbox (uid, kind, created_at, payload) VALUES (?, ?, ?, ?)",
+                         (uid, kind, current_timestamp(), json.dumps(payload, separators=(',', ':'))))
+        return uid
+
+    def pending(self, limit):
+        """Entri tertunda tertua: [(uid, kind, payload dict)]."""
+        rows = self.db.connection().execute("SELECT uid, kind, payload FROM outbox WHERE status = 'pending' ORDER BY seq LIMIT ?",
+                                            (limit,)).fetchall()
+        return [(uid, kind, json.loads(payload)) for uid, kind, payload in rows]
+
+    def pending_quantities(self):
+        """{product_id: jumlah} dari semua penjualan yang belum tersinkron (untuk stok tampilan setelah restart)."""
+        quantities = {}
+        for uid, kind, payload in self.pending(-1):
+            for prod_id, quantity in outbox_entry_quantities(kind, payload).items():
+                quantities[prod_id] = quantities.get(prod_id, 0) + quantity
+        return quantities
+
+    def record_results(self, results):
+        """Menandai entri sesuai jawaban server: 'applied' -> synced, 'conflict' -> conflict."""
+        synced_at = current_timestamp()
+        with self.db.transaction() as conn:
+            conn.executemany("""UPDATE outbox SET status = ?, detail = ?, synced_at = ?, attempts = attempts + 1, last_error = NULL
+                                WHERE uid = ?""",
+                             [('conflict' if result['status'] == 'conflict' else 'synced', result['detail'], synced_at, result['uid'])
+                              for result in results])
+
+    def record_failure(self, uids, error):
+        with self.db.transaction() as conn:
+            conn.executemany("UPDATE outbox SET attempts = attempts + 1, last_error = ? WHERE uid = ?",
+                             [(error, uid) for uid in uids])
+
+    def counts(self):
+        """Jumlah entri per status, mis. {'pending': 3, 'synced': 120, 'conflict': 1}."""
+        counts = {'pending': 0, 'synced': 0, 'conflict': 0}
+        counts.update(self.db.connection().execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"))
+        return counts
+
+    def entries(self, statuses=('pending', 'conflict'), limit=None):
+        """Entri dengan status tertentu, terbaru dulu: (waktu, jenis, status, percobaan, keterangan)."""
+        placeholders = ", ".join("?" * len(statuses))
+        query = f"""SELECT created_at, kind, status, attempts, COALESCE(detail, last_error, '') FROM outbox
+                    WHERE status IN ({placeholders}) ORDER BY seq DESC"""
+        params = list(statuses)
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return self.db.connection().execute(query, params).fetchall()
+
+    def close(self):
+        self.db.close_all()
+
+class OutboxSyncer:
+    """Thread yang mengirim entri outbox ke server per batch, berurutan, dengan backoff saat server tidak terjangkau.
+
+    on_event(kind, detail) dipanggil dari thread syncer:
+        'synced'  -> (jumlah entri, [hasil konflik])
+        'offline' -> pesan error
+        'online'  -> jumlah entri yang masih tertunda
+    """
+    def __init__(self, outbox, client, catalog_sync=None, on_event=None, batch_size=OUTBOX_BATCH_SIZE,
+                 interval=OUTBOX_SYNC_INTERVAL, max_backoff=OUTBOX_MAX_BACKOFF):
+        self.outbox = outbox
+        self.client = client
+        self.catalog_sync = catalog_sync
+        self.on_event = on_event
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.online = True
+        self.synced = 0
+        self.conflicts = 0
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pos-outbox-sync", daemon=True)
+        self._thread.start()
+
+    def kick(self):
+        """Meminta sinkronisasi segera (dipanggil setelah entri baru masuk outbox)."""
+        if self.online: # Saat offline, tunggu jadwal backoff
+            self._wake.set()
+
+    def _emit(self, kind, detail):
+        if self.on_event:
+            try:
+                self.on_event(kind, detail)
+            except Exception as e: # Listener yang gagal tidak boleh menghentikan thread sinkronisasi
+                print(f"Error in outbox listener ({kind}): {e}")
+
+    def sync_once(self):
+        """Mengirim satu batch; mengembalikan jumlah entri yang terkirim. Melempar ServerError jika gagal."""
+        batch = self.outbox.pending(self.batch_size)
+        if not batch:
+            return 0
+        try:
+            results = self.client.call('sync_outbox', entries=[{'uid': uid, 'kind': kind, 'payload': payload}
+                                                               for uid, kind, payload in batch])
+        except ServerError as e:
+            self.outbox.record_failure([uid for uid, _, _ in batch], str(e))
+            raise
+        self.outbox.record_results(results)
+
+        if self.catalog_sync is not None:
+            sold = {}
+            for uid, kind, payload in batch:
+                for prod_id, quantity in outbox_entry_quantities(kind, payload).items():
+                    sold[prod_id] = sold.get(prod_id, 0) + quantity
+            self.catalog_sync.adjust_pending(sold, sign=-1)
+
+        conflicts = [result for result in results if result['status'] == 'conflict']
+        self.synced += len(results)
+        self.conflicts += len(conflicts)
+        self._emit('synced', (len(results), conflicts))
+        return len(batch)
+
+    def _run(self):
+        delay = 0 # Sinkronkan sisa outbox dari sesi sebelumnya segera
+        while not self._stopping.is_set():
+            self._wake.wait(delay)
+            self._wake.clear()
+            if self._stopping.is_set():
+                break
+            try:
+                while self.sync_once() == self.batch_size:
+                    pass
+                if not self.online:
+                    self.online = True
+                    self._emit('online', self.outbox.counts()['pending'])
+                delay = self.interval
+            except ServerError as e:
+                if self.online:
+                    self.online = False
+                    self._emit('offline', str(e))
+                delay = min(max(delay * 2, self.interval), self.max_backoff)
+            except sqlite3.Error as e:
+                print(f"Error membaca outbox: {e}")
+                delay = self.interval
+        db_manager.close_thread_connection()
+
+    def stop(self, timeout=2.0):
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout)
+
+catalog_sync = None # ServerCatalogSync di mode kasir
+sale_outbox = None # SaleOutbox di mode kasir
+outbox_syncer = None # OutboxSyncer di mode kasir
+
+def connect_to_server(address, on_outbox_event=None):
+    """Menjalankan aplikasi sebagai klien pos_server di `address` ('host:port'). Melempar ServerError jika gagal.
+    Outbox lokal dibuka lebih dulu agar penjualan yang belum tersinkron dari sesi sebelumnya ikut dikirim.
+    """
+    global remote_server, catalog_sync, sale_outbox, outbox_syncer
+    host, port = parse_server_address(address)
+    sync = ServerCatalogSync(product_catalog)
+    client = PosServerClient(host, port, on_push=sync.on_push, on_reconnect=sync._reload_quietly)
+    sync.client = client
+    outbox = SaleOutbox()
+    sync.adjust_pending(outbox.pending_quantities())
+    try:
+        sync.reload()
+    except ServerError:
+        client.close()
+        outbox.close()
+        raise
+    remote_server, catalog_sync, sale_outbox = client, sync, outbox
+    outbox_syncer = OutboxSyncer(outbox, client, sync, on_event=on_outbox_event)
+    return client
+
+def disconnect_from_server():
+    global remote_server, catalog_sync, sale_outbox, outbox_syncer
+    if outbox_syncer is not None:
+        outbox_syncer.stop()
+        outbox_syncer = None
+    if sale_outbox is not None:
+        sale_outbox.close()
+        sale_outbox = None
+    if remote_server is not None:
+        remote_server.close()
+        remote_server = None
+    catalog_sync = None
+
+def _call_server(op, **args):
+    """Menjalankan operasi tulis di server; mengembalikan (berhasil, pesan) seperti fungsi database lokal."""
+    try:
+        success, message = remote_server.call(op, **args)
+        return success, message
+    except ServerError as e:
+        return False, f"Gagal menghubungi server: {e}"
+
+def _queue_sale(cart, timestamp, total_amount, payment, change, reservation_owner=None):
+    """checkout_sale di mode kasir: cek stok dari katalog lokal, simpan ke outbox, lalu kembali tanpa menunggu server.
+    Reservasi keranjang di server baru dilepas saat entri ini diterapkan di sana.
+    """
+    quantities = {}
+    for prod_id, item_data in cart.items():
+        record = product_catalog.peek(prod_id)
+        if record is None:
+            return False, f"Produk '{item_data['name']}' tidak ditemukan saat memperbarui stok."
+        if record.stock - item_data['quantity'] < 0:
+            return False, f"Stok '{item_data['name']}' tidak mencukupi (tersisa {record.stock})."
+        quantities[prod_id] = item_data['quantity']
+    try:
+        sale_outbox.add('sale', {'cart': cart, 'timestamp': timestamp, 'total_amount': total_amount,
+                                 'payment': payment, 'change': change, 'reservation_owner': reservation_owner})
+    except sqlite3.Error as e:
+        print(f"Error writing outbox: {e}")
+        return False, f"Gagal menyimpan transaksi: {e}"
+    if reservation_owner:
+        stock_reservations.consume(reservation_owner, quantities)
+    catalog_sync.adjust_pending(quantities)
+    outbox_syncer.kick()
+    return True, "Transaksi berhasil disimpan."
+
+def _queue_stock_update(product_id, new_stock, reason, reference):
+    """update_product_stock di mode kasir: dikirim lewat outbox agar urutannya tetap sesudah penjualan sebelumnya."""
+    product_id = str(product_id).strip()
+    record = product_catalog.peek(product_id)
+    if record is None:
+        return False, f"Produk dengan ID '{product_id}' tidak ditemukan."
+    # Server menerapkan selisihnya terhadap stok yang terlihat di sini, bukan menimpa stok dengan nilai absolut
+    payload = {'product_id': product_id, 'expected_stock': record.stock, 'new_stock': new_stock, 'reason': reason,
+               'reference': reference, 'timestamp': current_timestamp()}
+    try:
+        sale_outbox.add('stock', payload)
+    except sqlite3.Error as e:
+        print(f"Error writing outbox: {e}")
+        return False, f"Gagal memperbarui stok: {e}"
+    catalog_sync.adjust_pending(outbox_entry_quantities('stock', payload))
+    outbox_syncer.kick()
+    return True, "Stok berhasil diperbarui (dikirim ke server di latar belakang)."
+
+@timed("db.apply_outbox_entries")
+def apply_outbox_entries(entries):
+    """Menerapkan batch entri outbox kasir dalam satu transaksi (dijalankan di server).
+
+    entries: [{'uid', 'kind': 'sale' | 'stock', 'payload'}]. Penjualan offline selalu dicatat
+    karena barangnya sudah keluar dari toko; jika stok menjadi negatif atau produk sudah tidak ada,
+    entri ditandai 'conflict' beserta keterangannya. Perubahan stok diterapkan sebagai selisih
+    new_stock - expected_stock; jika stok server sudah berbeda dari expected_stock, entri juga ditandai 'conflict'. Entri yang UID-nya sudah pernah diterapkan
+    hanya mengembalikan hasil sebelumnya. Mengembalikan [{'uid', 'status', 'detail'}].
+    """
+    results = []
+    stock_after = {}
+    sold = {} # {reservation_owner: {product_id: jumlah}}
+    with db_manager.transaction(immediate=True) as conn:
+        for entry in entries:
+            uid, payload = entry['uid'], entry['payload']
+            previous = conn.execute("SELECT status, detail FROM outbox_receipts WHERE uid = ?", (uid,)).fetchone()
+            if previous is not None:
+                results.append({'uid': uid, 'status': previous[0], 'detail': previous[1]})
+                continue
+
+            problems = []
+            sale_id = None
+            if entry['kind'] == 'sale':
+                cart = payload['cart']
+                placeholders = ", ".join("?" * len(cart))
+                current_stock = dict(conn.execute(f"SELECT id, stock FROM products WHERE id IN ({placeholders})", list(cart)))
+                lines = []
+                for prod_id, item_data in cart.items():
+                    if prod_id not in current_stock:
+                        problems.append(f"Produk '{item_data['name']}' sudah tidak ada di server.")
+                        continue
+                    remaining = current_stock[prod_id] - item_data['quantity']
+                    if remaining < 0:
+                        problems.append(f"Stok '{item_data['name']}' menjadi {remaining}.")
+                    lines.append((item_data['quantity'], prod_id, remaining))
+                conn.executemany("UPDATE products SET stock = stock - ? WHERE id = ?", [line[:2] for line in lines])
+                sale_id = _insert_sale_rows(conn, payload['timestamp'], payload['total_amount'], payload['payment'],
+                                            payload['change'], cart)
+                _record_stock_movements(conn, payload['timestamp'], 'sale',
+                                        [(prod_id, -quantity, remaining) for quantity, prod_id, remaining in lines],
+                                        reference=str(sale_id))
+                stock_after.update((prod_id, remaining) for _, prod_id, remaining in lines)
+                if payload.get('reservation_owner'):
+                    owner_sold = sold.setdefault(payload['reservation_owner'], {})
+                    for quantity, prod_id, _ in lines:
+                        owner_sold[prod_id] = owner_sold.get(prod_id, 0) + quantity
+            else:
+                prod_id = str(payload['product_id']).strip()
+                row = conn.execute("SELECT stock FROM products WHERE id = ?", (prod_id,)).fetchone()
+                if row is None:
+                    problems.append(f"Produk dengan ID '{prod_id}' sudah tidak ada di server.")
+                else:
+                    expected = payload.get('expected_stock')
+                    if expected is None: # Entri dari versi lama: stok baru absolut
+                        new_stock = payload['new_stock']
+                    else:
+                        change = payload['new_stock'] - expected
+                        new_stock = row[0] + change
+                        if row[0] != expected:
+                            problems.append(f"Stok di server {row[0]}, bukan {expected} seperti di kasir; "
+                                            f"perubahan {change:+d} diterapkan menjadi {new_stock}.")
+                    _set_product_stock(conn, prod_id, new_stock, payload['timestamp'], payload['reason'], payload.get('reference'))
+                    stock_after[prod_id] = new_stock
+
+            status = 'conflict' if problems else 'applied'
+            detail = " ".join(problems) or None
+            conn.execute("INSERT INTO outbox_receipts (uid, kind, status, detail, sale_id, applied_at) VALUES (?, ?, ?, ?, ?, ?)",
+                         (uid, entry['kind'], status, detail, sale_id, current_timestamp()))
+            results.append({'uid': uid, 'status': status, 'detail': detail})
+    for prod_id, stock in stock_after.items():
+        product_catalog.update_stock(prod_id, stock)
+    for owner, quantities in sold.items():
+        stock_reservations.consume(owner, quantities)
+    product_catalog.notify_changed(stock_after)
+    return results
+
+# --- Impor CSV Massal ---
+CSV_REQUIRED_COLUMNS = ['ID Produk', 'Nama Produk', 'Harga', 'Stok']
+CSV_IMPORT_CHUNK_SIZE = 1000
+CATALOG_RELOAD_THRESHOLD = 500 # Di atas jumlah produk baru ini, katalog dimuat ulang sekali di akhir
+
+class CsvFormatError(Exception):
+    """File CSV tidak memiliki kolom yang dibutuhkan."""
+
+class CsvImportResult:
+    """Ringkasan hasil impor CSV, termasuk daftar baris yang gagal."""
+    def __init__(self):
+        self.updated_count = 0
+        self.new_count = 0
+        self.failed_count = 0
+        self.processed_rows = 0
+        self.total_rows = 0
+        self.cancelled = False
+        self.errors = [] # [(nomor baris, ID produk, keterangan)]
+
+    def fail(self, row_num, product_id, message):
+        self.failed_count += 1
+        self.errors.append((row_num, product_id, message))
+
+def _iter_csv_chunks(reader, chunk_size):
+    chunk = []
+    for row_num, row in enumerate(reader, start=2):
+        chunk.append((row_num, row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _import_csv_chunk(chunk, result, reference=None):
+    """Memvalidasi satu chunk baris CSV sekaligus lalu menulisnya dalam satu transaksi.
+    Mengembalikan (ID yang diperbarui, ProductRecord baru).
+    """
+    parsed = []
+    for row_num, row in chunk:
+        product_id = (row.get('ID Produk') or '').strip()
+        name = (row.get('Nama Produk') or '').strip()
+        price_str = (row.get('Harga') or '').strip()
+        stock_str = (row.get('Stok') or '').strip()
+        if not product_id:
+            result.fail(row_num, '', "ID Produk kosong, dilewati.")
+            continue
+        try:
+            stock = int(stock_str)
+        except ValueError:
+            result.fail(row_num, product_id, "Stok bukan angka, dilewati.")
+            continue
+        if stock < 0:
+            result.fail(row_num, product_id, "Stok tidak valid (harus >= 0), dilewati.")
+            continue
+        parsed.append((row_num, product_id, name, price_str, stock))
+
+    updated_ids, new_records = set(), {}
+    with db_manager.transaction(immediate=True) as conn:
+        # Validasi massal: satu query untuk ID yang sudah ada dan satu untuk nama yang sudah dipakai
+        ids = list({product_id for _, product_id, _, _, _ in parsed})
+        existing = {}
+        for start in range(0, len(ids), 500):
+            part = ids[start:start + 500]
+            existing.update((row[0], row) for row in conn.execute(
+                f"SELECT id, name, price, stock FROM products WHERE id IN ({', '.join('?' * len(part))})", part))
+        names = list({name for _, product_id, name, _, _ in parsed if product_id not in existing and name})
+        name_owner = {}
+        for start in range(0, len(names), 500):
+            part = names[start:start + 500]
+            name_owner.update(conn.execute(
+                f"SELECT name, id FROM products WHERE name IN ({', '.join('?' * len(part))})", part))
+
+        upserts = []
+        movements = []
+        for row_num, product_id, name, price_str, stock in parsed:
+            known = existing.get(product_id) or new_records.get(product_id)
+            if known:
+                upserts.append((product_id, known[1], known[2], stock))
+                if stock != known[3]:
+                    movements.append((product_id, stock - known[3], stock))
+                if product_id in existing:
+                    existing[product_id] = known[:3] + (stock,) # Baris berikutnya dengan ID sama dihitung dari stok ini
+                if product_id in new_records:
+                    new_records[product_id] = new_records[product_id]._replace(stock=stock)
+                else:
+                    updated_ids.add(product_id)
+                result.updated_count += 1
+                continue
+            if not name or not price_str:
+                result.fail(row_num, product_id, "Nama atau Harga kosong untuk produk baru, dilewati.")
+                continue
+            try:
+                price = parse_rupiah(price_str) # Ensure correct parsing for Indonesian input
+            except ValueError:
+                result.fail(row_num, product_id, "Harga bukan angka, dilewati.")
+                continue
+            if price <= 0:
+                result.fail(row_num, product_id, "Harga tidak valid (harus > 0), dilewati.")
+                continue
+            if name_owner.get(name, product_id) != product_id:
+                result.fail(row_num, product_id, f"Produk dengan nama '{name}' sudah ada, dilewati.")
+                continue
+            name_owner[name] = product_id
+            new_records[product_id] = ProductRecord(product_id, name, price, stock)
+            upserts.append((product_id, name, price, stock))
+            movements.append((product_id, stock, stock))
+            result.new_count += 1
+
+        conn.executemany("""INSERT INTO products (id, name, price, stock) VALUES (?, ?, ?, ?)
+                            ON CONFLICT(id) DO UPDATE SET stock = excluded.stock""", upserts)
+        _record_stock_movements(conn, current_timestamp(), 'import', movements, reference=reference)
+        # Stok akhir per ID (baris terakhir di chunk yang menang)
+        final_stock = {product_id: stock for product_id, _, _, stock in upserts}
+    return {product_id: final_stock[product_id] for product_id in updated_ids}, list(new_records.values())
+
+@timed("db.import_products_csv")
+def import_products_csv(file_path, chunk_size=CSV_IMPORT_CHUNK_SIZE, progress=None, cancel_event=None):
+    """Mengimpor stok/produk dari CSV secara streaming, satu transaksi per chunk.
+    Produk yang sudah ada hanya diperbarui stoknya; produk baru ditambahkan (butuh nama dan harga).
+    progress(diproses, total) dipanggil setelah tiap chunk; cancel_event (threading.Event)
+    menghentikan impor di antara chunk (chunk yang sudah di-commit tetap tersimpan).
+    """
+    result = CsvImportResult()
+    with open(file_path, 'r', newline='', encoding='utf-8') as csvfile:
+        # Dihitung per record CSV (bukan per baris fisik): field berkutip bisa memuat baris baru
+        result.total_rows = max(0, sum(1 for row in csv.reader(csvfile) if row) - 1)
+        csvfile.seek(0)
+        reader = csv.DictReader(csvfile)
+        if not reader.fieldnames or not all(col in reader.fieldnames for col in CSV_REQUIRED_COLUMNS):
+            raise CsvFormatError(f"File CSV harus memiliki kolom: {', '.join(CSV_REQUIRED_COLUMNS)}.")
+
+        new_product_count = 0
+        with product_catalog.batch_changes():
+            try:
+                for chunk in _iter_csv_chunks(reader, chunk_size):
+                    if cancel_event is not None and cancel_event.is_set():
+                        result.cancelled = True
+                        break
+                    updated_stock, new_records = _import_csv_chunk(chunk, result, reference=os.path.basename(file_path))
+                    for product_id, stock in updated_stock.items():
+                        product_catalog.update_stock(product_id, stock)
+                    new_product_count += len(new_records)
+                    if new_product_count <= CATALOG_RELOAD_THRESHOLD:
+                        for record in new_records:
+                            product_catalog.put(record)
+                    product_catalog.notify_changed(list(updated_stock) + [record.id for record in new_records])
+                    result.processed_rows += len(chunk)
+                    if progress:
+                        progress(min(result.processed_rows, result.total_rows), result.total_rows)
+            finally:
+                # Juga saat chunk berikutnya gagal: chunk yang sudah di-commit harus masuk katalog
+                if new_product_count > CATALOG_RELOAD_THRESHOLD:
+                    # Membangun ulang indeks sekali lebih murah daripada ribuan penambahan satu per satu
+                    load_product_catalog()
+    return result
+
+def write_import_error_report(file_path, result):
+    """Menyimpan daftar baris yang gagal diimpor ke file CSV."""
+    with open(file_path, 'w', newline='', encoding='utf-8') as report_file:
+        writer = csv.writer(report_file)
+        writer.writerow(['Baris', 'ID Produk', 'Keterangan'])
+        writer.writerows(sorted(result.errors))
+
+# --- Ekspor Data Streaming ---
+# Ekspor membaca kursor database per EXPORT_FETCH_SIZE baris (fetchmany) dan langsung menulisnya ke file,
+# sehingga memori tetap datar berapa pun jumlah barisnya. File ditulis ke '<nama>.part' lalu diganti
+# namanya setelah selesai, jadi ekspor yang gagal atau dibatalkan tidak meninggalkan file setengah jadi.
+EXPORT_FETCH_SIZE = 5000
+EXPORT_GZIP_LEVEL = 6 # Level 9 jauh lebih lambat dengan ukuran file yang hampir sama
+
+ExportSource = namedtuple('ExportSource', ['headers', 'fields', 'query', 'time_column', 'order_by'])
+
+# Urutan ORDER BY mengikuti indeks (nama UNIQUE, idx_sales_timestamp, idx_sale_items_sale_id): tanpa sort sementara
+EXPORT_SOURCES = {
+    'products': ExportSource(CSV_REQUIRED_COLUMNS, ['id', 'name', 'price', 'stock'],
+                             "SELECT id, name, price, stock FROM products", None, "name"),
+    'sales': ExportSource(['ID Transaksi', 'Waktu', 'Total', 'Bayar', 'Kembali'],
+                          ['id', 'timestamp', 'total_amount', 'payment', 'change'],
+                          "SELECT id, timestamp, total_amount, payment, change FROM sales", "timestamp", "timestamp, id"),
+    'sale_items': ExportSource(['ID Transaksi', 'Waktu', 'ID Produk', 'Nama Produk', 'Harga Satuan', 'Jumlah', 'Subtotal'],
+                               ['sale_id', 'timestamp', 'product_id', 'name', 'unit_price', 'quantity', 'subtotal'],
+                               """SELECT s.id, s.timestamp, si.product_id, si.name, si.unit_price, si.quantity, si.subtotal
+                                  FROM sales s JOIN sale_items si ON si.sale_id = s.id""", "s.timestamp", "s.timestamp, s.id, si.id"),
+}
+
+class ExportResult:
+    """Ringkasan hasil ekspor."""
+    def __init__(self, kind, file_path):
+        self.kind = kind
+        self.file_path = file_path
+        self.rows = 0
+        self.total_rows = 0
+        self.cancelled = False
+
+def _csv_export_writer(out, source):
+    writer = csv.writer(out)
+    writer.writerow(source.headers)
+    return writer.writerows
+
+def _jsonl_export_writer(out, source):
+    """Satu objek JSON ringkas per baris, dengan nama kolom database sebagai kunci."""
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    fields = source.fields
+    def write_rows(rows):
+        out.write("".join(encode(dict(zip(fields, row))) + "\n" for row in rows))
+    return write_rows
+
+EXPORT_FORMATS = {'csv': _csv_export_writer, 'jsonl': _jsonl_export_writer}
+
+def _export_query(source, start_day=None, end_day=None):
+    """Query dan parameter sumber ekspor, dengan filter rentang hari [start_day, end_day] jika ada."""
+    query, conditions, params = source.query, [], []
+    if source.time_column and start_day:
+        conditions.append(f"{source.time_column} >= ?")
+        params.append(start_day)
+    if source.time_column and end_day:
+        conditions.append(f"{source.time_column} < ?")
+        params.append(end_day + " ~") # Semua timestamp di hari end_day lebih kecil dari end_day + spasi + '~'
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    return query, params
+
+@timed("db.export_table")
+def export_table(kind, file_path, fmt='csv', compress=False, start_day=None, end_day=None,
+                 fetch_size=EXPORT_FETCH_SIZE, progress=None, cancel_event=None):
+    """Mengekspor 'products', 'sales' (per transaksi) atau 'sale_items' (per item) ke CSV/JSONL, opsional gzip.
+    start_day/end_day (YYYY-MM-DD) membatasi penjualan pada rentang hari tersebut. progress(ditulis, total)
+    dipanggil setelah tiap batch; cancel_event (threading.Event) menghentikan ekspor di antara batch.
+    Data ditulis ke file_path + ".part" lalu diganti namanya; jika ekspor dibatalkan atau gagal (termasuk
+    saat exception diteruskan ke pemanggil), file sementara itu sudah dihapus dan file_path tidak tersentuh.
+    """
+    source = EXPORT_SOURCES[kind]
+    make_writer = EXPORT_FORMATS[fmt]
+    result = ExportResult(kind, file_path)
+    cursor = None
+    if remote_server is not None and kind == 'products':
+        # Di mode kasir database ada di server; katalog di memori selalu mengikutinya
+        records = product_catalog.all_products()
+        result.total_rows = len(records)
+        batches = (records[i:i + fetch_size] for i in range(0, len(records), fetch_size))
+    else:
+        query, params = _export_query(source, start_day, end_day)
+        conn = connect_db()
+        result.total_rows = conn.execute(f"SELECT COUNT(*) FROM ({query})", params).fetchone()[0]
+        cursor = conn.execute(f"{query} ORDER BY {source.order_by}", params)
+        batches = iter(lambda: cursor.fetchmany(fetch_size), [])
+
+    temp_path = file_path + ".part"
+    try:
+        if compress:
+            out = gzip.open(temp_path, 'wt', compresslevel=EXPORT_GZIP_LEVEL, encoding='utf-8', newline='')
+        else:
+            out = open(temp_path, 'w', encoding='utf-8', newline='')
+        with out:
+            write_rows = make_writer(out, source)
+            for rows in batches:
+                if cancel_event is not None and cancel_event.is_set():
+                    result.cancelled = True
+                    break
+                write_rows(rows)
+                result.rows += len(rows)
+                if progress:
+                    progress(result.rows, result.total_rows)
+        if result.cancelled:
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass # Belum sempat dibuat, atau tidak bisa dihapus; error aslinya yang diteruskan
+        raise
     finally:
-        conn.close()
+        if cursor is not None:
+            cursor.close()
+    return result
+
+# --- Antrean Cetak Struk (Print Spooler) ---
+PRINTER_NAME = "Blueprint_M58"
+PRINT_SPOOL_DIR = "print_spool"
+RECEIPTS_DIR = "receipts"
+
+def receipt_layout_from_setting(paper=None):
+    """Tata letak struk dari pengaturan POS_RECEIPT_PAPER ('58mm' atau '80mm', bawaan 58mm)."""
+    paper = paper or os.environ.get("POS_RECEIPT_PAPER", "58mm")
+    try:
+        return receipt_layout(paper)
+    except ValueError as e:
+        print(f"Warning: {e} Memakai kertas 58mm.")
+        return receipt_layout('58mm')
+
+class Win32PrinterBackend:
+    """Mengirim data RAW ke printer Windows lewat win32print."""
+    accepts_escpos = True
+
+    def __init__(self, printer_name=PRINTER_NAME):
+        self.printer_name = printer_name
+        self.description = f"printer '{printer_name}'"
+
+    def send(self, data):
+        hPrinter = win32print.OpenPrinter(self.printer_name)
+        try:
+            win32print.StartDocPrinter(hPrinter, 1, ("Struk Belanja", None, "RAW"))
+            try:
+                win32print.StartPagePrinter(hPrinter)
+                win32print.WritePrinter(hPrinter, data)
+                win32print.EndPagePrinter(hPrinter)
+            finally:
+                win32print.EndDocPrinter(hPrinter)
+        finally:
+            win32print.ClosePrinter(hPrinter)
+
+class RawDevicePrinterBackend:
+    """Menulis data RAW langsung ke file atau device printer (mis. /dev/usb/lp0, LPT1)."""
+    accepts_escpos = True
+
+    def __init__(self, path):
+        self.path = path
+        self.description = f"device '{path}'"
+
+    def send(self, data):
+        with open(self.path, 'ab') as device:
+            device.write(data)
+            device.flush()
+
+class TcpPrinterBackend:
+    """Mengirim data RAW ke printer jaringan (port 9100) atau pengganti lokal untuk pengujian."""
+    accepts_escpos = True
+
+    def __init__(self, host, port=9100, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.description = f"printer {host}:{port}"
+
+    def send(self, data):
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as conn:
+            conn.sendall(data)
+            # Tunggu printer menutup koneksi: baru setelah itu job aman dihapus dari spool
+            conn.shutdown(socket.SHUT_WR)
+            while conn.recv(1024):
+                pass
+
+class ReceiptFileBackend:
+    """Menyimpan setiap struk sebagai file teks di folder receipts (dipakai jika tidak ada printer)."""
+    accepts_escpos = False # File struk dibaca manusia, jadi teks biasa
+
+    def __init__(self, directory=RECEIPTS_DIR):
+        self.directory = directory
+        self.description = f"folder '{directory}'"
+
+    def send(self, data):
+        os.makedirs(self.directory, exist_ok=True)
+        filename = datetime.now().strftime("receipt_%Y%m%d_%H%M%S_%f.txt")
+        with open(os.path.join(self.directory, filename), "wb") as f:
+            f.write(data)
+
+def printer_backend_from_setting(setting=None):
+    """Membuat backend printer dari pengaturan (variabel lingkungan POS_PRINTER jika tidak diberikan).
+    Format: 'win32:<nama printer>', 'device:<path>', 'tcp:<host>[:<port>]', 'file:<folder>'.
+    Tanpa pengaturan: win32 jika tersedia, selain itu struk disimpan ke folder receipts.
+    """
+    setting = setting if setting is not None else os.environ.get("POS_PRINTER", "")
+    kind, _, target = setting.partition(":")
+    if kind == "win32" and win32print:
+        return Win32PrinterBackend(target or PRINTER_NAME)
+    if kind == "device" and target:
+        return RawDevicePrinterBackend(target)
+    if kind == "tcp" and target:
+        host, _, port = target.partition(":")
+        return TcpPrinterBackend(host, int(port) if port else 9100)
+    if kind == "file":
+        return ReceiptFileBackend(target or RECEIPTS_DIR)
+    if setting:
+        print(f"Warning: pengaturan printer '{setting}' tidak dikenal, memakai pengaturan bawaan.")
+    return Win32PrinterBackend() if win32print else ReceiptFileBackend()
+
+class PrintSpooler:
+    """Antrean cetak di disk dengan satu thread pekerja.
+
+    submit() hanya menulis job ke folder spool (tulis ke .tmp lalu rename, jadi tidak ada
+    job setengah jadi) dan langsung kembali. Pekerja mengirim job berurutan ke backend;
+    jika gagal, dicoba lagi dengan jeda yang berlipat (backoff). Job yang tetap gagal setelah
+    `max_attempts` dipindahkan ke subfolder 'failed'. Job yang belum tercetak saat aplikasi
+    ditutup akan dicetak saat spooler dijalankan lagi.
+    on_event(jenis, nama job, keterangan) dipanggil dari thread pekerja untuk 'printed',
+    'retry' dan 'failed'.
+    """
+    def __init__(self, backend, spool_dir=PRINT_SPOOL_DIR, on_event=None,
+                 max_attempts=5, initial_backoff=0.5, max_backoff=30.0):
+        self.backend = backend
+        self.spool_dir = spool_dir
+        self.failed_dir = os.path.join(spool_dir, "failed")
+        self.on_event = on_event
+        self.max_attempts = max_attempts
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+
+        self.printed_count = 0
+        self.failed_count = 0
+        self.retry_count = 0
+        self.max_depth = 0
+        self.last_error = None
+
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._jobs = queue.Queue()
+        self._stopping = threading.Event()
+
+        os.makedirs(self.failed_dir, exist_ok=True)
+        # Job dari sesi sebelumnya (aplikasi ditutup/crash sebelum struk tercetak)
+        for name in sorted(os.listdir(spool_dir)):
+            if name.endswith(".job"):
+                self._jobs.put(name)
+        self._worker = threading.Thread(target=self._run_worker, name="print-spooler", daemon=True)
+        self._worker.start()
+
+    @timed("print.PrintSpooler.submit")
+    def submit(self, data):
+        """Menyimpan job cetak ke spool dan mengantrekannya. Mengembalikan nama job."""
+        with self._lock:
+            self._sequence += 1
+            name = f"{time.time_ns():020d}_{self._sequence:06d}.job"
+        path = os.path.join(self.spool_dir, name)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        self._jobs.put(name)
+        with self._lock:
+            self.max_depth = max(self.max_depth, self._jobs.qsize())
+        return name
+
+    def queue_depth(self):
+        """Jumlah job yang menunggu dicetak (termasuk yang sedang dicoba ulang)."""
+        return self._jobs.unfinished_tasks
+
+    def stats(self):
+        """Metrik antrean cetak."""
+        return {'queued': self.queue_depth(), 'max_depth': self.max_depth, 'printed': self.printed_count,
+                'failed': self.failed_count, 'retries': self.retry_count, 'last_error': self.last_error}
+
+    def wait_idle(self, timeout=None):
+        """Menunggu sampai antrean kosong (untuk pengujian/benchmark). True jika kosong."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue_depth():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout=2.0):
+        """Menghentikan pekerja; job yang belum tercetak tetap tersimpan di spool."""
+        self._stopping.set()
+        self._jobs.put(None)
+        self._worker.join(timeout)
+
+    def _emit(self, kind, name, detail=""):
+        if self.on_event:
+            self.on_event(kind, name, detail)
+
+    def _run_worker(self):
+        while True:
+            name = self._jobs.get()
+            try:
+                if name is None or self._stopping.is_set():
+                    return
+                self._print_job(name)
+            finally:
+                self._jobs.task_done()
+
+    @timed("print.PrintSpooler._print_job")
+    def _print_job(self, name):
+        path = os.path.join(self.spool_dir, name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            self.last_error = str(e)
+            return
+        delay = self.initial_backoff
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.backend.send(data)
+            except Exception as e:
+                self.last_error = str(e)
+                if attempt == self.max_attempts:
+                    break
+                self.retry_count += 1
+                self._emit('retry', name, f"{e} (percobaan {attempt + 1}/{self.max_attempts} dalam {delay:.1f} detik)")
+                if self._stopping.wait(delay):
+                    return # Aplikasi ditutup; job tetap di spool untuk sesi berikutnya
+                delay = min(delay * 2, self.max_backoff)
+            else:
+                os.remove(path)
+                self.printed_count += 1
+                self._emit('printed', name)
+                return
+        os.replace(path, os.path.join(self.failed_dir, name))
+        self.failed_count += 1
+        self._emit('failed', name, self.last_error)
+
+# --- Inti Keranjang & Checkout (Tanpa Widget) ---
+ScanResult = namedtuple('ScanResult', ['product', 'available', 'added', 'message', 'message_type'])
+
+class CartLine:
+    """Satu baris keranjang. __slots__: keranjang supermarket bisa berisi ratusan baris."""
+    __slots__ = ('product_id', 'name', 'price', 'quantity')
+
+    def __init__(self, product_id, name, price, quantity):
+        self.product_id = product_id
+        self.name = name
+        self.price = price
+        self.quantity = quantity
+
+    @property
+    def subtotal(self):
+        return self.price * self.quantity
+
+class Cart:
+    """Baris keranjang per product_id (urutan scan) dengan total yang diperbarui setiap perubahan.
 
-# Inisialisasi tabel saat aplikasi dimulai
-create_table()
-create_sales_table()
+    ID produk yang berubah sejak pop_changes() terakhir dicatat, jadi tampilan cukup menggambar
+    ulang baris-baris itu saja.
+    """
+    def __init__(self):
+        self._lines = {} # {product_id: CartLine}
+        self.total = 0
+        self._changed = {} # product_id yang berubah, urut sesuai perubahan (dict dipakai sebagai set berurutan)
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __contains__(self, product_id):
+        return product_id in self._lines
+
+    def __iter__(self):
+        return iter(self._lines.values())
+
+    def get(self, product_id):
+        return self._lines.get(product_id)
+
+    def quantity(self, product_id):
+        line = self._lines.get(product_id)
+        return line.quantity if line else 0
+
+    def add(self, product_id, name, price, quantity=1):
+        """Menambah `quantity` unit; baris baru dibuat di akhir jika produk belum ada."""
+        line = self._lines.get(product_id)
+        if line is None:
+            line = self._lines[product_id] = CartLine(product_id, name, price, 0)
+        line.quantity += quantity
+        self.total += price * quantity
+        self._changed[product_id] = None
+        return line
+
+    def set_quantity(self, product_id, quantity):
+        """Mengubah jumlah satu baris (0 = hapus baris)."""
+        if quantity <= 0:
+            return self.remove(product_id)
+        line = self._lines[product_id]
+        self.total += line.price * (quantity - line.quantity)
+        line.quantity = quantity
+        self._changed[product_id] = None
+        return line
+
+    def remove(self, product_id):
+        line = self._lines.pop(product_id, None)
+        if line is not None:
+            self.total -= line.subtotal
+            self._changed[product_id] = None
+        return line
+
+    def clear(self):
+        self._changed.update(dict.fromkeys(self._lines))
+        self._lines = {}
+        self.total = 0
+
+    def pop_changes(self):
+        """ID produk yang baris keranjangnya berubah sejak panggilan terakhir."""
+        changed, self._changed = self._changed, {}
+        return changed
+
+    def as_dict(self):
+        """{product_id: {'name', 'price', 'quantity'}}: format yang disimpan checkout_sale, outbox, dan struk."""
+        return {line.product_id: {'name': line.name, 'price': line.price, 'quantity': line.quantity}
+                for line in self._lines.values()}
+
+class CheckoutSession:
+    """Keranjang satu kasir beserta aturan scan, jumlah, dan checkout, tanpa widget Tk.
+
+    POSApp hanya menampilkan hasilnya; benchmark.py memakai kelas ini langsung untuk mengukur
+    scan dan checkout. Perubahan keranjang mengembalikan (berhasil, pesan, jenis pesan status bar).
+    Setiap unit di keranjang dipegang di stock_reservations atas nama `owner` sampai checkout.
+    """
+    def __init__(self):
+        self.cart = Cart()
+        self.owner = uuid.uuid4().hex # Pemegang reservasi stok untuk keranjang ini
+
+    @property
+    def total(self):
+        return self.cart.total
+
+    def quantity_in_cart(self, product_id):
+        return self.cart.quantity(product_id)
+
+    def available(self, product_id):
+        """Stok yang masih bisa dijual (di luar semua keranjang yang diketahui)."""
+        return stock_reservations.available(product_id)
+
+    def lookup(self, product_id):
+        """(produk, stok tersedia di luar keranjang) tanpa mengubah keranjang; (None, 0) jika tidak ada."""
+        product = get_product_by_id(product_id)
+        if product is None:
+            return None, 0
+        return product, stock_reservations.available(product[0])
+
+    def scan(self, product_id, quantity=1):
+        """Satu scan barcode: cari produk lalu tambahkan `quantity` unit (awalan '6*barcode') jika stoknya cukup."""
+        product_id = product_id.strip()
+        product, available = self.lookup(product_id)
+        if product is None:
+            diagnostics.increment("scan.not_found")
+            return ScanResult(None, 0, False, f"Produk dengan ID '{product_id}' tidak ditemukan.", 'warning')
+        prod_id, name, price, stock = product
+        if available <= 0:
+            return ScanResult(product, available, False,
+                              f"Stok untuk '{name}' (ID: {prod_id}) sudah habis atau sudah di keranjang.", 'warning')
+        added, message, message_type, available = self._add_units(prod_id, name, price, quantity)
+        return ScanResult(product, available, added, message, message_type)
+
+    def add(self, product_id, name, price):
+        """Menambah satu unit produk ke keranjang (mis. dari pilihan live search)."""
+        product_id = product_id.strip()
+        if get_product_by_id(product_id) is None:
+            return False, "Produk tidak ditemukan di database.", 'error'
+        return self._add_units(product_id, name, price)[:3]
+
+    def _add_units(self, product_id, name, price, quantity=1):
+        """Memegang `quantity` unit lalu menambahkannya ke keranjang (semua atau tidak sama sekali):
+        (berhasil, pesan, jenis pesan, tersedia).
+        """
+        success, available = reserve_stock(self.owner, product_id, quantity)
+        line = self.cart.get(product_id)
+        if success:
+            line_quantity = self.cart.add(product_id, name, price, quantity).quantity
+            if quantity > 1:
+                return True, f"{quantity} x '{name}' ditambahkan ke keranjang (jumlah: {line_quantity}).", 'success', available
+            if line is not None:
+                return True, f"Jumlah '{name}' di keranjang ditambahkan.", 'success', available
+            return True, f"'{name}' ditambahkan ke keranjang.", 'success', available
+        if quantity > 1:
+            return False, f"Stok '{name}' tidak cukup untuk {quantity} unit (tersedia {max(available, 0)}).", 'warning', available
+        if line is not None:
+            return (False, f"Tidak bisa menambahkan lebih banyak '{name}'. Stok maksimal tercapai ({line.quantity + max(available, 0)}).",
+                    'warning', available)
+        if remote_server is not None:
+            return False, f"Stok untuk '{name}' sudah habis atau sedang di keranjang kasir lain.", 'warning', available
+        return False, f"Stok untuk '{name}' sudah habis.", 'warning', available
+
+    def set_quantity(self, product_id, quantity):
+        """Mengubah jumlah item di keranjang (0 = hapus), dibatasi stok yang belum dipegang keranjang lain."""
+        line = self.cart.get(product_id)
+        if line is None:
+            return False, "Item tidak ada di keranjang.", 'warning'
+        if quantity <= 0:
+            return self.remove(product_id)
+        if quantity != line.quantity:
+            success, available = reserve_stock(self.owner, product_id, quantity - line.quantity)
+            if not success:
+                return False, f"Jumlah baru ({quantity}) melebihi stok tersedia ({line.quantity + max(available, 0)}).", 'warning'
+        self.cart.set_quantity(product_id, quantity)
+        return True, f"Jumlah '{line.name}' di keranjang diperbarui menjadi {quantity}.", 'success'
+
+    def remove(self, product_id):
+        line = self.cart.remove(product_id)
+        if line is None:
+            return False, "Item tidak ada di keranjang.", 'warning'
+        reserve_stock(self.owner, product_id, -line.quantity)
+        return True, f"'{line.name}' berhasil dihapus dari keranjang.", 'success'
+
+    def clear(self):
+        self.cart.clear()
+        release_reservations(self.owner)
+
+    def checkout(self, timestamp=None, payment=None):
+        """Menyimpan keranjang lewat checkout_sale lalu mengosongkannya jika berhasil. Pembayaran default = pas."""
+        if not self.cart:
+            return False, "Keranjang belanja kosong. Tambahkan produk terlebih dahulu."
+        total = self.total
+        payment = total if payment is None else payment
+        success, message = checkout_sale(self.cart.as_dict(), timestamp or current_timestamp(), total, payment, payment - total,
+                                         reservation_owner=self.owner)
+        if success:
+            # checkout_sale sudah melepas pegangan untuk unit yang terjual. Di mode kasir pegangan di
+            # server tetap ada sampai penjualan dari outbox diterapkan, jadi yang dibersihkan hanya cermin lokal.
+            self.cart.clear()
+            stock_reservations.release_all(self.owner)
+        return success, message
+
+# --- Pencarian Asinkron dengan Debounce ---
+class DebouncedSearch:
+    """Menjalankan live search di thread pekerja, terpisah dari thread Tk.
+
+    Ketikan ditunda (debounce) sampai pengguna berhenti mengetik selama `delay_ms`.
+    Setiap permintaan diberi nomor generasi; hasil dari generasi yang sudah usang
+    dibuang, dan hanya hasil terbaru yang dikirim kembali ke Tk lewat root.after.
+    """
+    POLL_MS = 10
+    LATENCY_SAMPLES = 200
+
+    def __init__(self, root, get_term, search_func, render_func, delay_ms=100):
+        self.root = root
+        self.get_term = get_term
+        self.search_func = search_func
+        self.render_func = render_func
+        self.delay_ms = delay_ms
+
+        self._generation = 0
+        self._awaiting = None     # Generasi yang sedang ditunggu hasilnya
+        self._last_term = None
+        self._input_time = None   # perf_counter saat input terakhir
+        self._debounce_timer = None
+        self._poll_timer = None
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self.latencies_ms = deque(maxlen=self.LATENCY_SAMPLES) # Latensi input-ke-render
+
+        self._worker = threading.Thread(target=self._run_worker, name="live-search", daemon=True)
+        self._worker.start()
+
+    def schedule(self, event=None):
+        """Dipanggil setiap <KeyRelease>: tunda pencarian sampai ketikan berhenti."""
+        self._input_time = time.perf_counter()
+        if self._debounce_timer:
+            self.root.after_cancel(self._debounce_timer)
+        self._debounce_timer = self.root.after(self.delay_ms, self._submit)
+
+    def refresh(self):
+        """Menjalankan ulang pencarian sekarang juga (misal setelah data berubah)."""
+        self._input_time = time.perf_counter()
+        if self._debounce_timer:
+            self.root.after_cancel(self._debounce_timer)
+        self._submit(force=True)
+
+    def _submit(self, force=False):
+        self._debounce_timer = None
+        term = self.get_term()
+        if not force and term == self._last_term:
+            return # Tombol non-karakter (Shift, panah, ...) tidak mengubah kata kunci
+        self._last_term = term
+        self._generation += 1
+        self._awaiting = self._generation
+        self._requests.put((self._generation, term, self._input_time))
+        if self._poll_timer is None:
+            self._poll_timer = self.root.after(self.POLL_MS, self._poll_results)
+
+    def _run_worker(self):
+        try:
+            self._serve_requests()
+        finally:
+            db_manager.close_thread_connection()
+
+    def _serve_requests(self):
+        while True:
+            generation, term, input_time = self._requests.get()
+            if generation is None:
+                break
+            if generation != self._generation:
+                continue # Sudah ada permintaan yang lebih baru, lewati
+            try:
+                results = self.search_func(term)
+            except Exception as e:
+                print(f"Error during live search: {e}")
+                results = []
+            if generation == self._generation:
+                self._results.put((generation, results, input_time))
+
+    def _poll_results(self):
+        """Dijalankan di thread Tk: ambil hasil terbaru dan tampilkan."""
+        self._poll_timer = None
+        latest = None
+        while True:
+            try:
+                latest = self._results.get_nowait()
+            except queue.Empty:
+                break
+        if latest is not None and latest[0] == self._generation:
+            generation, results, input_time = latest
+            self.render_func(results)
+            self._awaiting = None
+            if input_time is not None:
+                self.latencies_ms.append((time.perf_counter() - input_time) * 1000)
+        if self._awaiting is not None:
+            self._poll_timer = self.root.after(self.POLL_MS, self._poll_results)
+
+    def latency_summary(self):
+        """Ringkasan latensi input-ke-render (ms): jumlah sampel, p50, p99, terakhir."""
+        if not self.latencies_ms:
+            return None
+        ordered = sorted(self.latencies_ms)
+        return {'samples': len(ordered),
+                'p50_ms': ordered[len(ordered) // 2],
+                'p99_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+                'last_ms': self.latencies_ms[-1]}
+
+    def stop(self):
+        """Menghentikan thread pekerja."""
+        if self._debounce_timer:
+            self.root.after_cancel(self._debounce_timer)
+            self._debounce_timer = None
+        self._generation += 1
+        self._requests.put((None, None, None))
+
+@timed("search.search_products")
+def search_products(search_term):
+    """Semua produk jika kata kunci kosong, selain itu hasil pencarian ID/nama."""
+    if not search_term:
+        return get_all_products()
+    return get_products_by_search_term(search_term)
+
+# --- Input Barcode Scanner ---
+# Scanner barcode (keyboard wedge) mengetik seluruh kode dalam satu semburan dengan jeda antar tombol
+# beberapa milidetik; manusia mengetik dengan jeda puluhan sampai ratusan milidetik. Dari waktu event
+# KeyPress, ScannerInput membedakan keduanya tanpa menahan scan berulang barang yang sama.
+SCANNER_KEY_INTERVAL_MS = 35    # Jeda antar tombol maksimum yang masih dianggap satu semburan scanner
+SCANNER_MIN_BURST = 4           # Karakter berurutan secepat itu sebelum input dianggap dari scanner
+SCANNER_SUFFIX_TIMEOUT_MS = 100 # Semburan tanpa Enter (scanner tanpa suffix) dikirim setelah jeda ini
+SCAN_BATCH_SIZE = 20            # Scan yang diproses per giliran idle Tk
+MAX_SCAN_QUANTITY = 999
+
+ScanInput = namedtuple('ScanInput', ['text', 'source']) # source: 'scanner' atau 'keyboard'
+SCAN_QUANTITY_PATTERN = re.compile(r"(\d+)\s*\*\s*(.*)")
+
+def parse_scan_input(text):
+    """'6*8991002101' -> ('8991002101', 6); tanpa awalan jumlah -> (text, 1).
+    ValueError jika awalan jumlahnya tidak valid atau barcode-nya kosong.
+    """
+    text = text.strip()
+    match = SCAN_QUANTITY_PATTERN.fullmatch(text)
+    if match is None:
+        return text, 1
+    quantity, product_id = int(match.group(1)), match.group(2).strip()
+    if not product_id:
+        raise ValueError(f"Scan barcode setelah '{match.group(1)}*'.")
+    if not 1 <= quantity <= MAX_SCAN_QUANTITY:
+        raise ValueError(f"Jumlah scan harus antara 1 dan {MAX_SCAN_QUANTITY}.")
+    return product_id, quantity
+
+class ScannerInput:
+    """Antrean input barcode untuk satu Entry: membedakan semburan scanner dari ketikan manual.
+
+    key() dipanggil setiap <KeyPress> dengan waktu event (ms), submit() saat Enter. Setiap input
+    yang dikirim masuk antrean dan langsung dikosongkan dari Entry, sehingga scan berikutnya bisa
+    masuk sementara yang sebelumnya belum diproses. Antrean diproses berurutan di giliran idle Tk,
+    paling banyak SCAN_BATCH_SIZE per giliran, lewat process_batch([ScanInput, ...]).
+    """
+    def __init__(self, root, get_text, clear_text, process_batch, key_interval_ms=SCANNER_KEY_INTERVAL_MS,
+                 min_burst=SCANNER_MIN_BURST, suffix_timeout_ms=SCANNER_SUFFIX_TIMEOUT_MS):
+        self.root = root
+        self.get_text = get_text
+        self.clear_text = clear_text
+        self.process_batch = process_batch
+        self.key_interval_ms = key_interval_ms
+        self.min_burst = min_burst
+        self.suffix_timeout_ms = suffix_timeout_ms
+
+        self.queue = deque()
+        self._last_key_ms = None
+        self._run_length = 0  # Panjang rangkaian tombol cepat terakhir
+        self._run_start = 0   # Posisi karakter pertama rangkaian itu di teks Entry
+        self._suffix_timer = None
+        self._drain_job = None
+
+    def key(self, event):
+        """Dipanggil setiap <KeyPress>, sebelum Entry menyisipkan karakternya."""
+        char = event.char
+        if not char:
+            return # Shift dan tombol tanpa karakter (scanner mengirim Shift untuk huruf besar)
+        if not char.isprintable():
+            self._reset_run() # Backspace dan sejenisnya: pasti diedit manusia
+            return
+        if self._last_key_ms is not None and 0 <= event.time - self._last_key_ms <= self.key_interval_ms:
+            self._run_length += 1
+        else:
+            self._run_length = 1
+            self._run_start = len(self.get_text())
+        self._last_key_ms = event.time
+        if self.suffix_timeout_ms is not None and self.is_burst():
+            if self._suffix_timer:
+                self.root.after_cancel(self._suffix_timer)
+            self._suffix_timer = self.root.after(self.suffix_timeout_ms, self._on_burst_idle)
+
+    def is_burst(self):
+        """True jika tombol-tombol terakhir datang secepat scanner."""
+        return self._run_length >= self.min_burst
+
+    def submit(self, event=None):
+        """Mengirim isi Entry ke antrean (Enter atau akhir semburan): ScanInput, atau None jika kosong."""
+        text = self.get_text()
+        source = 'scanner' if self.is_burst() else 'keyboard'
+        if source == 'scanner' and self._run_start:
+            # Sisa ketikan sebelum semburan dibuang, kecuali awalan jumlah ('6*')
+            prefix = text[:self._run_start].strip()
+            if prefix and SCAN_QUANTITY_PATTERN.fullmatch(prefix) is None:
+                diagnostics.increment("scan.stray_text_dropped")
+                text = text[self._run_start:]
+        self.clear_text()
+        self._reset_run()
+        text = text.strip()
+        if not text:
+            return None
+        scan = ScanInput(text, source)
+        self.queue.append(scan)
+        if self._drain_job is None:
+            self._drain_job = self.root.after_idle(self._drain)
+        return scan
+
+    def _on_burst_idle(self):
+        self._suffix_timer = None
+        if self.is_burst():
+            self.submit()
+
+    def _reset_run(self):
+        self._last_key_ms = None
+        self._run_length = 0
+        self._run_start = 0
+        if self._suffix_timer:
+            self.root.after_cancel(self._suffix_timer)
+            self._suffix_timer = None
+
+    def flush(self):
+        """Memproses semua input yang masih antre sekarang juga, termasuk semburan yang belum di-Enter.
+        Dipanggil sebelum checkout agar scan terakhir ikut masuk transaksi ini.
+        """
+        if self._suffix_timer and self.is_burst():
+            self.submit()
+        self._cancel_drain()
+        while self.queue:
+            self.process_batch(self._next_batch())
+
+    def discard(self):
+        """Membuang input yang belum diproses (transaksi dibatalkan)."""
+        self._cancel_drain()
+        self.queue.clear()
+        self._reset_run()
+
+    def _next_batch(self):
+        return [self.queue.popleft() for _ in range(min(len(self.queue), SCAN_BATCH_SIZE))]
+
+    def _cancel_drain(self):
+        if self._drain_job:
+            self.root.after_cancel(self._drain_job)
+            self._drain_job = None
+
+    def _drain(self):
+        self._drain_job = None
+        batch = self._next_batch()
+        if self.queue:
+            self._drain_job = self.root.after_idle(self._drain)
+        if batch:
+            self.process_batch(batch)
+
+# --- Treeview Virtual untuk Daftar Produk Besar ---
+# Sorting per kolom untuk daftar produk (row = (id, name, price, stock))
+PRODUCT_SORT_KEYS = {
+    "ID": lambda row: str(row[0]),
+    "Nama Produk": lambda row: row[1],
+    "Harga": lambda row: row[2],
+    "Stok": lambda row: row[3],
+}
+
+class VirtualTreeview:
+    """Menampilkan daftar besar di ttk.Treeview secara bertahap.
+
+    Seluruh data disimpan di array `rows` di memori (urut tampilan). Hanya satu halaman
+    baris yang dibuat di widget; halaman berikutnya ditambahkan saat pengguna menggulir
+    mendekati bawah. Sorting dan filtering bekerja pada array, bukan pada widget.
+    Baris dikenali dari kolom pertamanya (ID produk).
+    """
+    PAGE_SIZE = 100
+    LOAD_MORE_AT = 0.9 # Muat halaman berikutnya saat posisi gulir melewati 90%
+
+    def __init__(self, tree, scrollbar, format_row, sort_keys=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.format_row = format_row   # row -> tuple values untuk Treeview
+        self.sort_keys = sort_keys or {} # {kolom: fungsi key untuk sorting}
+        self.rows = []
+        self._positions = {}  # {row key: indeks di rows}; indeks >= _valid_upto mungkin usang
+        self._valid_upto = 0
+        self._item_ids = {}   # {row key: item id Treeview}, hanya baris yang sudah dibuat
+        self._rendered = 0
+        self._load_pending = False
+        self._sort_column = None
+        self._sort_reverse = False
+
+        tree.configure(yscrollcommand=self._on_scroll)
+        for column in self.sort_keys:
+            tree.heading(column, command=lambda c=column: self.sort_by(c))
+
+    @staticmethod
+    def row_key(row):
+        return str(row[0]).strip()
+
+    @timed("tree.VirtualTreeview.set_rows")
+    def set_rows(self, rows):
+        """Mengganti seluruh data lalu menampilkan halaman pertama."""
+        self.rows = list(rows)
+        if self._sort_column is not None:
+            self.rows.sort(key=self.sort_keys[self._sort_column], reverse=self._sort_reverse)
+        self._reindex()
+        self._reset_widget()
+
+    def sort_by(self, column):
+        """Mengurutkan data berdasarkan kolom (klik kedua membalik urutan)."""
+        if self._sort_column == column:
+            self._sort_reverse = not self._sort_reverse
+        else:
+            self._sort_column, self._sort_reverse = column, False
+        self.rows.sort(key=self.sort_keys[column], reverse=self._sort_reverse)
+        self._reindex()
+        self._reset_widget()
+
+    def _reindex(self):
+        self._positions = {self.row_key(row): i for i, row in enumerate(self.rows)}
+        self._valid_upto = len(self.rows)
+
+    def _position(self, key):
+        """Indeks baris `key` di rows. Sisip/hapus di tengah hanya menandai indeks di belakangnya usang;
+        indeks itu dihitung ulang sekali saat dibutuhkan, bukan pada setiap perubahan.
+        """
+        position = self._positions[key]
+        if position >= self._valid_upto or self.row_key(self.rows[position]) != key:
+            for i in range(self._valid_upto, len(self.rows)):
+                self._positions[self.row_key(self.rows[i])] = i
+            self._valid_upto = len(self.rows)
+            position = self._positions[key]
+        return position
+
+    def _reset_widget(self):
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self._item_ids = {}
+        self._rendered = 0
+        self._render_more()
+
+    @timed("tree.VirtualTreeview._render_more")
+    def _render_more(self):
+        self._load_pending = False
+        end = min(len(self.rows), self._rendered + self.PAGE_SIZE)
+        for row in self.rows[self._rendered:end]:
+            self._item_ids[self.row_key(row)] = self.tree.insert("", "end", values=self.format_row(row))
+        self._rendered = end
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) >= self.LOAD_MORE_AT and self._rendered < len(self.rows) and not self._load_pending:
+            self._load_pending = True
+            self.tree.after_idle(self._render_more)
+
+    def __contains__(self, key):
+        return str(key).strip() in self._positions
+
+    @timed("tree.VirtualTreeview.update_row")
+    def update_row(self, row):
+        """Memperbarui baris yang sudah ada di daftar; False jika baris tidak ada."""
+        key = self.row_key(row)
+        if key not in self._positions:
+            return False
+        self.upsert(row)
+        return True
+
+    @timed("tree.VirtualTreeview.upsert")
+    def upsert(self, row):
+        """Memperbarui baris yang ada atau menambahkan baris baru. Dengan kolom sort aktif, baris baru
+        (atau baris yang nilai kolom sort-nya berubah) ditempatkan di posisi urutnya; tanpa sort, di akhir.
+        """
+        key = self.row_key(row)
+        if key in self._positions:
+            position = self._position(key)
+            sort_key = self.sort_keys.get(self._sort_column)
+            if sort_key is None or sort_key(self.rows[position]) == sort_key(row):
+                self.rows[position] = row
+                item_id = self._item_ids.get(key)
+                if item_id is not None:
+                    self.tree.item(item_id, values=self.format_row(row))
+                return
+            self._remove_at(position)
+        self._insert(row)
+
+    def _insert_position(self, row):
+        """bisect_right pada kolom sort aktif (juga untuk urutan terbalik); akhir daftar jika tidak di-sort."""
+        if self._sort_column is None:
+            return len(self.rows)
+        sort_key = self.sort_keys[self._sort_column]
+        value = sort_key(row)
+        low, high = 0, len(self.rows)
+        while low < high:
+            middle = (low + high) // 2
+            other = sort_key(self.rows[middle])
+            if (value > other) if self._sort_reverse else (value < other):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def _insert(self, row):
+        key = self.row_key(row)
+        position = self._insert_position(row)
+        self.rows.insert(position, row)
+        self._positions[key] = position
+        self._valid_upto = position + 1 if self._valid_upto >= position else self._valid_upto
+        # Baris yang dibuat di widget selalu awalan rows[:_rendered]
+        if position < self._rendered or self._rendered == len(self.rows) - 1:
+            self._item_ids[key] = self.tree.insert("", position, values=self.format_row(row))
+            self._rendered += 1
+
+    def _remove_at(self, position):
+        key = self.row_key(self.rows.pop(position))
+        del self._positions[key]
+        self._valid_upto = min(self._valid_upto, position)
+        item_id = self._item_ids.pop(key, None)
+        if item_id is not None:
+            self.tree.delete(item_id)
+            self._rendered -= 1
+
+    def remove(self, key):
+        """Menghapus baris berdasarkan key (ID produk)."""
+        self.remove_many((key,))
+
+    @timed("tree.VirtualTreeview.remove_many")
+    def remove_many(self, keys):
+        """Menghapus beberapa baris sekaligus: satu kali filter dan reindex, satu panggilan delete ke widget."""
+        keys = {str(key).strip() for key in keys}
+        keys.intersection_update(self._positions)
+        if not keys:
+            return
+        if len(keys) == 1:
+            self._remove_at(self._position(next(iter(keys))))
+            return
+        item_ids = [self._item_ids.pop(key) for key in keys if key in self._item_ids]
+        if item_ids:
+            self.tree.delete(*item_ids)
+            self._rendered -= len(item_ids)
+        self.rows = [row for row in self.rows if self.row_key(row) not in keys]
+        self._reindex()
+
+    @timed("tree.VirtualTreeview.refresh_rendered")
+    def refresh_rendered(self):
+        """Memformat ulang baris yang sudah tampil (misal setelah isi keranjang berubah)."""
+        for row in self.rows[:self._rendered]:
+            self.tree.item(self._item_ids[self.row_key(row)], values=self.format_row(row))
+
+# Inisialisasi skema saat aplikasi dimulai (database yang sudah terbaru hanya membaca satu PRAGMA)
+_schema_started = time.perf_counter()
+ensure_schema()
+diagnostics.histogram("startup.schema").record(time.perf_counter() - _schema_started)
 
 # --- 2. Kelas Aplikasi POS dengan Tkinter ---
 class POSApp:
+    UI_POLL_MS = 50 # Interval pemrosesan antrean panggilan dari thread lain
+    FULL_REFRESH_THRESHOLD = 2000 # Di atas jumlah perubahan ini, tampilan dimuat ulang penuh
+
     def __init__(self, root):
+        ui_started = time.perf_counter()
         self.root = root
         self.root.title("Aplikasi POS Sederhana - Toko GRAND")
         self.root.geometry("1000x700")
@@ -246,28 +3109,124 @@ class POSApp:
         self.low_stock_frame = ttk.Frame(self.notebook, style='TFrame')
         self.notebook.add(self.low_stock_frame, text="Laporan Stok")
 
-        # Initialize cart and total (important to do before UI creation)
-        self.cart = {} # {product_id: {'name': name, 'price': price, 'quantity': quantity}}
-        self.total = 0.0
+        # Tab Laporan Penjualan
+        self.sales_report_frame = ttk.Frame(self.notebook, style='TFrame')
+        self.notebook.add(self.sales_report_frame, text="Laporan Penjualan")
 
-        # Debounce variables for scanner input
-        self.last_scanned_id = None
-        self.scan_debounce_timer = None
-        self.SCAN_DEBOUNCE_MS = 200 # Milliseconds to wait before processing same ID again
+        # Notifications may come from worker threads (outbox syncer, spooler, catalog), so they are
+        # handed to the Tk thread. The queue must exist before connect_to_server starts the syncer;
+        # it is drained once the widgets exist (_drain_ui_calls below).
+        self._ui_calls = queue.Queue()
+        self._pending_product_changes = set()
+        self._product_changes_lock = threading.Lock()
+
+        # Mode multi-kasir: katalog diambil dari pos_server dan diperbarui lewat push
+        server_address = os.environ.get('POS_SERVER')
+        if server_address:
+            try:
+                connect_to_server(server_address, on_outbox_event=lambda *event: self.call_in_ui(self._on_outbox_event, *event))
+                self.root.title(f"{self.root.title()} - Kasir (server {server_address})")
+            except (ServerError, ValueError) as e:
+                messagebox.showwarning("Server POS", f"Tidak bisa terhubung ke server {server_address}:\n{e}\n\nAplikasi berjalan dengan database lokal.")
+
+        # Load the product catalog into memory once; scans are served from it
+        if remote_server is None:
+            catalog_started = time.perf_counter()
+            load_product_catalog(index_in_background=True) # Scan bisa dimulai sebelum indeks live search selesai
+            diagnostics.histogram("startup.catalog").record(time.perf_counter() - catalog_started)
+
+        # Cart and checkout rules live in CheckoutSession (important to do before UI creation)
+        self.session = CheckoutSession()
+        self.cart_rows = {} # {product_id: item id Treeview keranjang}
 
         # Status bar at the bottom
         self.status_label = ttk.Label(root, text="Siap.", relief=tk.SUNKEN, anchor=tk.W, font=('Segoe UI', 9))
         self.status_label.pack(side=tk.BOTTOM, fill=tk.X, ipadx=5, ipady=2)
         self.status_clear_timer = None # To hold the ID of the after call
 
-        # Call UI creation methods - ensure methods are defined before they are called
-        self.create_product_management_ui(self.product_frame)
+        # Ekspor data berjalan di thread terpisah; progresnya tampil di status bar
+        self.export_thread = None
+        self.export_cancel = None
+
+        # Only the transaction tab is built at startup so the cashier can scan right away.
+        # The other tabs (and their product/report trees) are built the first time they are opened.
+        self.tab_builders = {str(self.product_frame): (self.create_product_management_ui, self.product_frame),
+                             str(self.low_stock_frame): (self.create_low_stock_report_ui, self.low_stock_frame),
+                             str(self.sales_report_frame): (self.create_sales_report_ui, self.sales_report_frame)}
         self.create_transaction_ui(self.transaction_frame)
-        self.create_low_stock_report_ui(self.low_stock_frame)
+        self.notebook.select(self.transaction_frame)
+        self.transaction_search_id_entry.focus_set()
+
+        if remote_server is not None:
+            # Laporan penjualan membaca database langsung; di mode kasir dibuka di komputer server
+            self.notebook.hide(self.sales_report_frame)
+
+        # Tab dibangun saat pertama dibuka; laporan penjualan dimuat ulang setiap kali tab-nya dibuka
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
 
         # Bind F12 to complete_transaction
         self.root.bind('<F12>', self.complete_transaction_shortcut)
 
+        # F8: jendela diagnostik, F9: mulai/berhenti merekam profil cProfile
+        self.profile_capture = diagnostics.ProfileCapture()
+        self.diagnostics_window = None
+        self.root.bind('<F8>', lambda event: self.show_diagnostics_window())
+        self.root.bind('<F9>', lambda event: self.toggle_profiling())
+
+        # Close database connections cleanly when the window is closed
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Views follow database changes row by row instead of reloading everything.
+        product_catalog.subscribe(self._on_products_changed)
+        self._drain_ui_calls()
+
+        # Struk dicetak oleh thread spooler, jadi checkout tidak menunggu printer
+        self.print_spooler = PrintSpooler(printer_backend_from_setting(),
+                                          on_event=lambda *event: self.call_in_ui(self._on_print_event, *event))
+        self.receipt_renderer = ReceiptRenderer(receipt_layout_from_setting())
+
+        diagnostics.histogram("startup.ui").record(time.perf_counter() - ui_started)
+        # Siap dipakai = event loop Tk pertama kali menganggur (jendela sudah tampil)
+        self.root.after_idle(lambda: diagnostics.histogram("startup.ready").record(time.perf_counter() - STARTUP_STARTED))
+
+    def tab_built(self, frame):
+        """True jika isi tab `frame` sudah dibangun."""
+        return str(frame) not in self.tab_builders
+
+    def build_tab(self, frame):
+        """Membangun isi tab `frame` jika belum (dipanggil saat tab pertama kali dibuka)."""
+        builder = self.tab_builders.pop(str(frame), None)
+        if builder is not None:
+            started = time.perf_counter()
+            create_ui, parent_frame = builder
+            create_ui(parent_frame)
+            diagnostics.histogram(f"startup.tab.{create_ui.__name__}").record(time.perf_counter() - started)
+
+    @property
+    def cart(self):
+        return self.session.cart
+
+    @property
+    def total(self):
+        return self.session.total
+
+    def on_close(self):
+        """Menghentikan thread pencarian dan spooler, menutup koneksi database dengan bersih, lalu menutup aplikasi."""
+        self.live_search.stop()
+        if self.tab_built(self.product_frame):
+            self.product_management_search.stop()
+        self.print_spooler.stop()
+        if self.profile_capture.running:
+            self.profile_capture.stop()
+        self.scanner_input.discard()
+        self.session.clear() # Lepas stok yang dipegang keranjang yang belum dibayar
+        if self.export_thread and self.export_thread.is_alive():
+            self.export_cancel.set()
+            self.export_thread.join(timeout=5) # File setengah jadi dihapus oleh export_table
+        disconnect_from_server()
+        db_manager.close_all()
+        self.root.destroy()
+
     def update_status(self, message, message_type='info', duration=3000):
         """Updates the status bar with a message for a given duration."""
         if self.status_clear_timer:
@@ -288,18 +3247,192 @@ class POSApp:
         """Clears the status bar."""
         self.status_label.config(text="Siap.", foreground='black')
 
+    def call_in_ui(self, func, *args):
+        """Menjadwalkan func(*args) untuk dijalankan di thread Tk (aman dipanggil dari thread mana pun)."""
+        self._ui_calls.put((func, args))
+
+    def _drain_ui_calls(self):
+        """Menjalankan panggilan yang diantrekan oleh call_in_ui (berjalan berkala di thread Tk)."""
+        while True:
+            try:
+                func, args = self._ui_calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Error in UI callback {getattr(func, '__name__', func)}: {e}")
+        self.root.after(self.UI_POLL_MS, self._drain_ui_calls)
+
+    def _on_products_changed(self, product_ids):
+        """Listener perubahan produk dari lapisan database; menggabungkan ID lalu memperbarui tampilan di thread Tk."""
+        with self._product_changes_lock:
+            schedule = not self._pending_product_changes
+            self._pending_product_changes.update(product_ids)
+        if schedule:
+            self.call_in_ui(self._apply_product_changes)
+
+    @timed("tree._apply_product_changes")
+    def _apply_product_changes(self):
+        """Memperbarui hanya baris produk yang berubah di semua tampilan."""
+        with self._product_changes_lock:
+            product_ids, self._pending_product_changes = self._pending_product_changes, set()
+        if not product_ids:
+            return
+        # Tab yang belum dibangun tidak perlu diperbarui: saat dibuka, isinya dimuat dari katalog terbaru
+        views = [(self.live_search_list, self.live_search)]
+        if self.tab_built(self.product_frame):
+            views.append((self.product_list, self.product_management_search))
+        low_stock_built = self.tab_built(self.low_stock_frame)
+
+        if len(product_ids) > self.FULL_REFRESH_THRESHOLD:
+            # Perubahan massal (mis. impor CSV): satu pencarian ulang lebih murah daripada ribuan upsert
+            for _, search in views:
+                search.refresh()
+            if low_stock_built:
+                self.load_low_stock_to_tree()
+            return
+
+        for product_view, search in views:
+            show_all = not search.get_term()
+            rerun_search = False
+            removed = []
+            for product_id in product_ids:
+                record = product_catalog.peek(product_id)
+                if record is None:
+                    removed.append(product_id)
+                elif product_view.update_row(record):
+                    continue
+                elif show_all:
+                    product_view.upsert(record)
+                else:
+                    rerun_search = True # A new product might match the active search term
+            product_view.remove_many(removed)
+            if rerun_search:
+                search.refresh()
+
+        if low_stock_built:
+            self._update_low_stock_rows(product_ids)
+
+    # --- Diagnostik (F8) dan Profil (F9) ---
+    DIAGNOSTICS_REFRESH_MS = 1000
+
+    def _diagnostics_extra(self):
+        """Statistik komponen yang ikut ditampilkan/diekspor bersama hasil pengukuran."""
+        extra = {'catalog': product_catalog.stats(), 'reservations': stock_reservations.stats(),
+                 'print_spooler': self.print_spooler.stats(),
+                 'live_search_latency': self.live_search.latency_summary()}
+        if self.tab_built(self.product_frame):
+            extra['product_search_latency'] = self.product_management_search.latency_summary()
+        if sale_outbox is not None:
+            extra['outbox'] = sale_outbox.counts()
+        return extra
+
+    def show_diagnostics_window(self):
+        """Membuka jendela diagnostik: waktu per operasi (jumlah, rata-rata, p50, p99, maks) dan counter."""
+        if self.diagnostics_window is not None and self.diagnostics_window.winfo_exists():
+            self.diagnostics_window.lift()
+            return
+        window = Toplevel(self.root)
+        window.title("Diagnostik Kinerja")
+        window.transient(self.root)
+        self.diagnostics_window = window
+
+        frame = ttk.Frame(window, padding="15")
+        frame.pack(fill="both", expand=True)
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(1, weight=1)
+
+        controls = ttk.Frame(frame)
+        controls.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 10))
+        enabled_var = tk.BooleanVar(value=diagnostics.enabled)
+        ttk.Checkbutton(controls, text="Aktifkan pengukuran", variable=enabled_var,
+                        command=lambda: diagnostics.set_enabled(enabled_var.get())).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(controls, text="Reset", command=lambda: (diagnostics.reset(), refresh()), style='TButton').pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="Ekspor...", command=self.export_diagnostics, style='TButton').pack(side=tk.LEFT, padx=5)
+        self.profile_button = ttk.Button(controls, text="Hentikan Profil (F9)" if self.profile_capture.running else "Rekam Profil (F9)",
+                                         command=self.toggle_profiling, style='TButton')
+        self.profile_button.pack(side=tk.LEFT, padx=5)
+
+        columns = ("Operasi", "Jumlah", "Total (ms)", "Rata-rata (us)", "p50 (us)", "p99 (us)", "Maks (us)")
+        tree = ttk.Treeview(frame, columns=columns, show="headings", selectmode="browse", height=20)
+        tree.grid(row=1, column=0, sticky="nsew")
+        for col, width in zip(columns, (280, 70, 90, 100, 90, 90, 100)):
+            tree.heading(col, text=col, anchor="center")
+            tree.column(col, width=width, anchor="w" if col == "Operasi" else "e")
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.grid(row=1, column=1, sticky="ns")
+        summary_label = ttk.Label(frame, text="", justify=tk.LEFT)
+        summary_label.grid(row=2, column=0, columnspan=2, sticky="w", pady=(10, 0))
+
+        def refresh():
+            if not window.winfo_exists():
+                return
+            data = diagnostics.snapshot()
+            tree.delete(*tree.get_children())
+            for name, timing in data['timings'].items():
+                tree.insert("", "end", values=(name, timing['count'], timing['total_ms'], timing['mean_us'],
+                                               timing['p50_us'], timing['p99_us'], timing['max_us']))
+            for name, count in data['counters'].items():
+                tree.insert("", "end", values=(name, count, "", "", "", "", ""))
+            extra = self._diagnostics_extra()
+            state = "aktif" if diagnostics.enabled else "nonaktif (centang untuk mulai mengukur)"
+            summary_label.config(text=f"Pengukuran {state}.\nKatalog: {extra['catalog']}\nSpooler: {extra['print_spooler']}")
+            window.after(self.DIAGNOSTICS_REFRESH_MS, refresh)
+
+        refresh()
+
+    def export_diagnostics(self):
+        """Menyimpan hasil pengukuran dan statistik komponen ke file JSON."""
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+            initialfile=f"diagnostik_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            title="Ekspor Diagnostik"
+        )
+        if not file_path:
+            return
+        try:
+            diagnostics.export_json(file_path, self._diagnostics_extra())
+            self.update_status(f"Diagnostik diekspor ke: {os.path.basename(file_path)}", 'success')
+        except OSError as e:
+            self.update_status(f"Gagal mengekspor diagnostik: {e}", 'error')
+
+    def toggle_profiling(self):
+        """Mulai/berhenti merekam cProfile di thread Tk; hasilnya disimpan ke folder 'diagnostics'."""
+        if not self.profile_capture.running:
+            self.profile_capture.start()
+            self.update_status("Merekam profil... tekan F9 lagi untuk berhenti.", 'info', duration=5000)
+            label = "Hentikan Profil (F9)"
+        else:
+            try:
+                path, report = self.profile_capture.stop()
+            except OSError as e:
+                self.update_status(f"Gagal menyimpan profil: {e}", 'error')
+                return
+            self.update_status(f"Profil disimpan ke {path}.", 'success', duration=5000)
+            self._show_profile_report(path, report)
+            label = "Rekam Profil (F9)"
+        if self.diagnostics_window is not None and self.diagnostics_window.winfo_exists():
+            self.profile_button.config(text=label)
+
+    def _show_profile_report(self, path, report):
+        report_window = Toplevel(self.root)
+        report_window.title(f"Profil: {os.path.basename(path)}")
+        text = tk.Text(report_window, wrap="none", font=('Consolas', 9), width=120, height=40)
+        text.pack(fill="both", expand=True)
+        text.insert("1.0", report)
+        text.config(state=tk.DISABLED)
+
     # --- Methods for Product Management Tab ---
+    @timed("tree.load_products_to_tree")
     def load_products_to_tree(self):
         """Memuat data produk dari database ke Treeview manajemen produk."""
         # This function now only loads ALL products.
         # Filtering is handled by apply_product_management_filter.
-        for i in self.product_tree.get_children():
-            self.product_tree.delete(i)
-        
-        products = get_all_products()
-        for prod_id, name, price, stock in products:
-            # Ensure prod_id is always a string when inserted into Treeview
-            self.product_tree.insert("", "end", values=(str(prod_id), name, format_currency_id(price), stock))
+        # Only the first page of rows is built; the rest is added on scroll
+        self.product_list.set_rows(get_all_products())
         
         # Mengosongkan input setelah produk dimuat
         self.product_id_entry.delete(0, tk.END)
@@ -314,20 +3447,22 @@ class POSApp:
 
 
     def apply_product_management_filter(self, event=None):
-        """Melakukan pencarian langsung dan menampilkan hasilnya di treeview manajemen produk."""
-        search_term = self.product_management_search_entry.get().strip()
-        
-        for i in self.product_tree.get_children():
-            self.product_tree.delete(i)
-        
-        if not search_term:
-            products = get_all_products() # Show all if search term is empty
-        else:
-            products = get_products_by_search_term(search_term)
-        
-        for prod_id, name, price, stock in products:
-            # Ensure prod_id is always a string when inserted into Treeview
-            self.product_tree.insert("", "end", values=(str(prod_id), name, format_currency_id(price), stock))
+        """Melakukan pencarian langsung dan menampilkan hasilnya di treeview manajemen produk.
+        Query dijalankan di thread pekerja; hasilnya ditampilkan oleh _render_product_management_results.
+        """
+        self.product_management_search.refresh()
+
+    @timed("tree._render_product_management_results")
+    def _render_product_management_results(self, products):
+        """Menampilkan hasil pencarian manajemen produk (dipanggil di thread Tk)."""
+        self.product_list.set_rows(products)
+
+    @staticmethod
+    def _format_product_row(product):
+        """Nilai kolom Treeview manajemen produk untuk satu produk."""
+        prod_id, name, price, stock = product
+        # Ensure prod_id is always a string when inserted into Treeview
+        return (str(prod_id), name, format_currency_id(price), stock)
 
     def add_product(self):
         """Menambahkan produk baru ke database dan memperbarui Treeview."""
@@ -350,7 +3485,7 @@ class POSApp:
             return
 
         try:
-            price = float(price_str.replace('.', '').replace(',', '.')) # Ensure correct parsing for Indonesian input
+            price = parse_rupiah(price_str) # Ensure correct parsing for Indonesian input
             if price <= 0:
                 self.update_status("Harga harus lebih besar dari nol.", 'warning')
                 return
@@ -370,11 +3505,7 @@ class POSApp:
         success, message = insert_product(product_id, name, price, stock)
         if success:
             self.update_status(f"Produk '{name}' (ID: {product_id}) berhasil ditambahkan.", 'success')
-            # Directly insert into the treeview instead of reloading all
-            # Ensure product_id is always a string when inserted into Treeview
-            self.product_tree.insert("", "end", values=(str(product_id), name, format_currency_id(price), stock))
-            self.live_search_products() # Update transaction tab's live search
-            self.load_low_stock_to_tree() # Update low stock report
+            # Product lists and the low stock report are updated via _on_products_changed
             # Clear input fields
             self.product_id_entry.delete(0, tk.END)
             self.product_name_entry.delete(0, tk.END)
@@ -398,9 +3529,6 @@ class POSApp:
             success, message = delete_product_by_id(product_id)
             if success:
                 self.update_status(f"Produk '{product_name}' (ID: {product_id}) berhasil dihapus.", 'success')
-                self.product_tree.delete(selected_item[0]) # Directly delete from treeview
-                self.live_search_products() # Update transaction tab's live search
-                self.load_low_stock_to_tree() # Update low stock report
             else:
                 self.update_status(f"Gagal menghapus produk: {message}", 'error') # Changed to status bar
 
@@ -411,9 +3539,6 @@ class POSApp:
             self.update_status("Pilih produk yang stoknya ingin diedit terlebih dahulu.", 'warning')
             return
         
-        # Store the Treeview item ID to update it directly later
-        self.selected_tree_item_id = selected_item[0]
-
         product_id = self.product_tree.item(selected_item[0])['values'][0]
         product_name = self.product_tree.item(selected_item[0])['values'][1]
         current_stock = self.product_tree.item(selected_item[0])['values'][3]
@@ -458,17 +3583,66 @@ class POSApp:
         success, message = update_product_stock(product_id, new_stock)
         if success:
             self.update_status(f"Stok produk ID '{product_id}' berhasil diperbarui menjadi {new_stock}.", 'success')
-            # Update the specific row in the Treeview directly
-            current_values = list(self.product_tree.item(self.selected_tree_item_id)['values'])
-            current_values[3] = new_stock # Update the stock column
-            self.product_tree.item(self.selected_tree_item_id, values=tuple(current_values))
-
-            self.live_search_products() # Update transaction tab's live search
-            self.load_low_stock_to_tree() # Update low stock report
+            # The changed row is updated in place via _on_products_changed
             edit_window.destroy()
         else:
             self.update_status(f"Gagal memperbarui stok: {message}", 'error') # Changed to status bar
 
+    def show_selected_product_stock_history(self):
+        """Membuka jendela riwayat pergerakan stok produk yang dipilih, dengan pencarian stok per tanggal."""
+        selected_item = self.product_tree.selection()
+        if not selected_item:
+            self.update_status("Pilih produk yang riwayat stoknya ingin dilihat terlebih dahulu.", 'warning')
+            return
+
+        product_id = str(self.product_tree.item(selected_item[0])['values'][0]).strip()
+        product_name = self.product_tree.item(selected_item[0])['values'][1]
+
+        history_window = Toplevel(self.root)
+        history_window.title(f"Riwayat Stok: {product_name}")
+        history_window.transient(self.root)
+
+        frame = ttk.Frame(history_window, padding="15")
+        frame.pack(fill="both", expand=True)
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(1, weight=1)
+
+        as_of_frame = ttk.Frame(frame)
+        as_of_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 10))
+        ttk.Label(as_of_frame, text="Stok per tanggal (YYYY-MM-DD):").pack(side=tk.LEFT, padx=(0, 5))
+        as_of_entry = ttk.Entry(as_of_frame, width=12)
+        as_of_entry.pack(side=tk.LEFT, padx=5)
+        as_of_entry.insert(0, datetime.now().strftime("%Y-%m-%d"))
+        as_of_result_label = ttk.Label(as_of_frame, text="", font=('Segoe UI', 10, 'bold'))
+
+        def show_stock_as_of():
+            day = as_of_entry.get().strip()
+            try:
+                datetime.strptime(day, "%Y-%m-%d")
+            except ValueError:
+                as_of_result_label.config(text="Format tanggal harus YYYY-MM-DD.")
+                return
+            stock = get_stock_as_of(product_id, day + " 23:59:59") # Stok di akhir hari tersebut
+            as_of_result_label.config(text=f"Stok akhir hari: {stock}" if stock is not None else "Belum ada catatan stok pada tanggal tersebut.")
+
+        ttk.Button(as_of_frame, text="Lihat", command=show_stock_as_of, style='TButton').pack(side=tk.LEFT, padx=5)
+        as_of_result_label.pack(side=tk.LEFT, padx=10)
+
+        columns = ("Waktu", "Alasan", "Perubahan", "Stok Setelah", "Referensi")
+        history_tree = ttk.Treeview(frame, columns=columns, show="headings", height=15)
+        history_tree.grid(row=1, column=0, sticky="nsew")
+        for col, width in zip(columns, (150, 100, 80, 90, 160)):
+            history_tree.heading(col, text=col, anchor="center")
+            history_tree.column(col, width=width, anchor="center")
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=history_tree.yview)
+        history_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.grid(row=1, column=1, sticky="ns")
+
+        for timestamp, reason, quantity_change, stock_after, reference in get_stock_movements(product_id, limit=STOCK_HISTORY_LIMIT):
+            history_tree.insert("", "end", values=(timestamp, STOCK_MOVEMENT_REASONS.get(reason, reason),
+                                                   f"{quantity_change:+d}", stock_after, reference or ""))
+        show_stock_as_of()
+
     def open_csv_file_dialog(self):
         """Membuka dialog untuk memilih file CSV."""
         file_path = filedialog.askopenfilename(
@@ -487,100 +3661,96 @@ class POSApp:
     def import_stock_from_csv(self):
         """Mengimpor stok produk dari file CSV yang dipilih.
         Jika ID produk tidak ada, produk baru akan ditambahkan.
+        Impor berjalan di thread terpisah; progres tampil di progress bar dan bisa dibatalkan.
         """
         if not self.selected_csv_file:
             self.update_status("Pilih file CSV terlebih dahulu.", 'warning')
             return
+        if self.csv_import_thread and self.csv_import_thread.is_alive():
+            self.update_status("Impor CSV sedang berjalan.", 'warning')
+            return
 
-        updated_count = 0
-        new_product_count = 0
-        failed_count = 0
-        error_messages = []
-
-        try:
-            with open(self.selected_csv_file, 'r', newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                
-                required_columns = ['ID Produk', 'Nama Produk', 'Harga', 'Stok']
-                if not all(col in reader.fieldnames for col in required_columns):
-                    messagebox.showerror("Format CSV Salah", # Keep as critical error
-                                         f"File CSV harus memiliki kolom: {', '.join(required_columns)}.")
-                    return
-
-                for row_num, row in enumerate(reader, start=2):
-                    product_id = row.get('ID Produk', '').strip()
-                    name = row.get('Nama Produk', '').strip()
-                    price_str = row.get('Harga', '').strip()
-                    stock_str = row.get('Stok', '').strip()
+        self.csv_import_cancel = threading.Event()
+        self.import_stock_button.config(state=tk.DISABLED)
+        self.cancel_import_button.config(state=tk.NORMAL)
+        self.save_import_errors_button.config(state=tk.DISABLED)
+        self.csv_import_progress.config(value=0)
+        self.update_status(f"Mengimpor '{os.path.basename(self.selected_csv_file)}'...", 'info', duration=60000)
 
-                    if not product_id:
-                        error_messages.append(f"Baris {row_num}: ID Produk kosong, dilewati.")
-                        failed_count += 1
-                        continue
-                    
-                    try:
-                        stock = int(stock_str)
-                        if stock < 0:
-                            error_messages.append(f"Baris {row_num} (ID: {product_id}): Stok tidak valid (harus >= 0), dilewati.")
-                            failed_count += 1
-                            continue
-                    except ValueError:
-                        error_messages.append(f"Baris {row_num} (ID: {product_id}): Stok bukan angka, dilewati.")
-                        failed_count += 1
-                        continue
-                    
-                    product_exists = get_product_by_id(product_id)
-                    if product_exists:
-                        success, msg = update_product_stock(product_id, stock)
-                        if success:
-                            updated_count += 1
-                        else:
-                            error_messages.append(f"Baris {row_num} (ID: {product_id}): Gagal memperbarui stok - {msg}")
-                            failed_count += 1
-                    else:
-                        if not name or not price_str:
-                            error_messages.append(f"Baris {row_num} (ID: {product_id}): Nama atau Harga kosong untuk produk baru, dilewati.")
-                            failed_count += 1
-                            continue
-                        try:
-                            price = float(price_str.replace('.', '').replace(',', '.')) # Ensure correct parsing for Indonesian input
-                            if price <= 0:
-                                error_messages.append(f"Baris {row_num} (ID: {product_id}): Harga tidak valid (harus > 0), dilewati.")
-                                failed_count += 1
-                                continue
-                        except ValueError:
-                            error_messages.append(f"Baris {row_num} (ID: {product_id}): Harga bukan angka, dilewati.")
-                            failed_count += 1
-                            continue
-                        
-                        success, msg = insert_product(product_id, name, price, stock)
-                        if success:
-                            new_product_count += 1
-                        else:
-                            error_messages.append(f"Baris {row_num} (ID: {product_id}): Gagal menambahkan produk baru - {msg}")
-                            failed_count += 1
-
-            summary_message = (f"Impor selesai. Diperbarui: {updated_count}, Baru: {new_product_count}, Gagal: {failed_count}.")
-            self.update_status(summary_message, 'info')
-            
-            if error_messages:
-                # Use warning for detailed errors, not critical enough for messagebox.showerror
-                self.update_status("Beberapa item gagal diimpor. Lihat detail di bawah.", 'warning', duration=5000)
-                # print("\n".join(error_messages)) # For debugging, if needed
-                # Consider showing a separate small window for detailed errors if too long
-                # For now, just print to console and give a warning status.
-            
-            # For CSV import, it's safer and simpler to reload all products as multiple changes can occur
-            self.load_products_to_tree() 
-            self.load_low_stock_to_tree() # Update low stock report
-            self.live_search_products() # Update transaction tab's live search
-            self.csv_file_path_label.config(text="Tidak ada file terpilih", foreground='gray')
-            self.selected_csv_file = None
+        self.csv_import_thread = threading.Thread(target=self._run_csv_import, name="csv-import",
+                                                  args=(self.selected_csv_file, self.csv_import_cancel), daemon=True)
+        self.csv_import_thread.start()
 
+    def _run_csv_import(self, file_path, cancel_event):
+        """Dijalankan di thread impor; hasil dikirim kembali ke thread Tk lewat call_in_ui."""
+        try:
+            result = import_products_csv(file_path, cancel_event=cancel_event,
+                                         progress=lambda done, total: self.call_in_ui(self._on_csv_import_progress, done, total))
+        except CsvFormatError as e:
+            self.call_in_ui(self._on_csv_import_failed, "Format CSV Salah", str(e))
         except FileNotFoundError:
-            messagebox.showerror("File Tidak Ditemukan", "File CSV tidak ditemukan.") # Keep as critical error
+            self.call_in_ui(self._on_csv_import_failed, "File Tidak Ditemukan", "File CSV tidak ditemukan.")
         except Exception as e:
-            messagebox.showerror("Error Impor CSV", f"Terjadi kesalahan saat mengimpor CSV:\n{e}") # Keep as critical error
+            self.call_in_ui(self._on_csv_import_failed, "Error Impor CSV", f"Terjadi kesalahan saat mengimpor CSV:\n{e}")
+        else:
+            self.call_in_ui(self._on_csv_import_finished, result)
+        finally:
+            db_manager.close_thread_connection()
+
+    def _on_csv_import_progress(self, processed_rows, total_rows):
+        """Memperbarui progress bar impor (thread Tk)."""
+        self.csv_import_progress.config(value=100 * processed_rows / total_rows if total_rows else 100)
+        self.update_status(f"Mengimpor CSV: {processed_rows}/{total_rows} baris...", 'info', duration=60000)
+
+    def _reset_csv_import_controls(self):
+        self.import_stock_button.config(state=tk.NORMAL)
+        self.cancel_import_button.config(state=tk.DISABLED)
+        self.csv_import_cancel = None
+
+    def _on_csv_import_finished(self, result):
+        """Menampilkan ringkasan impor (thread Tk)."""
+        self._reset_csv_import_controls()
+        self.last_import_result = result
+        summary_message = (f"Impor {'dibatalkan' if result.cancelled else 'selesai'}. Diperbarui: {result.updated_count}, "
+                           f"Baru: {result.new_count}, Gagal: {result.failed_count}.")
+        if result.errors:
+            # Detail per baris bisa disimpan lewat tombol "Simpan Laporan Error"
+            self.save_import_errors_button.config(state=tk.NORMAL)
+            self.update_status(summary_message + " Simpan laporan error untuk detail.", 'warning', duration=8000)
+        else:
+            self.update_status(summary_message, 'warning' if result.cancelled else 'success', duration=5000)
+
+        self.csv_file_path_label.config(text="Tidak ada file terpilih", foreground='gray')
+        self.selected_csv_file = None
+
+    def _on_csv_import_failed(self, title, message):
+        self._reset_csv_import_controls()
+        self.csv_import_progress.config(value=0)
+        messagebox.showerror(title, message) # Keep as critical error
+
+    def cancel_csv_import(self):
+        """Meminta impor yang sedang berjalan berhenti setelah chunk saat ini."""
+        if self.csv_import_cancel:
+            self.csv_import_cancel.set()
+            self.update_status("Membatalkan impor CSV...", 'info')
+
+    def save_import_error_report(self):
+        """Menyimpan daftar baris yang gagal diimpor ke file CSV."""
+        if not self.last_import_result or not self.last_import_result.errors:
+            self.update_status("Tidak ada laporan error impor.", 'info')
+            return
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+            initialfile="laporan_error_impor.csv",
+            title="Simpan Laporan Error Impor"
+        )
+        if file_path:
+            try:
+                write_import_error_report(file_path, self.last_import_result)
+                self.update_status(f"Laporan error impor disimpan ke: {os.path.basename(file_path)}", 'success')
+            except Exception as e:
+                messagebox.showerror("Error", f"Gagal menyimpan laporan error impor:\n{e}") # Keep as critical error
 
     def download_csv_template(self):
         """Mengunduh template CSV untuk data produk."""
@@ -600,12 +3770,7 @@ class POSApp:
                 messagebox.showerror("Error", f"Gagal menyimpan template CSV:\n{e}") # Keep as critical error
 
     def export_products_to_csv(self):
-        """Mengekspor semua data produk ke file CSV."""
-        products = get_all_products()
-        if not products:
-            self.update_status("Tidak ada data produk untuk diekspor.", 'warning')
-            return
-
+        """Mengekspor semua data produk ke file CSV (di latar belakang, lihat start_export)."""
         file_path = filedialog.asksaveasfilename(
             defaultextension=".csv",
             filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
@@ -613,15 +3778,81 @@ class POSApp:
             title="Simpan Data Produk ke CSV"
         )
         if file_path:
-            try:
-                with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow(['ID Produk', 'Nama Produk', 'Harga', 'Stok'])
-                    for prod_id, name, price, stock in products:
-                        writer.writerow([prod_id, name, price, stock])
-                self.update_status(f"Data produk berhasil diekspor ke: {os.path.basename(file_path)}", 'success')
-            except Exception as e:
-                messagebox.showerror("Error", f"Gagal mengekspor data produk ke CSV:\n{e}") # Keep as critical error
+            self.start_export('products', file_path)
+
+    # --- Ekspor Data di Latar Belakang ---
+    EXPORT_TITLES = {'products': "data produk", 'sales': "transaksi penjualan", 'sale_items': "rincian item penjualan"}
+
+    def start_export(self, kind, file_path, **options):
+        """Menjalankan export_table di thread terpisah; progres tampil di status bar dan bisa dibatalkan."""
+        if self.export_thread and self.export_thread.is_alive():
+            self.update_status("Ekspor lain sedang berjalan.", 'warning')
+            return False
+        self.export_cancel = threading.Event()
+        self.update_status(f"Mengekspor {self.EXPORT_TITLES[kind]}...", 'info', duration=60000)
+        self.export_thread = threading.Thread(target=self._run_export, name="export",
+                                              args=(kind, file_path, self.export_cancel, options), daemon=True)
+        self.export_thread.start()
+        return True
+
+    def _run_export(self, kind, file_path, cancel_event, options):
+        """Dijalankan di thread ekspor; hasil dikirim kembali ke thread Tk lewat call_in_ui."""
+        try:
+            result = export_table(kind, file_path, cancel_event=cancel_event,
+                                  progress=lambda done, total: self.call_in_ui(self._on_export_progress, kind, done, total),
+                                  **options)
+        except Exception as e: # Juga UnicodeEncodeError/TypeError dari nilai baris, bukan hanya database/disk
+            self.call_in_ui(self._on_export_failed, kind, str(e) or type(e).__name__)
+        else:
+            self.call_in_ui(self._on_export_finished, result)
+        finally:
+            db_manager.close_thread_connection()
+
+    def _on_export_progress(self, kind, written_rows, total_rows):
+        """Menampilkan progres ekspor di status bar (thread Tk)."""
+        percent = 100 * written_rows / total_rows if total_rows else 100
+        self.update_status(f"Mengekspor {self.EXPORT_TITLES[kind]}: {written_rows}/{total_rows} baris ({percent:.0f}%)...",
+                           'info', duration=60000)
+
+    def _on_export_finished(self, result):
+        self.export_cancel = None
+        title = self.EXPORT_TITLES[result.kind]
+        if result.cancelled:
+            self.update_status(f"Ekspor {title} dibatalkan.", 'warning', duration=5000)
+        elif not result.rows:
+            self.update_status(f"Tidak ada {title} untuk diekspor (file kosong disimpan).", 'warning', duration=5000)
+        else:
+            self.update_status(f"{result.rows} baris {title} berhasil diekspor ke: {os.path.basename(result.file_path)}",
+                               'success', duration=5000)
+
+    def _on_export_failed(self, kind, message):
+        self.export_cancel = None
+        self.update_status(f"Gagal mengekspor {self.EXPORT_TITLES[kind]}: {message}", 'error', duration=8000)
+
+    def cancel_export(self):
+        """Meminta ekspor yang sedang berjalan berhenti setelah batch saat ini."""
+        if self.export_cancel:
+            self.export_cancel.set()
+            self.update_status("Membatalkan ekspor...", 'info')
+
+    def export_sales(self):
+        """Mengekspor penjualan pada rentang tanggal laporan dengan jenis, format, dan kompresi yang dipilih."""
+        report_range = self._read_report_range()
+        if report_range is None:
+            return
+        start_day, end_day = report_range
+        kind = 'sale_items' if self.sales_export_kind.get() == "Rincian Item" else 'sales'
+        fmt = self.sales_export_format.get().lower()
+        compress = self.sales_export_gzip.get()
+        extension = f".{fmt}" + (".gz" if compress else "")
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=extension,
+            filetypes=[(f"{fmt.upper()} files", f"*{extension}"), ("All files", "*.*")],
+            initialfile=f"{'penjualan_item' if kind == 'sale_items' else 'penjualan'}_{start_day}_{end_day}{extension}",
+            title="Simpan Ekspor Penjualan"
+        )
+        if file_path:
+            self.start_export(kind, file_path, fmt=fmt, compress=compress, start_day=start_day, end_day=end_day)
 
     def create_product_management_ui(self, parent_frame):
         """Membuat antarmuka pengguna untuk manajemen produk."""
@@ -661,7 +3892,9 @@ class POSApp:
         ttk.Label(search_frame, text="Cari:").grid(row=0, column=0, padx=10, pady=5, sticky="w")
         self.product_management_search_entry = ttk.Entry(search_frame)
         self.product_management_search_entry.grid(row=0, column=1, padx=10, pady=5, sticky="ew")
-        self.product_management_search_entry.bind('<KeyRelease>', self.apply_product_management_filter)
+        self.product_management_search = DebouncedSearch(self.root, lambda: self.product_management_search_entry.get().strip(),
+                                                         search_products, self._render_product_management_results)
+        self.product_management_search_entry.bind('<KeyRelease>', self.product_management_search.schedule)
         # --- End Live Search in Product Management ---
 
         list_frame = ttk.LabelFrame(parent_frame, text="Daftar Produk Tersedia", style='TLabelframe')
@@ -681,7 +3914,8 @@ class POSApp:
         self.product_tree.column("Stok", width=70, stretch=tk.NO)
 
         product_tree_scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.product_tree.yview)
-        self.product_tree.configure(yscrollcommand=product_tree_scrollbar.set)
+        self.product_list = VirtualTreeview(self.product_tree, product_tree_scrollbar, self._format_product_row,
+                                            sort_keys=PRODUCT_SORT_KEYS)
         product_tree_scrollbar.pack(side="right", fill="y")
 
         button_frame = ttk.Frame(list_frame, style='TFrame')
@@ -693,6 +3927,17 @@ class POSApp:
         edit_stock_button = ttk.Button(button_frame, text="Edit Stok Terpilih", command=self.edit_selected_product_stock, style='TButton')
         edit_stock_button.pack(side="left", padx=5)
 
+        reorder_point_button = ttk.Button(button_frame, text="Titik Pesan Ulang",
+                                          command=lambda: self.edit_selected_reorder_point(self.product_tree), style='TButton')
+        reorder_point_button.pack(side="left", padx=5)
+
+        self.stock_history_button = ttk.Button(button_frame, text="Riwayat Stok", command=self.show_selected_product_stock_history, style='TButton')
+        self.stock_history_button.pack(side="left", padx=5)
+
+        if remote_server is not None:
+            outbox_button = ttk.Button(button_frame, text="Antrean Offline", command=self.show_outbox_status, style='TButton')
+            outbox_button.pack(side="left", padx=5)
+
         csv_frame = ttk.LabelFrame(parent_frame, text="Impor/Ekspor Data Produk (CSV)", style='TLabelframe')
         csv_frame.pack(pady=10, padx=20, fill="x")
         csv_frame.columnconfigure(0, weight=1)
@@ -708,91 +3953,112 @@ class POSApp:
         self.import_stock_button = ttk.Button(csv_frame, text="Update Stok dari CSV", command=self.import_stock_from_csv, style='TButton')
         self.import_stock_button.grid(row=1, column=1, padx=10, pady=5, sticky="ew")
 
-        ttk.Separator(csv_frame, orient="horizontal").grid(row=2, columnspan=2, sticky="ew", pady=10)
+        if remote_server is not None:
+            # Riwayat stok dan impor CSV membaca/menulis database langsung; di mode kasir dijalankan di komputer server
+            self.stock_history_button.config(state=tk.DISABLED)
+            self.select_csv_button.config(state=tk.DISABLED)
+            self.import_stock_button.config(state=tk.DISABLED)
+
+        self.csv_import_progress = ttk.Progressbar(csv_frame, orient="horizontal", mode="determinate", maximum=100)
+        self.csv_import_progress.grid(row=2, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
+
+        self.cancel_import_button = ttk.Button(csv_frame, text="Batalkan Impor", command=self.cancel_csv_import, style='Danger.TButton', state=tk.DISABLED)
+        self.cancel_import_button.grid(row=3, column=0, padx=10, pady=5, sticky="ew")
+
+        self.save_import_errors_button = ttk.Button(csv_frame, text="Simpan Laporan Error", command=self.save_import_error_report, style='TButton', state=tk.DISABLED)
+        self.save_import_errors_button.grid(row=3, column=1, padx=10, pady=5, sticky="ew")
+
+        self.csv_import_thread = None
+        self.csv_import_cancel = None
+        self.last_import_result = None
+
+        ttk.Separator(csv_frame, orient="horizontal").grid(row=4, columnspan=2, sticky="ew", pady=10)
 
         self.download_template_button = ttk.Button(csv_frame, text="Download Template CSV", command=self.download_csv_template, style='TButton')
-        self.download_template_button.grid(row=3, column=0, padx=10, pady=5, sticky="ew")
+        self.download_template_button.grid(row=5, column=0, padx=10, pady=5, sticky="ew")
 
         self.export_data_button = ttk.Button(csv_frame, text="Export Data Produk ke CSV", command=self.export_products_to_csv, style='TButton')
-        self.export_data_button.grid(row=3, column=1, padx=10, pady=5, sticky="ew")
+        self.export_data_button.grid(row=5, column=1, padx=10, pady=5, sticky="ew")
 
         self.load_products_to_tree() # Initial load of all products
 
     # --- Methods for Transaction Tab ---
+    @timed("scan.process_product_id_input")
     def process_product_id_input(self, event=None, product_id_override=None):
         """Memproses input ID produk dari barcode scanner atau manual entry.
+        Enter hanya memasukkan input ke antrean ScannerInput; scan diproses oleh _process_scans.
         product_id_override digunakan saat memanggil fungsi ini secara internal (misal dari edit quantity).
         """
         if product_id_override:
-            product_id = product_id_override.strip() # Ensure stripped even if overridden
-        else:
-            product_id = self.transaction_search_id_entry.get().strip()
-
-            # Debounce mechanism for scanner input
-            # Only debounce if product_id is not empty and it's the same as the last scanned ID
-            if product_id and product_id == self.last_scanned_id: 
-                if self.scan_debounce_timer:
-                    self.root.after_cancel(self.scan_debounce_timer)
-                self.scan_debounce_timer = self.root.after(self.SCAN_DEBOUNCE_MS, lambda: setattr(self, 'last_scanned_id', None)) # Clear after delay
-                self.update_status(f"Scan cepat terdeteksi, mengabaikan duplikat '{product_id}'.", 'info', 1500)
-                self.transaction_search_id_entry.delete(0, tk.END) # Clear the entry even if debounced
+            # Only refresh the labels (e.g. after the cart changed); nothing is added
+            try:
+                product_id = parse_scan_input(product_id_override)[0]
+            except ValueError:
                 return
-            self.last_scanned_id = product_id
-            # Reset last_scanned_id after a short delay to allow new scans
-            self.scan_debounce_timer = self.root.after(self.SCAN_DEBOUNCE_MS, lambda: setattr(self, 'last_scanned_id', None))
+            product, available = self.session.lookup(product_id)
+            self._show_found_product(product, available)
+            if product is None:
+                self.update_status(f"Produk dengan ID '{product_id}' tidak ditemukan.", 'warning')
+            return
 
-        if not product_id:
-            self.found_product_name_label.config(text="-")
-            self.found_product_price_label.config(text=format_currency_id(0.00, include_decimals=False))
-            self.found_product_stock_label.config(text="0")
+        if self.scanner_input.submit(event) is None:
+            self._show_found_product(None, 0, "-")
             self.update_status("Masukkan ID produk.", 'info')
-            if not product_id_override:
-                self.transaction_search_id_entry.focus_set()
-            return
+        self.transaction_search_id_entry.focus_set()
 
-        product = get_product_by_id(product_id) # get_product_by_id now handles stripping
-        if product:
-            prod_id, name, price, stock = product
-            self.found_product_name_label.config(text=name)
-            self.found_product_price_label.config(text=format_currency_id(price, include_decimals=False))
-            
-            # Calculate available stock considering items already in cart
-            current_cart_quantity = self.cart.get(prod_id, {}).get('quantity', 0)
-            available_for_sale_stock = stock - current_cart_quantity
-            self.found_product_stock_label.config(text=str(available_for_sale_stock))
-            
-            if not product_id_override and available_for_sale_stock > 0: # Only add to cart if it's a new scan/manual input
-                self.add_to_cart(prod_id, name, price)
-            elif not product_id_override: # If it's a new scan/manual input but stock is 0
-                self.update_status(f"Stok untuk '{name}' (ID: {prod_id}) sudah habis atau sudah di keranjang.", 'warning')
-        else:
-            self.found_product_name_label.config(text="Produk Tidak Ditemukan")
-            self.found_product_price_label.config(text=format_currency_id(0.00, include_decimals=False))
+    @timed("scan.process_scans")
+    def _process_scans(self, scans):
+        """Memproses scan dari antrean sesuai urutannya, lalu memperbarui keranjang sekali per batch.
+        Status bar menampilkan hasil scan terakhir, atau peringatan terakhir jika ada scan yang gagal.
+        """
+        shown, added = None, False
+        for scan in scans:
+            diagnostics.increment(f"scan.{scan.source}")
+            try:
+                product_id, quantity = parse_scan_input(scan.text)
+            except ValueError as e:
+                result = ScanResult(None, 0, False, str(e), 'warning')
+            else:
+                result = self.session.scan(product_id, quantity)
+            added = added or result.added
+            if shown is None or result.message_type != 'success' or shown.message_type == 'success':
+                shown = result
+        self._show_found_product(shown.product, shown.available)
+        self.update_status(shown.message, shown.message_type)
+        if added:
+            self.update_cart_display_and_total()
+            # Update live search results to reflect current cart quantities (stock available for sale)
+            self.live_search_products()
+
+    def _show_found_product(self, product, available, missing_text="Produk Tidak Ditemukan"):
+        """Menampilkan nama, harga, dan stok tersedia produk hasil scan."""
+        if product is None:
+            self.found_product_name_label.config(text=missing_text)
+            self.found_product_price_label.config(text=format_currency_id(0, include_decimals=False))
             self.found_product_stock_label.config(text="0")
-            self.update_status(f"Produk dengan ID '{product_id}' tidak ditemukan.", 'warning')
-        
-        if not product_id_override: # Only clear entry if it was a manual input/scan
-            self.transaction_search_id_entry.delete(0, tk.END)
-            self.transaction_search_id_entry.focus_set()
+            return
+        self.found_product_name_label.config(text=product[1])
+        self.found_product_price_label.config(text=format_currency_id(product[2], include_decimals=False))
+        self.found_product_stock_label.config(text=str(available))
 
     def live_search_products(self, event=None):
-        """Melakukan pencarian produk secara langsung dan menampilkan hasilnya di treeview."""
-        search_term = self.live_search_entry.get().strip()
-        
-        for i in self.live_search_tree.get_children():
-            self.live_search_tree.delete(i)
-        
-        if not search_term:
-            products = get_all_products()
-        else:
-            products = get_products_by_search_term(search_term)
-        
-        for prod_id, name, price, stock in products:
-            # Display available stock considering items already in cart
-            current_cart_quantity = self.cart.get(str(prod_id).strip(), {}).get('quantity', 0) # Ensure prod_id is stripped for cart lookup
-            available_for_sale_stock = stock - current_cart_quantity
-            # Ensure prod_id is always a string when inserted into Treeview
-            self.live_search_tree.insert("", "end", values=(str(prod_id), name, format_currency_id(price, include_decimals=False), available_for_sale_stock))
+        """Melakukan pencarian produk secara langsung dan menampilkan hasilnya di treeview.
+        Query dijalankan di thread pekerja; hasilnya ditampilkan oleh _render_live_search_results.
+        """
+        self.live_search.refresh()
+
+    @timed("tree._render_live_search_results")
+    def _render_live_search_results(self, products):
+        """Menampilkan hasil live search (dipanggil di thread Tk)."""
+        self.live_search_list.set_rows(products)
+
+    def _format_live_search_row(self, product):
+        """Nilai kolom Treeview live search, dengan stok tersedia di luar keranjang."""
+        prod_id, name, price, stock = product
+        # Display available stock considering items already held by carts
+        available_for_sale_stock = stock - stock_reservations.reserved(str(prod_id).strip()) # Ensure prod_id is stripped for the lookup
+        # Ensure prod_id is always a string when inserted into Treeview
+        return (str(prod_id), name, format_currency_id(price, include_decimals=False), available_for_sale_stock)
 
     def add_selected_product_from_search(self, event=None):
         """Menambahkan produk yang dipilih dari live search treeview ke keranjang."""
@@ -806,8 +4072,8 @@ class POSApp:
         price_str = self.live_search_tree.item(selected_item[0])['values'][2]
         stock_display = self.live_search_tree.item(selected_item[0])['values'][3] # This is already available_for_sale_stock
 
-        # Convert price string (e.g., "Rp10.000") to float
-        price = float(price_str.replace('Rp', '').replace('.', '').replace(',', '.'))
+        # Convert price string (e.g., "Rp10.000") to rupiah
+        price = parse_rupiah(price_str)
         
         if stock_display > 0: # Check against the displayed available stock
             self.add_to_cart(prod_id, name, price)
@@ -816,27 +4082,10 @@ class POSApp:
 
     def add_to_cart(self, product_id, name, price):
         """Menambahkan produk ke keranjang atau menambah jumlah jika sudah ada."""
-        product_id = product_id.strip() # Ensure product_id is stripped consistently
-        db_product = get_product_by_id(product_id) # get_product_by_id now handles stripping
-        if not db_product:
-            self.update_status("Produk tidak ditemukan di database.", 'error')
+        added, message, message_type = self.session.add(product_id, name, price)
+        self.update_status(message, message_type)
+        if not added:
             return
-        
-        database_stock = db_product[3]
-
-        if product_id in self.cart:
-            if self.cart[product_id]['quantity'] < database_stock:
-                self.cart[product_id]['quantity'] += 1
-                self.update_status(f"Jumlah '{name}' di keranjang ditambahkan.", 'success')
-            else:
-                self.update_status(f"Tidak bisa menambahkan lebih banyak '{name}'. Stok maksimal tercapai ({database_stock}).", 'warning')
-        else:
-            if database_stock > 0:
-                self.cart[product_id] = {'name': name, 'price': price, 'quantity': 1}
-                self.update_status(f"'{name}' ditambahkan ke keranjang.", 'success')
-            else:
-                self.update_status(f"Stok untuk '{name}' sudah habis.", 'warning')
-                return
 
         self.update_cart_display_and_total()
         # Update the displayed stock for the currently selected/scanned product
@@ -848,6 +4097,16 @@ class POSApp:
         # Update live search results to reflect current cart quantities (stock available for sale)
         self.live_search_products()
 
+    def _after_cart_edit(self):
+        """Menyegarkan label produk hasil scan dan live search setelah isi keranjang berubah."""
+        # Update the displayed stock for the currently selected/scanned product if it matches
+        current_input_id = self.transaction_search_id_entry.get().strip()
+        if current_input_id:
+            self.process_product_id_input(product_id_override=current_input_id)
+
+        # Update live search results to reflect current cart quantities (stock available for sale)
+        self.live_search_products()
+
     def adjust_cart_item_quantity(self, change):
         """Menambah atau mengurangi jumlah item di keranjang."""
         selected_item = self.cart_tree.selection()
@@ -860,32 +4119,18 @@ class POSApp:
         product_id = str(self.cart_tree.item(selected_item_id)['text']).strip() # Get product_id from 'text' and strip
         
         if product_id in self.cart:
-            current_quantity = self.cart[product_id]['quantity']
-            new_quantity = current_quantity + change
-
-            db_product = get_product_by_id(product_id) # get_product_by_id now handles stripping
-            database_stock = db_product[3] if db_product else 0
-
-            if new_quantity > 0:
-                if new_quantity <= database_stock:
-                    self.cart[product_id]['quantity'] = new_quantity
-                    self.update_status(f"Jumlah '{self.cart[product_id]['name']}' di keranjang diubah menjadi {new_quantity}.", 'success')
-                    self.update_cart_display_and_total()
-                    self.cart_tree.selection_set(selected_item_id) # Re-select the item
-                    self.cart_tree.focus(selected_item_id) # Focus on the item
-                else:
-                    self.update_status(f"Tidak bisa menambahkan lebih banyak '{self.cart[product_id]['name']}'. Stok maksimal tercapai ({database_stock}).", 'warning')
-            else:
+            new_quantity = self.cart.quantity(product_id) + change
+            if new_quantity <= 0:
                 self.remove_from_cart() # This will trigger its own confirmation
                 return
 
-            # Update the displayed stock for the currently selected/scanned product if it matches
-            current_input_id = self.transaction_search_id_entry.get().strip()
-            if current_input_id:
-                self.process_product_id_input(product_id_override=current_input_id)
-            
-            # Update live search results to reflect current cart quantities (stock available for sale)
-            self.live_search_products()
+            success, message, message_type = self.session.set_quantity(product_id, new_quantity)
+            self.update_status(message, message_type)
+            if success:
+                self.update_cart_display_and_total()
+                self.cart_tree.selection_set(selected_item_id) # Re-select the item
+                self.cart_tree.focus(selected_item_id) # Focus on the item
+            self._after_cart_edit()
 
     def edit_cart_item_quantity(self):
         """Membuka jendela baru untuk mengedit jumlah item di keranjang."""
@@ -938,43 +4183,23 @@ class POSApp:
             self.update_status("Jumlah baru harus berupa angka bulat.", 'warning')
             return
         
-        db_product = get_product_by_id(product_id) # get_product_by_id now handles stripping
-        database_stock = db_product[3] if db_product else 0
+        if new_quantity == 0 and product_id in self.cart:
+            if not messagebox.askyesno("Konfirmasi Hapus", f"Apakah Anda yakin ingin menghapus '{self.cart.get(product_id).name}' dari keranjang (jumlah menjadi 0)?"):
+                return # User cancelled deletion
 
-        if new_quantity > database_stock:
-            self.update_status(f"Jumlah baru ({new_quantity}) melebihi stok tersedia ({database_stock}).", 'warning')
+        success, message, message_type = self.session.set_quantity(product_id, new_quantity)
+        self.update_status(message, message_type)
+        if not success:
             return
         
-        if new_quantity == 0:
-            if messagebox.askyesno("Konfirmasi Hapus", f"Apakah Anda yakin ingin menghapus '{self.cart[product_id]['name']}' dari keranjang (jumlah menjadi 0)?"):
-                del self.cart[product_id]
-                self.update_status(f"'{db_product[1]}' berhasil dihapus dari keranjang.", 'success') # Use db_product name as cart might be deleted
-            else:
-                return # User cancelled deletion
-        else:
-            self.cart[product_id]['quantity'] = new_quantity
-            self.update_status(f"Jumlah '{self.cart[product_id]['name']}' di keranjang diperbarui menjadi {new_quantity}.", 'success')
-        
         self.update_cart_display_and_total()
         # Re-select the item if it still exists (not deleted by setting quantity to 0)
-        if product_id in self.cart:
-            # Find the new tree_item_id if it was recreated (due to clear-and-repopulate)
-            new_tree_item_id = None
-            for item_id in self.cart_tree.get_children():
-                if self.cart_tree.item(item_id)['text'] == product_id:
-                    new_tree_item_id = item_id
-                    break
-            if new_tree_item_id:
-                self.cart_tree.selection_set(new_tree_item_id)
-                self.cart_tree.focus(new_tree_item_id)
+        item_id = self.cart_rows.get(product_id)
+        if item_id is not None:
+            self.cart_tree.selection_set(item_id)
+            self.cart_tree.focus(item_id)
 
-        # Update the displayed stock for the currently selected/scanned product
-        current_input_id = self.transaction_search_id_entry.get().strip()
-        if current_input_id:
-            self.process_product_id_input(product_id_override=current_input_id)
-        
-        # Update live search results to reflect current cart quantities (stock available for sale)
-        self.live_search_products()
+        self._after_cart_edit()
         edit_window.destroy()
 
     def remove_from_cart(self):
@@ -990,85 +4215,49 @@ class POSApp:
         product_name = self.cart_tree.item(selected_item_id)['values'][0] # Name is now at index 0 of values
 
         if messagebox.askyesno("Konfirmasi Hapus", f"Apakah Anda yakin ingin menghapus '{product_name}' dari keranjang?"):
-            if product_id in self.cart:
-                del self.cart[product_id]
-                self.update_status(f"'{product_name}' berhasil dihapus dari keranjang.", 'success')
+            success, message, message_type = self.session.remove(product_id)
+            if success:
+                self.update_status(message, message_type)
                 self.update_cart_display_and_total()
-                
-                # Update the displayed stock for the currently selected/scanned product if it matches
-                current_input_id = self.transaction_search_id_entry.get().strip()
-                if current_input_id:
-                    self.process_product_id_input(product_id_override=current_input_id)
-
-                # Update live search results to reflect current cart quantities (stock available for sale)
-                self.live_search_products()
+                self._after_cart_edit()
 
+    @timed("tree.update_cart_display_and_total")
     def update_cart_display_and_total(self):
-        """Memperbarui tampilan keranjang dan menghitung ulang total.
-        Menggunakan pendekatan yang lebih efisien untuk memperbarui Treeview
-        tanpa menghapus dan menambahkan ulang semua item.
+        """Memperbarui tampilan keranjang dan total.
+        Hanya baris yang berubah sejak pembaruan terakhir yang digambar ulang; baris Treeview
+        dicari lewat indeks self.cart_rows, bukan dengan membaca semua item Treeview.
         """
-        # Get current selection's product_id to re-select after update
-        selected_prod_id = None
-        if self.cart_tree.selection():
-            selected_item_id = self.cart_tree.selection()[0]
-            # Explicitly convert to string before stripping
-            selected_prod_id = str(self.cart_tree.item(selected_item_id)['text']).strip()
-
-        # Create a map of product_id to current Treeview item ID for quick lookup
-        # Ensure product_id from Treeview is also stripped for consistent mapping
-        tree_items_map = {str(self.cart_tree.item(item_id)['text']).strip(): item_id for item_id in self.cart_tree.get_children()}
-        
-        self.total = 0.0
-        newly_selected_item_id = None
-
-        # First pass: Add/Update items in Treeview based on self.cart
-        for prod_id, item_data in self.cart.items():
-            prod_id = prod_id.strip() # Ensure consistency for map key
-            name = item_data['name']
-            price = item_data['price']
-            quantity = item_data['quantity']
-            subtotal = price * quantity
-            self.total += subtotal
-
-            if prod_id in tree_items_map:
-                # Item exists, update its values
-                item_id = tree_items_map[prod_id]
-                self.cart_tree.item(item_id, values=(name, format_currency_id(price, include_decimals=False), 
-                                                        quantity, format_currency_id(subtotal, include_decimals=False)))
-                if prod_id == selected_prod_id:
-                    newly_selected_item_id = item_id
-                del tree_items_map[prod_id] # Mark as processed
+        for prod_id in self.cart.pop_changes():
+            line = self.cart.get(prod_id)
+            item_id = self.cart_rows.get(prod_id)
+            if line is None:
+                if item_id is not None:
+                    self.cart_tree.delete(item_id)
+                    del self.cart_rows[prod_id]
+                continue
+            values = (line.name, format_currency_id(line.price, include_decimals=False),
+                      line.quantity, format_currency_id(line.subtotal, include_decimals=False))
+            if item_id is not None:
+                self.cart_tree.item(item_id, values=values)
             else:
-                # Item is new, insert it
-                new_item_id = self.cart_tree.insert("", "end", text=prod_id, 
-                                                    values=(name, format_currency_id(price, include_decimals=False), 
-                                                            quantity, format_currency_id(subtotal, include_decimals=False)))
-                if prod_id == selected_prod_id:
-                    newly_selected_item_id = new_item_id
-        
-        # Second pass: Remove items from Treeview that are no longer in self.cart
-        # These are the remaining items in tree_items_map
-        for prod_id_to_remove in tree_items_map:
-            self.cart_tree.delete(tree_items_map[prod_id_to_remove])
+                self.cart_rows[prod_id] = self.cart_tree.insert("", "end", text=prod_id, values=values)
 
         self.total_label.config(text=format_currency_id(self.total, include_decimals=False))
 
-        # Re-select the item that was previously selected, if it still exists
-        if newly_selected_item_id:
-            self.cart_tree.selection_set(newly_selected_item_id)
-            self.cart_tree.focus(newly_selected_item_id)
-        elif self.cart_tree.get_children(): # If no specific item was selected, but there are items, select the first one
-             self.cart_tree.selection_set(self.cart_tree.get_children()[0])
-             self.cart_tree.focus(self.cart_tree.get_children()[0])
-
+        # Keep the current selection; if it was removed, select the first item
+        if self.cart_rows and not self.cart_tree.selection():
+            first_item_id = next(iter(self.cart_rows.values()))
+            self.cart_tree.selection_set(first_item_id)
+            self.cart_tree.focus(first_item_id)
 
     def complete_transaction_shortcut(self, event=None):
         """Wrapper method for F12 shortcut to complete transaction."""
         self.complete_transaction()
 
+    @timed("checkout.complete_transaction")
     def complete_transaction(self):
         """Menyelesaikan transaksi, memperbarui stok, dan mencetak struk."""
+        self.scanner_input.flush() # Scan yang masih antre milik pelanggan ini, bukan pelanggan berikutnya
         self.update_status("Memproses transaksi...", 'info', duration=5000)
 
         if not self.cart:
@@ -1077,139 +4266,115 @@ class POSApp:
         
         # No payment input, assume payment is exact (or handled externally)
         payment_amount = self.total
-        change = 0.0 # Always 0 since payment is assumed exact
+        change = 0 # Always 0 since payment is assumed exact
 
         # No messagebox.askyesno here, directly proceed to process transaction
         
-        # 1. Update stock in database
-        stock_update_success = True
-        for prod_id, item_data in self.cart.items():
-            quantity_sold = item_data['quantity']
-            current_product_in_db = get_product_by_id(prod_id) # get_product_by_id now handles stripping
-            if current_product_in_db:
-                current_stock = current_product_in_db[3]
-                new_stock = current_stock - quantity_sold
-                success, msg = update_product_stock(prod_id, new_stock)
-                if not success:
-                    stock_update_success = False
-                    print(f"Error updating stock for {prod_id}: {msg}") # Log error
-                    self.update_status(f"Gagal memperbarui stok untuk {item_data['name']}: {msg}. Transaksi dibatalkan.", 'error', duration=7000)
-                    return # Abort transaction if stock update fails
-            else:
-                stock_update_success = False
-                print(f"Warning: Product {prod_id} not found in DB during stock update.")
-                self.update_status(f"Produk '{item_data['name']}' tidak ditemukan saat memperbarui stok. Transaksi dibatalkan.", 'error', duration=7000)
-                return # Abort transaction if product not found
-
-        if not stock_update_success:
-            self.update_status("Transaksi dibatalkan karena masalah stok.", 'error', duration=7000)
-            return
-
-        # 2. Record sale in sales history
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        items_json = json.dumps(self.cart) 
-        success, message = insert_sale(timestamp, self.total, payment_amount, change, items_json)
+        # 1. Update stock and record the sale in a single transaction (the session empties its cart on success)
+        timestamp = current_timestamp()
+        cart, total = self.cart.as_dict(), self.total
+        success, message = self.session.checkout(timestamp, payment_amount)
 
         if success:
             self.update_status("Transaksi berhasil diselesaikan!", 'success')
-            self.print_receipt(self.cart, self.total, payment_amount, change, timestamp)
+            self.print_receipt(cart, total, payment_amount, change, timestamp)
 
-            # 3. Reset UI
-            self.cart = {}
+            # 2. Reset UI
             self.update_cart_display_and_total()
             # Removed payment_entry and change_label reset
             self.found_product_name_label.config(text="-")
-            self.found_product_price_label.config(text=format_currency_id(0.00, include_decimals=False))
+            self.found_product_price_label.config(text=format_currency_id(0, include_decimals=False))
             self.found_product_stock_label.config(text="0")
             self.transaction_search_id_entry.delete(0, tk.END)
-            self.live_search_entry.delete(0, tk.END)
-            
-            # These reloads are necessary here as database stock has changed
-            self.load_products_to_tree() # Refresh product management tree
-            self.load_low_stock_to_tree() # Refresh low stock report
-            self.live_search_products() # Refresh live search in transaction tab
+            if self.live_search_entry.get():
+                self.live_search_entry.delete(0, tk.END)
+                self.live_search_products() # Search term changed, show all products again
+
+            # Rows of the sold products are updated in place via _on_products_changed
         else:
-            self.update_status(f"Gagal mencatat transaksi: {message}", 'error', duration=7000)
+            self.update_status(f"Transaksi dibatalkan: {message}", 'error', duration=7000)
 
 
+    @timed("print.print_receipt")
     def print_receipt(self, cart_items, total, payment, change, timestamp):
-        """Mencetak struk transaksi."""
-        # Define a general line width for centering based on 58mm paper (approx 32 chars)
-        LINE_WIDTH = 32 
-        ADDRESS_LINE_1 = "Jl. Moh Saleh Bantilan"
-        ADDRESS_LINE_2 = "(Depan Pasar Sandana)"
-
-        receipt_content = f"--------------------------------\n" # 32 dashes
-        receipt_content += f"{'Toko GRAND':^{LINE_WIDTH}}\n" # Centered, no bolding simulation
-        receipt_content += f"{ADDRESS_LINE_1:^{LINE_WIDTH}}\n"
-        receipt_content += f"{ADDRESS_LINE_2:^{LINE_WIDTH}}\n"
-        receipt_content += f"{timestamp:^{LINE_WIDTH}}\n"
-        
-        # Space between header and body
-        receipt_content += "\n\n" # Add 2 newlines for spacing
-        
-        receipt_content += f"--------------------------------\n" # 32 dashes
-
-        for prod_id, item_data in cart_items.items():
-            name = item_data['name']
-            price = item_data['price']
-            quantity = item_data['quantity']
-            subtotal = price * quantity
-
-            # Item name line (without ID)
-            receipt_content += f"{name}\n" 
-            # Format quantity, unit price, and subtotal, right-aligned
-            qty_price_subtotal_line = (
-                f"{quantity} x {format_currency_id(price, include_decimals=False)} = {format_currency_id(subtotal, include_decimals=False)}"
-            )
-            # Ensure this line is right-aligned to the LINE_WIDTH
-            receipt_content += f"{qty_price_subtotal_line:>{LINE_WIDTH}}\n"
-        
-        # Space between body and footer
-        receipt_content += "\n" # Add 1 newline for spacing
-
-        receipt_content += f"--------------------------------\n" # 32 dashes
-        # Total line, right-aligned
-        receipt_content += f"{'TOTAL: ' + format_currency_id(total, include_decimals=False):>{LINE_WIDTH}}\n"
-        receipt_content += f"--------------------------------\n" # 32 dashes
-        receipt_content += f"{'Terima Kasih!':^{LINE_WIDTH}}\n" # Center the thank you message
-        receipt_content += f"--------------------------------\n" # 32 dashes
-
-        # Space at the very bottom for tearing
-        receipt_content += "\n\n\n\n\n" # Add 5 newlines for tearing
-
+        """Mencetak struk transaksi lewat antrean cetak."""
         try:
-            if win32print: # Check if win32print module was imported successfully
-                printer_name = "Blueprint_M58" # Use the specified printer name
-                # You might want to add a check here if the specified printer exists
-                # For simplicity, we'll assume it exists or rely on win32print's error handling
-                hPrinter = win32print.OpenPrinter(printer_name)
-                try:
-                    hJob = win32print.StartDocPrinter(hPrinter, 1, ("Struk Belanja", None, "RAW"))
-                    try:
-                        win32print.StartPagePrinter(hPrinter)
-                        # Encode to bytes for printer
-                        win32print.WritePrinter(hPrinter, receipt_content.encode('utf-8'))
-                        win32print.EndPagePrinter(hPrinter)
-                    finally:
-                        win32print.EndDocPrinter(hPrinter)
-                finally:
-                    win32print.ClosePrinter(hPrinter)
-                self.update_status(f"Struk berhasil dikirim ke printer '{printer_name}'.", 'success')
+            if self.print_spooler.backend.accepts_escpos:
+                data = self.receipt_renderer.render_escpos(cart_items, total, timestamp)
             else:
-                self._save_receipt_to_file(receipt_content)
-        except Exception as e:
-            self.update_status(f"Gagal mencetak struk ke printer: {e}. Struk akan disimpan ke file.", 'warning')
-            self._save_receipt_to_file(content) # Pass content directly
+                data = self.receipt_renderer.render_text(cart_items, total, timestamp).encode('utf-8')
+            self.print_spooler.submit(data)
+            self.update_status(f"Struk masuk antrean cetak ({self.print_spooler.backend.description}).", 'success')
+        except OSError as e:
+            # Spool tidak bisa ditulis (mis. disk penuh): simpan langsung ke file
+            self.update_status(f"Gagal memasukkan struk ke antrean cetak: {e}. Struk akan disimpan ke file.", 'warning')
+            self._save_receipt_to_file(self.receipt_renderer.render_text(cart_items, total, timestamp))
+
+    def _on_print_event(self, kind, job_name, detail):
+        """Menampilkan kabar dari spooler di status bar (dipanggil di thread Tk)."""
+        depth = self.print_spooler.queue_depth()
+        queued = f" ({depth} struk dalam antrean)" if depth else ""
+        if kind == 'printed':
+            self.update_status(f"Struk berhasil dikirim ke {self.print_spooler.backend.description}.{queued}", 'success')
+        elif kind == 'retry':
+            self.update_status(f"Printer belum siap: {detail}{queued}", 'warning', duration=5000)
+        elif kind == 'failed':
+            self.update_status(f"Struk gagal dicetak ({detail}). Tersimpan di '{self.print_spooler.failed_dir}'.{queued}", 'error', duration=10000)
+
+    def _on_outbox_event(self, kind, detail):
+        """Menampilkan status sinkronisasi outbox kasir di status bar."""
+        if kind == 'offline':
+            self.update_status(f"Server tidak terjangkau ({detail}). Transaksi disimpan di antrean offline.", 'warning', duration=7000)
+        elif kind == 'online':
+            self.update_status(f"Tersambung kembali ke server. Antrean offline terkirim (tersisa {detail}).", 'success')
+        elif kind == 'synced' and detail[1]:
+            conflicts = detail[1]
+            self.update_status(f"{len(conflicts)} transaksi offline bentrok dengan stok server: {conflicts[0]['detail']} "
+                               f"Lihat 'Antrean Offline'.", 'warning', duration=10000)
+
+    def show_outbox_status(self):
+        """Membuka jendela berisi entri outbox yang belum terkirim dan yang bentrok dengan stok server."""
+        if sale_outbox is None:
+            return
+        counts = sale_outbox.counts()
+        outbox_window = Toplevel(self.root)
+        outbox_window.title("Antrean Offline")
+        outbox_window.transient(self.root)
+
+        frame = ttk.Frame(outbox_window, padding="15")
+        frame.pack(fill="both", expand=True)
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(1, weight=1)
+
+        state = "tersambung" if outbox_syncer and outbox_syncer.online else "tidak terjangkau"
+        ttk.Label(frame, text=f"Server: {state}. Tertunda: {counts['pending']}, bentrok: {counts['conflict']}, "
+                              f"terkirim: {counts['synced']}.").grid(row=0, column=0, columnspan=2, sticky="w", pady=(0, 10))
+
+        columns = ("Waktu", "Jenis", "Status", "Percobaan", "Keterangan")
+        tree = ttk.Treeview(frame, columns=columns, show="headings", selectmode="browse", height=15)
+        tree.grid(row=1, column=0, sticky="nsew")
+        for col, width in zip(columns, (140, 80, 80, 80, 360)):
+            tree.heading(col, text=col, anchor="center")
+            tree.column(col, width=width, anchor="center" if col != "Keterangan" else "w")
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.grid(row=1, column=1, sticky="ns")
+
+        kinds = {'sale': "Penjualan", 'stock': "Stok"}
+        statuses = {'pending': "Tertunda", 'conflict': "Bentrok"}
+        for created_at, kind, status, attempts, detail in sale_outbox.entries(limit=SALES_HISTORY_LIMIT):
+            tree.insert("", "end", values=(created_at, kinds[kind], statuses[status], attempts, detail))
+        if outbox_syncer is not None:
+            ttk.Button(frame, text="Kirim Sekarang", command=outbox_syncer._wake.set, style='TButton').grid(row=2, column=0, sticky="w", pady=(10, 0))
 
     def _save_receipt_to_file(self, content):
         """Menyimpan konten struk ke file teks."""
         try:
-            if not os.path.exists("receipts"):
-                os.makedirs("receipts")
+            if not os.path.exists(RECEIPTS_DIR):
+                os.makedirs(RECEIPTS_DIR)
             
             filename = datetime.now().strftime("receipt_%Y%m%d_%H%M%S.txt")
-            filepath = os.path.join("receipts", filename)
+            filepath = os.path.join(RECEIPTS_DIR, filename)
             with open(filepath, "w", encoding="utf-8") as f:
                 f.write(content)
             self.update_status(f"Struk berhasil disimpan ke: {os.path.basename(filepath)}", 'success')
@@ -1240,6 +4405,9 @@ class POSApp:
         ttk.Label(search_id_transaction_frame, text="ID Produk:").grid(row=0, column=0, padx=10, pady=5, sticky="w")
         self.transaction_search_id_entry = ttk.Entry(search_id_transaction_frame)
         self.transaction_search_id_entry.grid(row=0, column=1, padx=10, pady=5, sticky="ew")
+        self.scanner_input = ScannerInput(self.root, self.transaction_search_id_entry.get,
+                                          lambda: self.transaction_search_id_entry.delete(0, tk.END), self._process_scans)
+        self.transaction_search_id_entry.bind('<KeyPress>', self.scanner_input.key)
         self.transaction_search_id_entry.bind('<Return>', self.process_product_id_input)
         self.transaction_search_id_entry.focus_set()
 
@@ -1248,7 +4416,7 @@ class POSApp:
         self.found_product_name_label.grid(row=1, column=1, padx=10, pady=5, sticky="w", columnspan=2)
 
         ttk.Label(search_id_transaction_frame, text="Harga:").grid(row=2, column=0, padx=10, pady=5, sticky="w")
-        self.found_product_price_label = ttk.Label(search_id_transaction_frame, text=format_currency_id(0.00, include_decimals=False), font=('Segoe UI', 10, 'bold'), foreground='#2980B9')
+        self.found_product_price_label = ttk.Label(search_id_transaction_frame, text=format_currency_id(0, include_decimals=False), font=('Segoe UI', 10, 'bold'), foreground='#2980B9')
         self.found_product_price_label.grid(row=2, column=1, padx=10, pady=5, sticky="w", columnspan=2)
 
         ttk.Label(search_id_transaction_frame, text="Stok Tersedia (di luar keranjang):").grid(row=3, column=0, padx=10, pady=5, sticky="w") # Updated label
@@ -1264,7 +4432,9 @@ class POSApp:
         ttk.Label(live_search_frame, text="Cari Nama/ID:").grid(row=0, column=0, padx=10, pady=5, sticky="w")
         self.live_search_entry = ttk.Entry(live_search_frame)
         self.live_search_entry.grid(row=0, column=1, padx=10, pady=5, sticky="ew")
-        self.live_search_entry.bind('<KeyRelease>', self.live_search_products)
+        self.live_search = DebouncedSearch(self.root, lambda: self.live_search_entry.get().strip(),
+                                           search_products, self._render_live_search_results)
+        self.live_search_entry.bind('<KeyRelease>', self.live_search.schedule)
 
         search_results_columns = ("ID", "Nama Produk", "Harga", "Stok")
         self.live_search_tree = ttk.Treeview(live_search_frame, columns=search_results_columns, show="headings", selectmode="browse")
@@ -1280,7 +4450,8 @@ class POSApp:
         self.live_search_tree.column("Stok", width=70, stretch=tk.NO)
 
         live_search_tree_scrollbar = ttk.Scrollbar(live_search_frame, orient="vertical", command=self.live_search_tree.yview)
-        self.live_search_tree.configure(yscrollcommand=live_search_tree_scrollbar.set)
+        self.live_search_list = VirtualTreeview(self.live_search_tree, live_search_tree_scrollbar, self._format_live_search_row,
+                                                sort_keys=PRODUCT_SORT_KEYS)
         live_search_tree_scrollbar.grid(row=1, column=2, sticky="ns")
 
         self.live_search_tree.bind('<<TreeviewSelect>>', self.add_selected_product_from_search)
@@ -1329,7 +4500,7 @@ class POSApp:
         total_payment_frame.columnconfigure(1, weight=1)
 
         ttk.Label(total_payment_frame, text="Total Belanja:", font=('Segoe UI', 18, 'bold')).grid(row=0, column=0, padx=10, pady=5, sticky="w")
-        self.total_label = ttk.Label(total_payment_frame, text=format_currency_id(0.00, include_decimals=False), style='Total.TLabel')
+        self.total_label = ttk.Label(total_payment_frame, text=format_currency_id(0, include_decimals=False), style='Total.TLabel')
         self.total_label.grid(row=0, column=1, padx=10, pady=5, sticky="e")
 
         # Removed Jumlah Bayar and Kembalian UI elements
@@ -1339,7 +4510,7 @@ class POSApp:
         # self.payment_entry.bind('<KeyRelease>', self.calculate_change)
 
         # ttk.Label(total_payment_frame, text="Kembalian:", font=('Segoe UI', 12)).grid(row=2, column=0, padx=10, pady=5, sticky="w")
-        # self.change_label = ttk.Label(total_payment_frame, text=format_currency_id(0.00, include_decimals=False), font=('Segoe UI', 14, 'bold'), foreground='#27AE60')
+        # self.change_label = ttk.Label(total_payment_frame, text=format_currency_id(0, include_decimals=False), font=('Segoe UI', 14, 'bold'), foreground='#27AE60')
         # self.change_label.grid(row=2, column=1, padx=10, pady=5, sticky="e")
 
         complete_transaction_button = ttk.Button(parent_frame, text="Selesaikan Transaksi", command=self.complete_transaction, style='TButton')
@@ -1348,17 +4519,130 @@ class POSApp:
         self.live_search_products()
 
     # --- Methods for Low Stock Report Tab ---
+    @timed("tree.load_low_stock_to_tree")
     def load_low_stock_to_tree(self):
-        """Memuat data produk dengan stok rendah ke Treeview laporan stok."""
-        for i in self.low_stock_tree.get_children():
-            self.low_stock_tree.delete(i)
-        
-        low_stock_products = get_low_stock_products()
-        if not low_stock_products:
-            self.low_stock_tree.insert("", "end", values=("", "Tidak ada produk dengan stok rendah.", ""))
+        """Memuat produk yang sudah mencapai stok minimumnya ke Treeview laporan stok."""
+        children = self.low_stock_tree.get_children()
+        if children:
+            self.low_stock_tree.delete(*children)
+        self.low_stock_items = {} # {product_id: (kunci urutan, item id Treeview)}
+        self.low_stock_order = [] # Kunci urutan (stok, nama) baris yang tampil, sama dengan urutan Treeview
+        self.low_stock_placeholder = None
+
+        for row in get_low_stock_products():
+            key = (row[2], row[1])
+            self.low_stock_order.append(key)
+            self.low_stock_items[str(row[0])] = (key, self.low_stock_tree.insert("", "end", values=self._format_low_stock_row(*row)))
+        self._update_low_stock_placeholder()
+
+    @staticmethod
+    def _format_low_stock_row(prod_id, name, stock, min_stock, reorder_qty):
+        """Nilai kolom laporan stok: ID, nama, stok, stok minimum, dan jumlah yang disarankan untuk dipesan."""
+        return (prod_id, name, stock, min_stock, suggested_order_quantity(stock, ReorderPoint(min_stock, reorder_qty)))
+
+    def _update_low_stock_placeholder(self):
+        """Menampilkan baris keterangan jika tidak ada produk dengan stok rendah."""
+        if self.low_stock_items and self.low_stock_placeholder:
+            self.low_stock_tree.delete(self.low_stock_placeholder)
+            self.low_stock_placeholder = None
+        elif not self.low_stock_items and not self.low_stock_placeholder:
+            self.low_stock_placeholder = self.low_stock_tree.insert("", "end", values=("", "Tidak ada produk dengan stok rendah.", "", "", ""))
+
+    @timed("tree._update_low_stock_rows")
+    def _update_low_stock_rows(self, product_ids):
+        """Memperbarui baris laporan stok rendah hanya untuk produk yang berubah.
+        Produk masuk atau keluar dari laporan saat stoknya melewati stok minimumnya; posisi barisnya
+        dicari dengan bisect pada low_stock_order, tanpa query database maupun membaca ulang Treeview.
+        """
+        for product_id in product_ids:
+            entry = self.low_stock_items.pop(product_id, None)
+            if entry is not None:
+                key, item_id = entry
+                del self.low_stock_order[bisect.bisect_left(self.low_stock_order, key)]
+                self.low_stock_tree.delete(item_id)
+            record = product_catalog.peek(product_id)
+            if record is not None and reorder_points.is_low(record):
+                # Keep the report order: stock ascending, then name
+                key = (record.stock, record.name)
+                index = bisect.bisect_left(self.low_stock_order, key)
+                self.low_stock_order.insert(index, key)
+                values = self._format_low_stock_row(record.id, record.name, record.stock, *reorder_points.get(product_id))
+                self.low_stock_items[product_id] = (key, self.low_stock_tree.insert("", index, values=values))
+        self._update_low_stock_placeholder()
+
+    def edit_selected_reorder_point(self, tree):
+        """Membuka jendela untuk mengatur stok minimum dan jumlah pesan ulang produk yang dipilih di `tree`."""
+        selected_item = tree.selection()
+        product_id = str(tree.item(selected_item[0])['values'][0]).strip() if selected_item else ""
+        if not product_id:
+            self.update_status("Pilih produk yang titik pesan ulangnya ingin diatur terlebih dahulu.", 'warning')
+            return
+        product_name = tree.item(selected_item[0])['values'][1]
+        point = reorder_points.get(product_id)
+
+        edit_window = Toplevel(self.root)
+        edit_window.title(f"Titik Pesan Ulang: {product_name}")
+        edit_window.transient(self.root)
+        edit_window.grab_set()
+        edit_window.resizable(False, False)
+
+        input_frame = ttk.Frame(edit_window, padding="15")
+        input_frame.pack()
+
+        ttk.Label(input_frame, text="Nama Produk:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        ttk.Label(input_frame, text=product_name, font=('Segoe UI', 10, 'bold')).grid(row=0, column=1, padx=5, pady=5, sticky="w")
+
+        ttk.Label(input_frame, text="Stok Minimum:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        min_stock_entry = ttk.Entry(input_frame)
+        min_stock_entry.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+        min_stock_entry.insert(0, str(point.min_stock))
+        min_stock_entry.focus_set()
+
+        ttk.Label(input_frame, text="Kelipatan Pesan (0 = bebas):").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        reorder_qty_entry = ttk.Entry(input_frame)
+        reorder_qty_entry.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+        reorder_qty_entry.insert(0, str(point.reorder_qty))
+
+        save_button = ttk.Button(input_frame, text="Simpan",
+                                 command=lambda: self._save_reorder_point(product_id, min_stock_entry.get(), reorder_qty_entry.get(), edit_window),
+                                 style='TButton')
+        save_button.grid(row=3, column=0, columnspan=2, pady=10)
+
+    def _save_reorder_point(self, product_id, min_stock_str, reorder_qty_str, edit_window):
+        """Menyimpan titik pesan ulang yang diedit ke database."""
+        try:
+            min_stock = int(min_stock_str.strip())
+            reorder_qty = int(reorder_qty_str.strip())
+        except ValueError:
+            self.update_status("Stok minimum dan kelipatan pesan harus berupa angka bulat.", 'warning')
+            return
+        if min_stock < 0 or reorder_qty < 0:
+            self.update_status("Stok minimum dan kelipatan pesan tidak boleh kurang dari nol.", 'warning')
+            return
+
+        success, message = set_reorder_point(product_id, min_stock, reorder_qty)
+        if success:
+            self.update_status(f"Titik pesan ulang produk ID '{product_id}' disimpan (stok minimum {min_stock}).", 'success')
+            # The low stock report is updated via _on_products_changed
+            edit_window.destroy()
+        else:
+            self.update_status(f"Gagal menyimpan titik pesan ulang: {message}", 'error')
+
+    def export_purchase_order(self):
+        """Menyimpan usulan purchase order (produk yang sudah mencapai stok minimum) ke file CSV."""
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+            initialfile=f"purchase_order_{datetime.now().strftime('%Y%m%d')}.csv",
+            title="Simpan Purchase Order ke CSV"
+        )
+        if not file_path:
+            return
+        success, message = export_purchase_order_csv(file_path)
+        if success:
+            self.update_status(f"{message} Disimpan ke: {os.path.basename(file_path)}", 'success')
         else:
-            for prod_id, name, stock in low_stock_products:
-                self.low_stock_tree.insert("", "end", values=(prod_id, name, stock))
+            self.update_status(message, 'warning')
 
     def create_low_stock_report_ui(self, parent_frame):
         """Membuat antarmuka pengguna untuk laporan stok rendah."""
@@ -1366,12 +4650,12 @@ class POSApp:
 
         ttk.Label(parent_frame, text="Laporan Stok Produk Rendah", style='Header.TLabel').pack(pady=15)
 
-        report_frame = ttk.LabelFrame(parent_frame, text="Produk dengan Stok Rendah (Ambang Batas: 10)", style='TLabelframe')
+        report_frame = ttk.LabelFrame(parent_frame, text="Produk yang Perlu Dipesan Ulang (Stok <= Stok Minimum)", style='TLabelframe')
         report_frame.pack(pady=10, padx=20, fill="both", expand=True)
         report_frame.columnconfigure(0, weight=1)
         report_frame.rowconfigure(0, weight=1)
 
-        low_stock_columns = ("ID", "Nama Produk", "Stok")
+        low_stock_columns = ("ID", "Nama Produk", "Stok", "Stok Min.", "Saran Pesan")
         self.low_stock_tree = ttk.Treeview(report_frame, columns=low_stock_columns, show="headings", selectmode="browse")
         self.low_stock_tree.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
 
@@ -1382,16 +4666,173 @@ class POSApp:
         self.low_stock_tree.column("ID", width=100, stretch=tk.NO)
         self.low_stock_tree.column("Nama Produk", width=300, stretch=tk.YES)
         self.low_stock_tree.column("Stok", width=80, stretch=tk.NO)
+        self.low_stock_tree.column("Stok Min.", width=80, stretch=tk.NO)
+        self.low_stock_tree.column("Saran Pesan", width=100, stretch=tk.NO)
 
         low_stock_tree_scrollbar = ttk.Scrollbar(report_frame, orient="vertical", command=self.low_stock_tree.yview)
         self.low_stock_tree.configure(yscrollcommand=low_stock_tree_scrollbar.set)
         low_stock_tree_scrollbar.grid(row=0, column=1, sticky="ns")
 
-        refresh_button = ttk.Button(report_frame, text="Refresh Laporan Stok", command=self.load_low_stock_to_tree, style='TButton')
-        refresh_button.grid(row=1, column=0, pady=10, padx=10, sticky="ew")
+        button_frame = ttk.Frame(report_frame, style='TFrame')
+        button_frame.grid(row=1, column=0, columnspan=2, pady=10, padx=10, sticky="ew")
+        for column in range(3):
+            button_frame.columnconfigure(column, weight=1)
+
+        refresh_button = ttk.Button(button_frame, text="Refresh Laporan Stok", command=self.load_low_stock_to_tree, style='TButton')
+        refresh_button.grid(row=0, column=0, padx=5, sticky="ew")
+
+        reorder_point_button = ttk.Button(button_frame, text="Atur Titik Pesan Ulang",
+                                          command=lambda: self.edit_selected_reorder_point(self.low_stock_tree), style='TButton')
+        reorder_point_button.grid(row=0, column=1, padx=5, sticky="ew")
+
+        purchase_order_button = ttk.Button(button_frame, text="Buat Purchase Order (CSV)", command=self.export_purchase_order, style='TButton')
+        purchase_order_button.grid(row=0, column=2, padx=5, sticky="ew")
 
         self.load_low_stock_to_tree()
 
+    # --- Methods for Sales Report Tab ---
+    def _on_tab_changed(self, event=None):
+        selected = self.notebook.select()
+        self.build_tab(selected)
+        if selected == str(self.sales_report_frame):
+            self.load_sales_report()
+
+    def _read_report_range(self):
+        """Membaca rentang tanggal laporan; mengembalikan (dari, sampai) atau None jika tidak valid."""
+        start_day = self.report_start_entry.get().strip()
+        end_day = self.report_end_entry.get().strip()
+        try:
+            start = datetime.strptime(start_day, "%Y-%m-%d")
+            end = datetime.strptime(end_day, "%Y-%m-%d")
+        except ValueError:
+            self.update_status("Format tanggal harus YYYY-MM-DD.", 'warning')
+            return None
+        if start > end:
+            self.update_status("Tanggal awal tidak boleh setelah tanggal akhir.", 'warning')
+            return None
+        return start_day, end_day
+
+    def set_report_range(self, days):
+        """Mengisi rentang tanggal laporan: `days` hari terakhir termasuk hari ini."""
+        today = datetime.now()
+        self.report_start_entry.delete(0, tk.END)
+        self.report_start_entry.insert(0, (today - timedelta(days=days - 1)).strftime("%Y-%m-%d"))
+        self.report_end_entry.delete(0, tk.END)
+        self.report_end_entry.insert(0, today.strftime("%Y-%m-%d"))
+        self.load_sales_report()
+
+    @timed("tree.load_sales_report")
+    def load_sales_report(self):
+        """Memuat laporan penjualan untuk rentang tanggal yang dipilih dari tabel rollup."""
+        report_range = self._read_report_range()
+        if report_range is None:
+            return
+        start_day, end_day = report_range
+
+        daily = get_daily_sales(start_day, end_day)
+        for tree, rows in ((self.daily_sales_tree, daily), (self.hourly_sales_tree, get_hourly_sales(start_day, end_day))):
+            children = tree.get_children()
+            if children:
+                tree.delete(*children)
+            for period, sale_count, items_sold, total_amount in rows:
+                label = f"{period:02d}:00" if isinstance(period, int) else period
+                tree.insert("", "end", values=(label, sale_count, items_sold, format_currency_id(total_amount)))
+
+        self.product_sales_list.set_rows(get_top_products(start_day, end_day))
+        self.sales_history_list.set_rows(get_sales_in_range(start_day, end_day, limit=SALES_HISTORY_LIMIT))
+
+        sale_count = sum(row[1] for row in daily)
+        items_sold = sum(row[2] for row in daily)
+        total_amount = sum(row[3] for row in daily)
+        self.sales_report_summary_label.config(
+            text=f"{sale_count} transaksi  |  {items_sold} item terjual  |  Pendapatan: {format_currency_id(total_amount)}")
+
+    def show_sale_details(self, event=None):
+        """Menampilkan rincian item transaksi yang dipilih di riwayat penjualan."""
+        selected_item = self.sales_history_tree.selection()
+        if not selected_item:
+            return
+        sale_id, timestamp = self.sales_history_tree.item(selected_item[0])['values'][:2]
+        lines = [f"{name} ({product_id})\n   {quantity} x {format_currency_id(unit_price)} = {format_currency_id(subtotal)}"
+                 for product_id, name, unit_price, quantity, subtotal in get_sale_items(sale_id)]
+        messagebox.showinfo(f"Transaksi #{sale_id}", f"{timestamp}\n\n" + ("\n".join(lines) or "Tidak ada rincian item."))
+
+    def create_sales_report_ui(self, parent_frame):
+        """Membuat antarmuka pengguna untuk laporan penjualan."""
+        parent_frame.columnconfigure(0, weight=1)
+        parent_frame.columnconfigure(1, weight=1)
+        parent_frame.rowconfigure(3, weight=1)
+        parent_frame.rowconfigure(4, weight=1)
+
+        ttk.Label(parent_frame, text="Laporan Penjualan", style='Header.TLabel').grid(row=0, column=0, columnspan=2, pady=15)
+
+        filter_frame = ttk.Frame(parent_frame, style='TFrame')
+        filter_frame.grid(row=1, column=0, columnspan=2, padx=20, sticky="ew")
+        ttk.Label(filter_frame, text="Dari (YYYY-MM-DD):", style='TLabel').pack(side=tk.LEFT, padx=(0, 5))
+        self.report_start_entry = ttk.Entry(filter_frame, width=12, font=('Segoe UI', 10))
+        self.report_start_entry.pack(side=tk.LEFT, padx=5)
+        ttk.Label(filter_frame, text="Sampai:", style='TLabel').pack(side=tk.LEFT, padx=5)
+        self.report_end_entry = ttk.Entry(filter_frame, width=12, font=('Segoe UI', 10))
+        self.report_end_entry.pack(side=tk.LEFT, padx=5)
+        ttk.Button(filter_frame, text="Tampilkan", command=self.load_sales_report, style='TButton').pack(side=tk.LEFT, padx=5)
+        for label, days in (("Hari Ini", 1), ("7 Hari", 7), ("30 Hari", 30), ("12 Bulan", 365)):
+            ttk.Button(filter_frame, text=label, command=lambda d=days: self.set_report_range(d), style='TButton').pack(side=tk.LEFT, padx=2)
+
+        self.sales_report_summary_label = ttk.Label(parent_frame, text="", style='TLabel', font=('Segoe UI', 11, 'bold'))
+        self.sales_report_summary_label.grid(row=2, column=0, columnspan=2, padx=20, pady=10, sticky="w")
+
+        def report_tree(row, column, title, columns, widths, height=8):
+            frame = ttk.LabelFrame(parent_frame, text=title, style='TLabelframe')
+            frame.grid(row=row, column=column, padx=10, pady=5, sticky="nsew")
+            frame.columnconfigure(0, weight=1)
+            frame.rowconfigure(0, weight=1)
+            tree = ttk.Treeview(frame, columns=columns, show="headings", selectmode="browse", height=height)
+            tree.grid(row=0, column=0, padx=5, pady=5, sticky="nsew")
+            for col, width in zip(columns, widths):
+                tree.heading(col, text=col, anchor="center")
+                tree.column(col, width=width, anchor="center")
+            scrollbar = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+            tree.configure(yscrollcommand=scrollbar.set)
+            scrollbar.grid(row=0, column=1, sticky="ns")
+            return tree, scrollbar
+
+        period_columns = ("Transaksi", "Item", "Total")
+        self.daily_sales_tree, _ = report_tree(3, 0, "Penjualan per Hari", ("Tanggal",) + period_columns, (100, 80, 80, 130))
+        self.hourly_sales_tree, _ = report_tree(3, 1, "Penjualan per Jam", ("Jam",) + period_columns, (80, 80, 80, 130))
+
+        product_columns = ("ID", "Nama Produk", "Terjual", "Pendapatan")
+        self.product_sales_tree, product_scrollbar = report_tree(4, 0, "Produk Terlaris & Pendapatan per Produk", product_columns, (110, 200, 70, 130))
+        self.product_sales_list = VirtualTreeview(
+            self.product_sales_tree, product_scrollbar,
+            lambda row: (str(row[0]), row[1], row[2], format_currency_id(row[3])),
+            {"ID": lambda row: str(row[0]), "Nama Produk": lambda row: row[1],
+             "Terjual": lambda row: -row[2], "Pendapatan": lambda row: -row[3]})
+
+        history_columns = ("No", "Waktu", "Total", "Bayar", "Kembali")
+        self.sales_history_tree, history_scrollbar = report_tree(4, 1, f"Riwayat Transaksi (maks. {SALES_HISTORY_LIMIT} terbaru)", history_columns, (60, 150, 110, 110, 100))
+        self.sales_history_list = VirtualTreeview(
+            self.sales_history_tree, history_scrollbar,
+            lambda row: (row[0], row[1], format_currency_id(row[2]), format_currency_id(row[3]), format_currency_id(row[4])))
+        self.sales_history_tree.bind("<Double-1>", self.show_sale_details)
+
+        export_frame = ttk.Frame(parent_frame, style='TFrame')
+        export_frame.grid(row=5, column=0, columnspan=2, padx=20, pady=10, sticky="ew")
+        ttk.Label(export_frame, text="Ekspor rentang ini:", style='TLabel').pack(side=tk.LEFT, padx=(0, 5))
+        self.sales_export_kind = ttk.Combobox(export_frame, values=("Transaksi", "Rincian Item"), state="readonly", width=13)
+        self.sales_export_kind.set("Transaksi")
+        self.sales_export_kind.pack(side=tk.LEFT, padx=5)
+        self.sales_export_format = ttk.Combobox(export_frame, values=("CSV", "JSONL"), state="readonly", width=7)
+        self.sales_export_format.set("CSV")
+        self.sales_export_format.pack(side=tk.LEFT, padx=5)
+        self.sales_export_gzip = tk.BooleanVar(value=False)
+        ttk.Checkbutton(export_frame, text="Kompres (gzip)", variable=self.sales_export_gzip).pack(side=tk.LEFT, padx=5)
+        ttk.Button(export_frame, text="Ekspor Penjualan", command=self.export_sales, style='TButton').pack(side=tk.LEFT, padx=5)
+        ttk.Button(export_frame, text="Batalkan Ekspor", command=self.cancel_export, style='Danger.TButton').pack(side=tk.LEFT, padx=5)
+
+        today = datetime.now()
+        self.report_start_entry.insert(0, (today - timedelta(days=29)).strftime("%Y-%m-%d"))
+        self.report_end_entry.insert(0, today.strftime("%Y-%m-%d"))
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = POSApp(root)
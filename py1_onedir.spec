@@ -0,0 +1,51 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Build cepat-buka: folder (onedir) alih-alih satu file. py1.spec (onefile) membongkar seluruh
+# isi exe ke folder sementara setiap kali dibuka; versi folder langsung memuat file yang sudah ada.
+# Bytecode dioptimalkan (optimize=2, tanpa docstring/assert) dan tanpa UPX agar DLL tidak perlu
+# didekompresi saat startup.
+#
+#     pyinstaller py1_onedir.spec    # hasil: dist/py1/py1.exe
+
+
+a = Analysis(
+    ['py1.py'],
+    pathex=[],
+    binaries=[],
+    datas=[('pos_data.db', '.')],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=[],
+    noarchive=False,
+    optimize=2,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='py1',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon=['favicon.ico'],
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='py1',
+)
@@ -0,0 +1,91 @@
+"""Pembuat struk belanja untuk aplikasi POS (py1.py).
+
+Tata letak (lebar kertas, nama toko, alamat, footer) disusun sekali oleh ReceiptRenderer;
+setiap struk kemudian hanya mengisi baris item dan total lalu menggabungkannya dengan join.
+Hasilnya bisa berupa teks biasa (untuk file) atau byte ESC/POS (untuk printer thermal).
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+# Jumlah karakter per baris untuk font standar printer thermal
+PAPER_WIDTHS = {'58mm': 32, '80mm': 48}
+
+# Perintah ESC/POS
+ESC_INIT = b"\x1b@"
+ESC_BOLD_ON = b"\x1bE\x01"
+ESC_BOLD_OFF = b"\x1bE\x00"
+GS_CUT = b"\x1dVB\x00"            # Feed lalu potong sebagian (partial cut)
+ESC_DRAWER_KICK = b"\x1bp\x00\x19\xfa" # Pulsa ke pin 2 laci kas
+
+ReceiptLayout = namedtuple('ReceiptLayout', ['line_width', 'shop_name', 'address_lines', 'footer',
+                                             'feed_lines', 'encoding', 'open_drawer'])
+
+def receipt_layout(paper='58mm', shop_name="Toko GRAND", address_lines=("Jl. Moh Saleh Bantilan", "(Depan Pasar Sandana)"),
+                   footer="Terima Kasih!", feed_lines=5, encoding='cp437', open_drawer=False):
+    """Membuat ReceiptLayout untuk ukuran kertas '58mm' atau '80mm'."""
+    if paper not in PAPER_WIDTHS:
+        raise ValueError(f"Ukuran kertas '{paper}' tidak dikenal. Pilihan: {', '.join(PAPER_WIDTHS)}.")
+    return ReceiptLayout(PAPER_WIDTHS[paper], shop_name, tuple(address_lines), footer, feed_lines, encoding, open_drawer)
+
+@lru_cache(maxsize=8192)
+def format_rupiah(amount):
+    """RpX.XXX tanpa desimal (sama dengan format_currency_id(amount, include_decimals=False))."""
+    return f"Rp{int(amount):,}".replace(",", ".")
+
+class ReceiptRenderer:
+    """Menyusun struk dari keranjang {product_id: {'name', 'price', 'quantity'}} (harga dalam rupiah bulat)."""
+    def __init__(self, layout, format_amount=format_rupiah):
+        self.layout = layout
+        self.format_amount = format_amount
+        width = layout.line_width
+        self.separator = "-" * width
+        self._right = f"{{:>{width}}}".format
+
+        # Bagian yang sama untuk setiap struk disusun sekali di sini
+        center = f"{{:^{width}}}".format
+        self._shop_line = center(layout.shop_name)
+        self._address_lines = [center(line) for line in layout.address_lines]
+        self._footer_lines = [self.separator, center(layout.footer), self.separator]
+        self._feed = "\n" * layout.feed_lines
+        self._center = center
+        self._escpos_header = b"".join([ESC_INIT, self._encode(self.separator + "\n"),
+                                        ESC_BOLD_ON, self._encode(self._shop_line + "\n"), ESC_BOLD_OFF])
+        self._escpos_footer = b"".join([self._encode("\n".join(self._footer_lines) + "\n" + self._feed), GS_CUT,
+                                        ESC_DRAWER_KICK if layout.open_drawer else b""])
+
+    def _item_lines(self, cart_items):
+        format_amount, right = self.format_amount, self._right
+        lines = []
+        append = lines.append
+        for item_data in cart_items.values():
+            price = item_data['price']
+            quantity = item_data['quantity']
+            append(item_data['name'])
+            append(right(f"{quantity} x {format_amount(price)} = {format_amount(price * quantity)}"))
+        return lines
+
+    def _total_line(self, total):
+        return self._right("TOTAL: " + self.format_amount(total))
+
+    def render_text(self, cart_items, total, timestamp):
+        """Struk sebagai teks biasa (untuk file atau printer tanpa ESC/POS)."""
+        lines = [self.separator, self._shop_line, *self._address_lines, self._center(timestamp), "", "", self.separator]
+        lines += self._item_lines(cart_items)
+        lines += ["", self.separator, self._total_line(total)]
+        lines += self._footer_lines
+        return "\n".join(lines) + "\n" + self._feed
+
+    def _encode(self, text):
+        try:
+            return text.encode('ascii') # Jalur cepat: struk umumnya hanya berisi ASCII
+        except UnicodeEncodeError:
+            return text.encode(self.layout.encoding, 'replace')
+
+    def render_escpos(self, cart_items, total, timestamp):
+        """Struk sebagai byte ESC/POS: nama toko dan total tebal, kertas dipotong, laci kas dibuka jika diatur."""
+        body = "\n".join([*self._address_lines, self._center(timestamp), "", "", self.separator,
+                          *self._item_lines(cart_items), "", self.separator, ""])
+        parts = [self._escpos_header, self._encode(body),
+                 ESC_BOLD_ON, self._encode(self._total_line(total) + "\n"), ESC_BOLD_OFF,
+                 self._escpos_footer]
+        return b"".join(parts)